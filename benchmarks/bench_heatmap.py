@@ -0,0 +1,114 @@
+"""
+Benchmark du calcul de la heatmap d'attractivité.
+Compare l'ancienne implémentation à boucles Python au moteur vectorisé.
+
+Usage:
+    python benchmarks/bench_heatmap.py [--repeat 5]
+"""
+import os
+import sys
+import time
+import argparse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from src.utils.kernel_surface import compute_kernel_surface
+
+
+def legacy_loop_surface(grid_size, hotspots):
+    """
+    Reproduit l'implémentation historique (boucles i/j imbriquées).
+
+    Args:
+        grid_size (int): Taille de la grille
+        hotspots (list): Points chauds (ligne, colonne, intensité)
+
+    Returns:
+        np.ndarray: Surface normalisée
+    """
+    Z = np.zeros((grid_size, grid_size))
+    center_x = grid_size // 2
+    center_y = grid_size // 2
+    for i in range(grid_size):
+        for j in range(grid_size):
+            d = np.sqrt((i - center_x) ** 2 + (j - center_y) ** 2)
+            Z[i, j] = np.exp(-d / 20)
+
+    for x_idx, y_idx, intensity in hotspots:
+        for i in range(grid_size):
+            for j in range(grid_size):
+                d = np.sqrt((i - x_idx) ** 2 + (j - y_idx) ** 2)
+                Z[i, j] += intensity * np.exp(-d / 15)
+
+    return Z / np.max(Z)
+
+
+def vectorized_surface(grid_size, hotspots, resolution=None):
+    """
+    Calcule la même surface avec le moteur vectorisé (unités en pixels).
+
+    Args:
+        grid_size (int): Taille de la grille de référence
+        hotspots (list): Points chauds (ligne, colonne, intensité)
+        resolution (int, optional): Résolution de sortie (par défaut grid_size)
+
+    Returns:
+        np.ndarray: Surface normalisée
+    """
+    center = grid_size // 2
+    kernels = [[center, center, 1.0, 20.0]]
+    kernels += [[col, row, intensity, 15.0] for row, col, intensity in hotspots]
+    Z, _ = compute_kernel_surface((0, 0, grid_size - 1, grid_size - 1), kernels,
+                                  resolution=resolution or grid_size)
+    return Z
+
+
+def best_of(fn, repeat):
+    """
+    Mesure le meilleur temps d'exécution sur plusieurs répétitions.
+
+    Args:
+        fn (callable): Fonction à mesurer
+        repeat (int): Nombre de répétitions
+
+    Returns:
+        float: Meilleur temps en secondes
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    grid_size = 100
+    hotspots = [(int(rng.integers(0, grid_size)), int(rng.integers(0, grid_size)),
+                 float(rng.random() * 0.8 + 0.2)) for _ in range(5)]
+
+    reference = legacy_loop_surface(grid_size, hotspots)
+    max_error = float(np.abs(reference - vectorized_surface(grid_size, hotspots)).max())
+
+    legacy = best_of(lambda: legacy_loop_surface(grid_size, hotspots), args.repeat)
+    vectorized = best_of(lambda: vectorized_surface(grid_size, hotspots), args.repeat)
+    print(f"Écart maximal boucle/vectorisé: {max_error:.2e}")
+    print(f"100x100   boucle:     {legacy * 1000:9.2f} ms")
+    print(f"100x100   vectorisé:  {vectorized * 1000:9.2f} ms  (x{legacy / vectorized:.0f})")
+
+    for resolution in (1000,):
+        for n_kernels in (6, 50):
+            extra = [(float(rng.random() * grid_size), float(rng.random() * grid_size), 0.5)
+                     for _ in range(n_kernels - 1 - len(hotspots))]
+            timing = best_of(lambda: vectorized_surface(grid_size, hotspots + extra, resolution),
+                             args.repeat)
+            print(f"{resolution}x{resolution} vectorisé ({n_kernels} noyaux): {timing * 1000:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark du temps d'import de l'application (démarrage à froid).
+Importe le module dans un interpréteur neuf avec `python -X importtime`,
+affiche les modules les plus coûteux et vérifie le budget de temps ainsi que
+l'absence des bibliothèques lourdes, réservées aux chemins de données réelles.
+
+Usage:
+    python benchmarks/bench_import_time.py [--module src.main] [--budget 0.5] [--repeat 5]
+"""
+import os
+import re
+import sys
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Bibliothèques qui ne doivent pas être importées au démarrage
+HEAVY_MODULES = ("geopandas", "osmnx", "folium", "matplotlib", "seaborn", "scipy", "pandas", "networkx", "pyproj")
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+
+def import_profile(module):
+    """
+    Importe un module dans un nouvel interpréteur et analyse la sortie de -X importtime.
+
+    Args:
+        module (str): Module à importer
+
+    Returns:
+        dict: Temps cumulé par module importé (microsecondes), indexé par nom
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    cumulative = {}
+    for line in process.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            cumulative[match.group(4)] = int(match.group(2))
+    return cumulative
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="src.main")
+    parser.add_argument("--budget", type=float, default=0.5, help="Budget en secondes")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    profiles = [import_profile(args.module) for _ in range(args.repeat)]
+    best = min(profiles, key=lambda profile: profile[args.module])
+    total = best[args.module] / 1e6
+
+    print(f"Import de {args.module}: {total * 1000:.0f} ms (meilleur de {args.repeat}, budget {args.budget * 1000:.0f} ms)")
+    top_level = {name: time for name, time in best.items() if "." not in name and name != args.module}
+    for name, time in sorted(top_level.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {name:<30} {time / 1000:8.1f} ms")
+
+    heavy = sorted(name for name in HEAVY_MODULES if name in best)
+    if heavy:
+        print(f"Bibliothèques lourdes importées au démarrage: {', '.join(heavy)}")
+    if total > args.budget or heavy:
+        print("ÉCHEC")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark de la génération de la carte interactive des concurrents.
+Compare un folium.CircleMarker par entité à la couche GeoJSON unique
+(taille du HTML et temps de rendu en fonction du nombre d'entités).
+
+Usage:
+    python benchmarks/bench_map_output.py [--counts 100 1000 5000 20000] [--repeat 3]
+"""
+import os
+import sys
+import time
+import argparse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import folium
+from src.utils.map_builder import FeatureLayer, create_map
+
+CENTER = (48.8566, 2.3522)
+STYLES = {"competitor": {"radius": 5, "color": "#dc3545", "fillColor": "#dc3545", "fillOpacity": 0.8}}
+
+
+def legacy_map(latitudes, longitudes, names):
+    """
+    Reproduit l'implémentation historique (un CircleMarker et une popup par concurrent).
+
+    Args:
+        latitudes (np.ndarray): Latitudes des concurrents
+        longitudes (np.ndarray): Longitudes des concurrents
+        names (list): Noms des concurrents
+
+    Returns:
+        str: HTML de la carte
+    """
+    m = folium.Map(location=list(CENTER), zoom_start=15, tiles="OpenStreetMap")
+    for latitude, longitude, name in zip(latitudes, longitudes, names):
+        folium.CircleMarker(
+            location=[float(latitude), float(longitude)],
+            radius=5,
+            color="#dc3545",
+            fill=True,
+            fill_color="#dc3545",
+            fill_opacity=0.8,
+            popup=name
+        ).add_to(m)
+    return m.get_root().render()
+
+
+def compact_map(latitudes, longitudes, names, max_features):
+    """
+    Génère la même carte avec la couche GeoJSON unique.
+
+    Args:
+        latitudes (np.ndarray): Latitudes des concurrents
+        longitudes (np.ndarray): Longitudes des concurrents
+        names (list): Noms des concurrents
+        max_features (int): Nombre maximal d'entités émises
+
+    Returns:
+        str: HTML de la carte
+    """
+    m = create_map(*CENTER)
+    FeatureLayer(STYLES, max_features=max_features).add_points(
+        latitudes, longitudes, "competitor", popups=names).add_to(m)
+    return m.get_root().render()
+
+
+def best_of(fn, repeat):
+    """
+    Mesure le meilleur temps d'exécution et renvoie le dernier résultat.
+
+    Args:
+        fn (callable): Fonction à mesurer
+        repeat (int): Nombre de répétitions
+
+    Returns:
+        tuple: Meilleur temps en secondes, résultat
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--counts", type=int, nargs="+", default=[100, 1000, 5000, 20000])
+    parser.add_argument("--max-features", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    print(f"{'entités':>8} | {'CircleMarker':>22} | {'GeoJSON unique':>22}")
+    for count in args.counts:
+        latitudes = CENTER[0] + rng.uniform(-0.01, 0.01, count)
+        longitudes = CENTER[1] + rng.uniform(-0.015, 0.015, count)
+        names = [f"Commerce {i}" for i in range(count)]
+
+        legacy_time, legacy_html = best_of(lambda: legacy_map(latitudes, longitudes, names), args.repeat)
+        compact_time, compact_html = best_of(
+            lambda: compact_map(latitudes, longitudes, names, args.max_features), args.repeat)
+        print(f"{count:>8} | {len(legacy_html) / 1e6:8.2f} Mo {legacy_time * 1000:8.0f} ms"
+              f" | {len(compact_html) / 1e6:8.2f} Mo {compact_time * 1000:8.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
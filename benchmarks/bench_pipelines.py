@@ -0,0 +1,379 @@
+"""
+Benchmark de bout en bout des analyses commerciale et pédologique.
+Chronomètre CommercialLocationService.analyze_location et
+SoilQualityService.analyze_soil en mode réel (use_mock=False), au total et
+par étape (geocode, geodata, ai, map, heatmap), sur les jeux OSM enregistrés
+(benchmarks/osm_fixtures.py). L'IA est servie par le serveur DeepSeek de
+substitution (benchmarks/deepseek_stub_server.py) : transport, lecture en flux
+et analyse des réponses sont mesurés sans réseau. Les visualisations sont
+régénérées à chaque itération (cache vide).
+
+Les résultats (p50, p95, moyenne en millisecondes, pic mémoire Python mesuré
+par tracemalloc lors d'une exécution séparée) sont émis en JSON et comparés à
+benchmarks/baseline.json : une médiane dépassant la référence de plus de la
+tolérance est signalée comme régression (code de sortie 1). La tolérance par
+défaut (50 %) couvre les variations d'une exécution à l'autre sur une machine
+partagée ; la référence doit être mise à jour sur la machine qui l'utilise.
+
+La référence est construite sur les jeux enregistrés : --record enregistre
+d'abord les jeux absents (accès réseau requis), et --update-baseline refuse
+les jeux synthétiques sauf avec --synthetic-baseline (machine sans accès à
+OpenStreetMap ; la comparaison ne porte alors que sur des mesures synthétiques).
+
+Usage:
+    python benchmarks/bench_pipelines.py [--fixtures small medium dense] [--pipelines commercial soil]
+        [--repeat 5] [--output results.json] [--tolerance 0.5] [--record] [--update-baseline]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import tracemalloc
+from concurrent.futures import Future
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from deepseek_stub_server import DeepseekStubServer, StubConfig
+from osm_fixtures import FIXTURES, is_recorded, load_fixture, record_fixture
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+STAGES = ("geocode", "geodata", "ai", "map", "heatmap")
+PIPELINES = ("commercial", "soil")
+
+BUSINESS_TYPE = "Pharmacie"
+CROP_TYPE = "blé"
+
+# Écart absolu en dessous duquel une médiane n'est pas une régression (bruit de mesure)
+MIN_REGRESSION_MS = 20.0
+
+
+class StageTimer:
+    """
+    Durées cumulées par étape pendant une analyse.
+    """
+    def __init__(self):
+        self.durations = {}
+
+    def add(self, stage, seconds):
+        self.durations[stage] = self.durations.get(stage, 0.0) + seconds
+
+    def wrap(self, stage, fn):
+        """
+        Chronomètre chaque appel de `fn`.
+        """
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        return timed
+
+    def wrap_iterator(self, stage, fn):
+        """
+        Chronomètre le temps passé à produire les éléments d'un générateur
+        (sans le traitement de chaque élément par l'appelant).
+        """
+        def timed(*args, **kwargs):
+            iterator = iter(fn(*args, **kwargs))
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    self.add(stage, time.perf_counter() - start)
+                    return
+                self.add(stage, time.perf_counter() - start)
+                yield item
+        return timed
+
+    def wrap_future(self, stage, fn):
+        """
+        Chronomètre un rendu asynchrone, de la soumission à la fin du Future.
+        """
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            inner = fn(*args, **kwargs)
+            outer = Future()
+
+            def finish(done):
+                self.add(stage, time.perf_counter() - start)
+                if done.exception() is not None:
+                    outer.set_exception(done.exception())
+                else:
+                    outer.set_result(done.result())
+
+            inner.add_done_callback(finish)
+            return outer
+        return timed
+
+
+class FixtureGeocoder:
+    """
+    Géocodage enregistré d'un jeu de données (même interface que GeocodeCache).
+    """
+    def __init__(self, geocoded):
+        self.geocoded = geocoded
+
+    def geocode(self, location_name):
+        return self.geocoded
+
+
+def build_service(pipeline, fixture, deepseek_client, timer):
+    """
+    Crée le service d'analyse branché sur le jeu de données et instrumenté par étape.
+
+    Args:
+        pipeline (str): 'commercial' ou 'soil'
+        fixture (dict): Jeu de données (voir load_fixture)
+        deepseek_client (DeepseekClient): Client de l'IA
+        timer (StageTimer): Chronomètre des étapes
+
+    Returns:
+        CommercialLocationService | SoilQualityService: Service instrumenté
+    """
+    from src.utils.render_pool import get_render_pool
+    geocoder = FixtureGeocoder(fixture["geocode"])
+    geocoder.geocode = timer.wrap("geocode", geocoder.geocode)
+
+    if pipeline == "commercial":
+        from src.services.commercial_location_service import CommercialLocationService
+        service = CommercialLocationService(use_mock=False, geocode_cache=geocoder,
+                                            extract_index=fixture["index"], render_pool=get_render_pool(),
+                                            deepseek_client=deepseek_client)
+        service._get_geographic_data = timer.wrap("geodata", service._get_geographic_data)
+        service._submit_heatmap = timer.wrap_future("heatmap", service._submit_heatmap)
+        deepseek_client.stream_commercial_location = timer.wrap_iterator(
+            "ai", deepseek_client.stream_commercial_location)
+    else:
+        from src.services.soil_quality_service import SoilQualityService
+        service = SoilQualityService(use_mock=False, geocode_cache=geocoder, render_pool=get_render_pool(),
+                                     deepseek_client=deepseek_client)
+        service._get_soil_data = timer.wrap("geodata", service._get_soil_data)
+        service._submit_soil_quality_map = timer.wrap_future("heatmap", service._submit_soil_quality_map)
+        deepseek_client.stream_soil_quality = timer.wrap_iterator(
+            "ai", deepseek_client.stream_soil_quality)
+    service._generate_interactive_map = timer.wrap("map", service._generate_interactive_map)
+    return service
+
+
+def run_once(pipeline, service, fixture, output_dir):
+    """
+    Exécute une analyse avec un cache de visualisations vide.
+
+    Returns:
+        float: Durée totale en secondes
+    """
+    from src.utils.visualization_cache import VisualizationCache
+    service.visualization_cache = VisualizationCache(directory=tempfile.mkdtemp(dir=output_dir))
+    if pipeline == "commercial":
+        from src.models.commercial_location import CommercialLocation
+        subject = CommercialLocation(location_name=fixture["place"], business_type=BUSINESS_TYPE,
+                                     radius=fixture["radius"])
+        analyze = service.analyze_location
+    else:
+        from src.models.soil_quality import SoilQuality
+        subject = SoilQuality(location_name=fixture["place"], crop_type=CROP_TYPE)
+        analyze = service.analyze_soil
+
+    start = time.perf_counter()
+    result = analyze(subject)
+    elapsed = time.perf_counter() - start
+    if "error" in result.scores:
+        raise RuntimeError(f"Échec de l'analyse {pipeline}/{fixture['name']}: {result.recommendations}")
+    return elapsed
+
+
+def summarize(samples):
+    """
+    Résume des durées en secondes.
+
+    Returns:
+        dict: p50, p95 et moyenne en millisecondes
+    """
+    values = np.asarray(samples) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(values, 50)), 2),
+        "p95_ms": round(float(np.percentile(values, 95)), 2),
+        "mean_ms": round(float(values.mean()), 2)
+    }
+
+
+def bench_pipeline(pipeline, fixture, server_url, repeat, warmup, output_dir):
+    """
+    Mesure une analyse sur un jeu de données.
+
+    Returns:
+        dict: Jeu de données, durées totales et par étape, pic mémoire
+    """
+    from src.utils.deepseek_client import DeepseekClient
+    timer = StageTimer()
+    client = DeepseekClient(api_key="benchmark", use_mock=False, api_url=server_url, use_cache=False)
+    service = build_service(pipeline, fixture, client, timer)
+
+    for _ in range(warmup):
+        run_once(pipeline, service, fixture, output_dir)
+
+    totals = []
+    stages = {stage: [] for stage in STAGES}
+    for _ in range(repeat):
+        timer.durations = {}
+        totals.append(run_once(pipeline, service, fixture, output_dir))
+        for stage in STAGES:
+            stages[stage].append(timer.durations.get(stage, 0.0))
+
+    # Pic mémoire mesuré à part : tracemalloc ralentit l'exécution
+    tracemalloc.start()
+    try:
+        run_once(pipeline, service, fixture, output_dir)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "fixture": {"name": fixture["name"], "source": fixture["source"], "place": fixture["place"],
+                    "radius": fixture["radius"], "pois": fixture["pois_count"], "nodes": fixture["nodes_count"]},
+        "total": summarize(totals),
+        "stages": {stage: summarize(samples) for stage, samples in stages.items()},
+        "peak_memory_mb": round(peak / 2 ** 20, 1)
+    }
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare les médianes et le pic mémoire à la référence.
+
+    Une médiane est une régression si elle dépasse à la fois la médiane de
+    référence majorée de la tolérance, le p95 de référence (bruit de mesure
+    déjà observé) et la médiane de référence de plus de MIN_REGRESSION_MS.
+    Seules les mesures sur un jeu de même source (enregistré ou synthétique)
+    sont comparées.
+
+    Args:
+        results (dict): Résultats par analyse ('commercial/small', ...)
+        baseline (dict): Référence (même structure)
+        tolerance (float): Dépassement relatif toléré
+
+    Returns:
+        tuple: Comparaison par analyse, liste des régressions
+    """
+    def timing(current, reference):
+        threshold = max(reference["p50_ms"] * (1 + tolerance), reference["p95_ms"],
+                        reference["p50_ms"] + MIN_REGRESSION_MS)
+        return current["p50_ms"], reference["p50_ms"], threshold
+
+    comparison = {}
+    regressions = []
+    for key, result in results.items():
+        reference = baseline.get(key)
+        if reference is None or reference["fixture"]["source"] != result["fixture"]["source"]:
+            continue
+        entries = {"total": timing(result["total"], reference["total"])}
+        for stage in STAGES:
+            if stage in reference["stages"]:
+                entries[stage] = timing(result["stages"][stage], reference["stages"][stage])
+        memory = reference["peak_memory_mb"]
+        entries["peak_memory_mb"] = (result["peak_memory_mb"], memory, max(memory * (1 + tolerance), memory + 1.0))
+
+        comparison[key] = {}
+        for name, (value, base, threshold) in entries.items():
+            regression = value > threshold
+            comparison[key][name] = {"value": value, "baseline": base, "threshold": round(threshold, 2),
+                                     "ratio": round(value / base, 3) if base else None,
+                                     "regression": regression}
+            if regression:
+                regressions.append(f"{key}:{name}")
+    return comparison, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--fixtures", nargs="+", default=list(FIXTURES), choices=list(FIXTURES))
+    parser.add_argument("--pipelines", nargs="+", default=list(PIPELINES), choices=list(PIPELINES))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--recorded-only", action="store_true",
+                        help="Refuse les jeux synthétiques (jeux enregistrés obligatoires)")
+    parser.add_argument("--ai-latency", default="fixed:0",
+                        help="Latence du serveur DeepSeek de substitution (voir deepseek_stub_server)")
+    parser.add_argument("--output", help="Fichier JSON des résultats (sortie standard par défaut)")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.5)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--record", action="store_true",
+                        help="Enregistre les jeux absents depuis OpenStreetMap avant la mesure")
+    parser.add_argument("--synthetic-baseline", action="store_true",
+                        help="Autorise une référence mesurée sur des jeux synthétiques")
+    args = parser.parse_args()
+
+    if args.record:
+        for name in args.fixtures:
+            if not is_recorded(name):
+                print(f"Enregistrement du jeu {name}...", file=sys.stderr)
+                record_fixture(name)
+    missing = [name for name in args.fixtures if not is_recorded(name)]
+    if args.update_baseline and missing and not args.synthetic_baseline:
+        parser.error(f"jeux non enregistrés: {', '.join(missing)} "
+                     f"(--record pour les enregistrer, --synthetic-baseline pour une référence synthétique)")
+    recorded_only = args.recorded_only or (args.update_baseline and not args.synthetic_baseline)
+
+    server = DeepseekStubServer(config=StubConfig(latency=args.ai_latency, seed=0)).start()
+    output_dir = tempfile.mkdtemp(prefix="bench_pipelines_")
+    results = {}
+    try:
+        for name in args.fixtures:
+            fixture = load_fixture(name, allow_synthetic=not recorded_only)
+            for pipeline in args.pipelines:
+                key = f"{pipeline}/{name}"
+                results[key] = bench_pipeline(pipeline, fixture, server.url, args.repeat, args.warmup, output_dir)
+                stages = "  ".join(f"{stage} {results[key]['stages'][stage]['p50_ms']:.0f}" for stage in STAGES)
+                print(f"{key:<18} ({fixture['source']}) p50 {results[key]['total']['p50_ms']:8.0f} ms"
+                      f"  p95 {results[key]['total']['p95_ms']:8.0f} ms  [{stages}]"
+                      f"  pic {results[key]['peak_memory_mb']:.0f} Mo", file=sys.stderr)
+    finally:
+        server.stop()
+        shutil.rmtree(output_dir, ignore_errors=True)
+        from src.utils.render_pool import get_render_pool
+        get_render_pool().shutdown()
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "ai_latency": args.ai_latency
+        },
+        "results": results
+    }
+
+    regressions = []
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"meta": report["meta"], "results": results}, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"Référence mise à jour: {args.baseline}", file=sys.stderr)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        report["comparison"], regressions = compare(results, baseline["results"], args.tolerance)
+        report["regressions"] = regressions
+        print(f"Régressions (tolérance {args.tolerance:.0%}): {', '.join(regressions) or 'aucune'}", file=sys.stderr)
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+"""
+Serveur local compatible avec l'API DeepSeek (/v1/chat/completions).
+Remplace l'API réelle pour les tests de charge en mode use_mock=False : le
+transport HTTP, les relances, la lecture en flux et l'analyse des réponses
+sont exercés sans réseau. Les réponses sont des objets JSON conformes aux
+prompts commerciaux et agronomiques, déterministes pour un prompt donné. La
+latence (distribution), le débit de jetons et les erreurs 429/5xx injectées
+sont configurables.
+
+Usage:
+    python benchmarks/deepseek_stub_server.py [--port 8800] [--latency lognormal:0.8,0.5]
+        [--tokens-per-second 200] [--rate-429 0.05] [--rate-5xx 0.02] [--think]
+    export DEEPSEEK_API_URL=http://127.0.0.1:8800/v1   # clients DeepseekClient(use_mock=False)
+
+Distributions de latence (délai avant le premier jeton, en secondes) :
+    fixed:D, uniform:MIN,MAX, normal:MOYENNE,ÉCART_TYPE, lognormal:MÉDIANE,SIGMA
+"""
+import re
+import sys
+import json
+import math
+import time
+import random
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+COMPLETIONS_PATHS = ("/v1/chat/completions", "/chat/completions")
+
+# Découpage du contenu en jetons (un mot et l'espace qui le précède)
+TOKEN_PATTERN = re.compile(r"\s*\S+")
+
+
+def latency_sampler(spec):
+    """
+    Construit le tirage des latences à partir de sa description.
+
+    Args:
+        spec (str): Distribution, par exemple 'fixed:0.5' ou 'lognormal:0.8,0.5'
+
+    Returns:
+        callable: Fonction sans argument renvoyant une latence en secondes (>= 0)
+
+    Raises:
+        ValueError: Si la distribution est inconnue ou mal paramétrée
+    """
+    name, _, args = spec.partition(":")
+    values = [float(value) for value in args.split(",") if value]
+    distributions = {
+        "fixed": (1, lambda d: d),
+        "uniform": (2, random.uniform),
+        "normal": (2, random.gauss),
+        "lognormal": (2, lambda median, sigma: random.lognormvariate(math.log(median), sigma))
+    }
+    if name not in distributions or len(values) != distributions[name][0]:
+        raise ValueError(f"Distribution de latence invalide: {spec}")
+    draw = distributions[name][1]
+    return lambda: max(0.0, draw(*values))
+
+
+def prompt_field(prompt, label):
+    """
+    Extrait la valeur d'une ligne 'Libellé: valeur' du prompt.
+    """
+    match = re.search(rf"{label}\s*:\s*(.+)", prompt)
+    return match.group(1).strip() if match else ""
+
+
+def completion_content(prompt, think=False):
+    """
+    Construit la réponse du modèle à un prompt de l'application.
+
+    Les scores sont tirés de façon déterministe à partir du prompt, de sorte
+    qu'une même demande renvoie toujours la même réponse.
+
+    Args:
+        prompt (str): Prompt envoyé par DeepseekClient
+        think (bool): Si True, précède le JSON d'un bloc <think>...</think> et d'un
+            préambule citant des objets JSON
+
+    Returns:
+        str: Contenu de la réponse (JSON, éventuellement précédé du raisonnement)
+    """
+    rng = random.Random(hashlib.sha256(prompt.encode("utf-8")).hexdigest())
+    location = prompt_field(prompt, "Localisation") or "la zone"
+
+    def score():
+        return round(rng.uniform(4.0, 9.5), 1)
+
+    if "Type de culture" in prompt:
+        crop = prompt_field(prompt, "Type de culture") or "la culture"
+        compatibility = {name: score() for name in ("ph_score", "drainage_score", "texture_score", "organic_score")}
+        compatibility = {"global_score": round(sum(compatibility.values()) / 4, 1), **compatibility}
+        data = {
+            "compatibility": compatibility,
+            "zones": [
+                {"name": f"Zone {label}", "quality": quality, "score": score(),
+                 "characteristics": f"Sol {quality} pour {crop} à {location}"}
+                for label, quality in (("A", "optimal"), ("B", "intermédiaire"), ("C", "peu adapté"))
+            ],
+            "recommendations": [
+                f"Corriger le pH des parcelles de {location} avant la plantation de {crop}",
+                "Améliorer le drainage des zones intermédiaires",
+                "Apporter de la matière organique sur les zones peu adaptées"
+            ]
+        }
+    else:
+        business = prompt_field(prompt, "Type de commerce") or "le commerce"
+        scores = {name: score() for name in ("poi_score", "road_score", "competition_score")}
+        scores = {"global_score": round(sum(scores.values()) / 3, 1), **scores}
+        data = {
+            "scores": scores,
+            "hotspots": [
+                {"name": f"Emplacement {index + 1}", "score": score(),
+                 "advantages": f"Bonne visibilité pour {business}",
+                 "disadvantages": "Concurrence à proximité"}
+                for index in range(3)
+            ],
+            "recommendations": [
+                f"Privilégier les axes passants de {location} pour {business}",
+                "Se différencier des concurrents par les horaires d'ouverture",
+                "Renforcer la signalétique depuis les transports en commun"
+            ]
+        }
+
+    content = json.dumps(data, ensure_ascii=False, indent=2)
+    if think:
+        # Comme le modèle réel, le raisonnement et le préambule citent des objets JSON valides
+        weights = json.dumps({"localisation": location, "facteurs": 4}, ensure_ascii=False)
+        content = (f"<think>Analyse de {location} : pondération des facteurs {weights}.</think>\n"
+                   f"Paramètres retenus : {weights}\n{content}")
+    return content
+
+
+class StubConfig:
+    """
+    Comportement du serveur (latence, débit, erreurs injectées).
+    """
+    def __init__(self,
+                 latency="fixed:0",
+                 tokens_per_second=0.0,
+                 rate_429=0.0,
+                 rate_5xx=0.0,
+                 retry_after=1.0,
+                 think=False,
+                 seed=None):
+        """
+        Args:
+            latency (str): Distribution du délai avant le premier jeton (voir latency_sampler)
+            tokens_per_second (float): Débit de génération (0 : contenu envoyé d'un bloc)
+            rate_429 (float): Proportion de requêtes refusées avec un statut 429
+            rate_5xx (float): Proportion de requêtes en erreur 500/502/503
+            retry_after (float): Valeur de l'en-tête Retry-After des réponses 429 (secondes)
+            think (bool): Si True, le contenu commence par un bloc <think> et un préambule
+            seed (int, optional): Graine du tirage des latences et des erreurs
+        """
+        self.latency = latency_sampler(latency)
+        self.tokens_per_second = tokens_per_second
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.retry_after = retry_after
+        self.think = think
+        if seed is not None:
+            random.seed(seed)
+
+
+class StubRequestHandler(BaseHTTPRequestHandler):
+    """
+    Traitement des requêtes de complétion.
+    """
+    protocol_version = "HTTP/1.1"
+    server: "DeepseekStubServer"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            self._send_json(200, self.server.stats())
+        else:
+            self._send_json(404, {"error": {"message": "Not found"}})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.path not in COMPLETIONS_PATHS:
+            self._send_json(404, {"error": {"message": "Not found"}})
+            return
+        try:
+            request = json.loads(body)
+            prompt = "\n".join(message.get("content", "") for message in request["messages"])
+        except (ValueError, KeyError, TypeError, AttributeError):
+            self._send_json(400, {"error": {"message": "Invalid request body"}})
+            return
+
+        config = self.server.config
+        draw = random.random()
+        if draw < config.rate_429:
+            self.server.count("429")
+            self._send_json(429, {"error": {"message": "Rate limit reached"}},
+                            {"Retry-After": f"{config.retry_after:g}"})
+            return
+        if draw < config.rate_429 + config.rate_5xx:
+            status = random.choice((500, 502, 503))
+            self.server.count(str(status))
+            self._send_json(status, {"error": {"message": "Server error"}})
+            return
+
+        self.server.count("200")
+        time.sleep(config.latency())
+        content = completion_content(prompt, config.think)
+        tokens = TOKEN_PATTERN.findall(content)
+        if request.get("stream"):
+            self._stream(request, tokens)
+            return
+        if config.tokens_per_second:
+            time.sleep(len(tokens) / config.tokens_per_second)
+        self._send_json(200, {
+            "id": f"chatcmpl-{random.getrandbits(48):x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "deepseek-r1"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                         "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(TOKEN_PATTERN.findall(prompt)), "completion_tokens": len(tokens),
+                      "total_tokens": len(TOKEN_PATTERN.findall(prompt)) + len(tokens)}
+        })
+
+    def _stream(self, request, tokens):
+        """
+        Envoie le contenu jeton par jeton (événements SSE, fin par [DONE]).
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        chunk_id = f"chatcmpl-{random.getrandbits(48):x}"
+        delay = 1 / self.server.config.tokens_per_second if self.server.config.tokens_per_second else 0
+        try:
+            for index, token in enumerate(tokens):
+                if delay:
+                    time.sleep(delay)
+                delta = {"content": token}
+                if index == 0:
+                    delta["role"] = "assistant"
+                self._write_chunk(chunk_id, request, delta, None)
+            self._write_chunk(chunk_id, request, {}, "stop")
+            self._write_event("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def _write_chunk(self, chunk_id, request, delta, finish_reason):
+        self._write_event(json.dumps({
+            "id": chunk_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": request.get("model", "deepseek-r1"),
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+        }, ensure_ascii=False))
+
+    def _write_event(self, data):
+        payload = f"data: {data}\n\n".encode("utf-8")
+        self.wfile.write(f"{len(payload):x}\r\n".encode("ascii") + payload + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status, data, headers=None):
+        payload = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class DeepseekStubServer(ThreadingHTTPServer):
+    """
+    Serveur de substitution, utilisable en ligne de commande ou dans un benchmark.
+
+    Exemple:
+        server = DeepseekStubServer(config=StubConfig(latency="uniform:0.1,0.3"))
+        server.start()
+        client = DeepseekClient(use_mock=False, api_url=server.url)
+        ...
+        server.stop()
+    """
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, config=None, verbose=False):
+        """
+        Args:
+            host (str): Adresse d'écoute
+            port (int): Port d'écoute (0 : port libre choisi par le système)
+            config (StubConfig, optional): Comportement du serveur
+            verbose (bool): Si True, journalise chaque requête
+        """
+        super().__init__((host, port), StubRequestHandler)
+        self.config = config or StubConfig()
+        self.verbose = verbose
+        self._lock = threading.Lock()
+        self._statuses = {}
+        self._thread = None
+
+    @property
+    def url(self):
+        """
+        URL de base à utiliser comme DeepseekClient.api_url.
+        """
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def handle_error(self, request, client_address):
+        # Connexions keep-alive fermées par le client : sans intérêt pour un test de charge
+        if isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            return
+        super().handle_error(request, client_address)
+
+    def count(self, status):
+        with self._lock:
+            self._statuses[status] = self._statuses.get(status, 0) + 1
+
+    def stats(self):
+        """
+        Renvoie le nombre de réponses par statut.
+        """
+        with self._lock:
+            return {"requests": sum(self._statuses.values()), "statuses": dict(self._statuses)}
+
+    def start(self):
+        """
+        Démarre le serveur dans un thread d'arrière-plan.
+        """
+        self._thread = threading.Thread(target=self.serve_forever, name="deepseek-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Arrête le serveur et ferme sa socket.
+        """
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--latency", default="fixed:0", help="Distribution du délai avant le premier jeton")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-5xx", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--think", action="store_true", help="Précède le JSON d'un bloc <think>")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    config = StubConfig(latency=args.latency, tokens_per_second=args.tokens_per_second,
+                        rate_429=args.rate_429, rate_5xx=args.rate_5xx, retry_after=args.retry_after,
+                        think=args.think, seed=args.seed)
+    server = DeepseekStubServer(args.host, args.port, config, verbose=args.verbose)
+    print(f"Serveur DeepSeek de substitution : {server.url} (DEEPSEEK_API_URL={server.url})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+Jeux de données OSM enregistrés pour les benchmarks des analyses.
+Trois zones de densité croissante (petite ville, ville moyenne, centre de
+métropole) sont enregistrées une fois depuis OpenStreetMap au format de
+l'index hors ligne (OSMExtractIndex : POI en GeoParquet, réseau en GraphML),
+accompagnées de leur géocodage : les benchmarks s'exécutent ensuite sans
+réseau, sur des données identiques d'une exécution à l'autre.
+
+Sans enregistrement (machine hors ligne, CI), un jeu synthétique déterministe
+de même taille (grille de rues et POI) est généré ; les résultats indiquent
+alors la source 'synthetic'. Les jeux enregistrés (quelques Mo) sont à
+versionner dans benchmarks/fixtures/, et la référence reconstruite à partir
+d'eux (python benchmarks/bench_pipelines.py --record --update-baseline).
+
+Usage:
+    python benchmarks/osm_fixtures.py record [--missing] [small medium dense]
+"""
+import os
+import sys
+import json
+import time
+import argparse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+GEOCODE_FILE = "geocode.json"
+
+# Zones enregistrées : lieu, centre, rayon d'analyse et demi-côté de l'emprise (mètres),
+# et paramètres du jeu synthétique équivalent (pas de la grille de rues, nombre de POI)
+FIXTURES = {
+    "small": {
+        "place": "Figeac, France",
+        "latitude": 44.6086, "longitude": 2.0317,
+        "radius": 300, "half_size": 700,
+        "street_spacing": 90, "pois": 150
+    },
+    "medium": {
+        "place": "Tours, France",
+        "latitude": 47.3941, "longitude": 0.6848,
+        "radius": 500, "half_size": 1000,
+        "street_spacing": 70, "pois": 1000
+    },
+    "dense": {
+        "place": "Paris 11e Arrondissement, France",
+        "latitude": 48.8590, "longitude": 2.3800,
+        "radius": 800, "half_size": 1300,
+        "street_spacing": 50, "pois": 5000
+    }
+}
+
+# Tags des POI synthétiques (clé OSM, valeur) et leur fréquence relative
+SYNTHETIC_TAGS = (
+    ("amenity", "restaurant", 0.2), ("amenity", "cafe", 0.1), ("amenity", "pharmacy", 0.05),
+    ("amenity", "bank", 0.05), ("shop", "bakery", 0.1), ("shop", "supermarket", 0.05),
+    ("shop", "clothes", 0.15), ("healthcare", "doctor", 0.05), ("building", "yes", 0.2),
+    ("highway", "bus_stop", 0.05)
+)
+
+METERS_PER_DEGREE = 111320.0
+
+
+def fixture_path(name):
+    """
+    Répertoire du jeu enregistré.
+    """
+    return os.path.join(FIXTURES_DIR, name)
+
+
+def is_recorded(name):
+    """
+    Indique si le jeu a été enregistré depuis OpenStreetMap.
+    """
+    return os.path.exists(os.path.join(fixture_path(name), GEOCODE_FILE))
+
+
+def load_fixture(name, allow_synthetic=True):
+    """
+    Charge un jeu de données (enregistré s'il existe, synthétique sinon).
+
+    Args:
+        name (str): Nom du jeu ('small', 'medium', 'dense')
+        allow_synthetic (bool): Si False, un jeu non enregistré est une erreur
+
+    Returns:
+        dict: Définition du jeu, index OSM ('index'), géocodage ('geocode')
+            et source ('recorded' ou 'synthetic')
+
+    Raises:
+        FileNotFoundError: Si le jeu n'est pas enregistré et que allow_synthetic est False
+    """
+    from src.utils.osm_extract_index import OSMExtractIndex
+
+    fixture = dict(FIXTURES[name], name=name)
+    directory = fixture_path(name)
+    if is_recorded(name):
+        with open(os.path.join(directory, GEOCODE_FILE), "r", encoding="utf-8") as f:
+            fixture["geocode"] = json.load(f)
+        fixture["index"] = OSMExtractIndex.load(directory)
+        fixture["source"] = "recorded"
+    elif allow_synthetic:
+        fixture["index"] = synthesize_index(name)
+        fixture["geocode"] = {"found": True, "query": fixture["place"],
+                              "latitude": fixture["latitude"], "longitude": fixture["longitude"]}
+        fixture["source"] = "synthetic"
+    else:
+        raise FileNotFoundError(f"Jeu de données non enregistré: {directory} "
+                                f"(python benchmarks/osm_fixtures.py record {name})")
+
+    fixture["pois_count"] = len(fixture["index"].pois)
+    graph = fixture["index"]._get_full_graph()
+    fixture["nodes_count"] = graph.number_of_nodes() if graph is not None else 0
+    return fixture
+
+
+def record_fixture(name):
+    """
+    Enregistre un jeu de données depuis OpenStreetMap (accès réseau requis).
+
+    Args:
+        name (str): Nom du jeu
+
+    Returns:
+        OSMExtractIndex: Index enregistré
+    """
+    import tempfile
+    import geopandas as gpd
+    from src.utils.geocode_cache import GeocodeCache
+    from src.utils.osm_tile_cache import OSMTileCache
+    from src.utils.osm_extract_index import DEFAULT_TAG_KEYS, OSMExtractIndex
+    from src.utils.site_dataset import POI_TAGS
+
+    fixture = FIXTURES[name]
+    with tempfile.TemporaryDirectory() as cache_dir:
+        geocoded = GeocodeCache(db_path=os.path.join(cache_dir, "geocode.sqlite")).geocode(fixture["place"])
+        tile_cache = OSMTileCache(cache_dir=cache_dir)
+        center = (fixture["latitude"], fixture["longitude"], fixture["half_size"])
+        G = tile_cache.get_graph(*center)
+        pois = tile_cache.get_pois(*center, POI_TAGS).reset_index()
+
+    # Même format que OSMExtractIndex.ingest : nom et tags utiles en colonnes catégorielles
+    columns = [column for column in ("name",) + DEFAULT_TAG_KEYS if column in pois.columns]
+    pois = gpd.GeoDataFrame(pois[columns].astype(str).where(pois[columns].notna()).astype("category"),
+                            geometry=pois.geometry.values, crs="epsg:4326")
+    index = OSMExtractIndex(pois, graph=G, version=f"fixture-{name}-{time.strftime('%Y%m%d')}")
+    index.save(fixture_path(name))
+    with open(os.path.join(fixture_path(name), GEOCODE_FILE), "w", encoding="utf-8") as f:
+        json.dump(geocoded, f, ensure_ascii=False)
+    return index
+
+
+def synthesize_index(name, seed=42):
+    """
+    Génère un jeu synthétique déterministe de la taille d'un jeu enregistré.
+
+    Le réseau est une grille de rues (voies principales toutes les cinq rues),
+    les POI sont répartis autour du centre avec une densité décroissante.
+
+    Args:
+        name (str): Nom du jeu
+        seed (int): Graine du générateur
+
+    Returns:
+        OSMExtractIndex: Index en mémoire
+    """
+    import networkx as nx
+    import pandas as pd
+    import geopandas as gpd
+    from src.utils.osm_extract_index import OSMExtractIndex
+
+    fixture = FIXTURES[name]
+    rng = np.random.default_rng(seed)
+    lat0, lon0 = fixture["latitude"], fixture["longitude"]
+    lat_step = fixture["street_spacing"] / METERS_PER_DEGREE
+    lon_step = lat_step / np.cos(np.radians(lat0))
+    steps = int(fixture["half_size"] // fixture["street_spacing"])
+
+    G = nx.MultiDiGraph(crs="epsg:4326")
+    edge_id = 0
+    for i in range(-steps, steps + 1):
+        for j in range(-steps, steps + 1):
+            G.add_node((i + steps) * (2 * steps + 1) + (j + steps), y=lat0 + i * lat_step, x=lon0 + j * lon_step,
+                       street_count=4)
+    for i in range(-steps, steps + 1):
+        for j in range(-steps, steps + 1):
+            node = (i + steps) * (2 * steps + 1) + (j + steps)
+            for di, dj in ((0, 1), (1, 0)):
+                if i + di > steps or j + dj > steps:
+                    continue
+                neighbor = (i + di + steps) * (2 * steps + 1) + (j + dj + steps)
+                main_road = (i % 5 == 0 and di == 0) or (j % 5 == 0 and dj == 0)
+                attributes = {"length": float(fixture["street_spacing"]), "oneway": False,
+                              "highway": "primary" if main_road else "residential",
+                              "osmid": edge_id}
+                G.add_edge(node, neighbor, **attributes)
+                G.add_edge(neighbor, node, **attributes)
+                edge_id += 1
+
+    count = fixture["pois"]
+    distances = np.abs(rng.normal(0, fixture["half_size"] / 2.5, count)).clip(0, fixture["half_size"])
+    angles = rng.uniform(0, 2 * np.pi, count)
+    latitudes = lat0 + distances * np.sin(angles) / METERS_PER_DEGREE
+    longitudes = lon0 + distances * np.cos(angles) / (METERS_PER_DEGREE * np.cos(np.radians(lat0)))
+    weights = np.array([weight for _, _, weight in SYNTHETIC_TAGS])
+    choices = rng.choice(len(SYNTHETIC_TAGS), size=count, p=weights / weights.sum())
+
+    columns = {"name": [f"POI {index}" for index in range(count)]}
+    for key in dict.fromkeys(key for key, _, _ in SYNTHETIC_TAGS):
+        columns[key] = [SYNTHETIC_TAGS[choice][1] if SYNTHETIC_TAGS[choice][0] == key else None
+                        for choice in choices]
+    pois = gpd.GeoDataFrame(pd.DataFrame(columns).astype("category"),
+                            geometry=gpd.points_from_xy(longitudes, latitudes), crs="epsg:4326")
+    return OSMExtractIndex(pois, graph=G, version=f"synthetic-{name}-{seed}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Enregistre les jeux de données OSM des benchmarks.")
+    parser.add_argument("command", choices=["record"])
+    parser.add_argument("names", nargs="*", default=list(FIXTURES), choices=list(FIXTURES))
+    parser.add_argument("--missing", action="store_true", help="N'enregistre que les jeux absents")
+    args = parser.parse_args()
+
+    for name in args.names:
+        if args.missing and is_recorded(name):
+            continue
+        start = time.perf_counter()
+        index = record_fixture(name)
+        graph = index._get_full_graph()
+        print(f"{name}: {len(index.pois)} POI, {graph.number_of_nodes()} nœuds "
+              f"enregistrés dans {fixture_path(name)} en {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
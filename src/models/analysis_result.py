@@ -1,6 +1,7 @@
 """
 Modèle pour les résultats d'analyse et les recommandations.
 """
+import uuid
 from datetime import datetime
 
 class AnalysisResult:
@@ -16,7 +17,7 @@ class AnalysisResult:
             analysis_type (str): Type d'analyse ('commercial' ou 'soil')
             created_at (datetime): Date de création du résultat
         """
-        self.result_id = result_id or f"result_{int(datetime.now().timestamp())}"
+        self.result_id = result_id or f"result_{int(datetime.now().timestamp())}_{uuid.uuid4().hex[:8]}"
         self.analysis_type = analysis_type
         self.created_at = created_at or datetime.now()
         self.scores = {}
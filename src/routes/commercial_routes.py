@@ -1,10 +1,13 @@
 """
 Routes pour l'API d'analyse d'emplacements commerciaux.
 """
-from flask import Blueprint, request, jsonify, render_template, redirect, url_for
+from flask import Blueprint, request, jsonify, render_template, redirect, url_for, Response, stream_with_context
 import json
+import time
 from src.services.commercial_location_service import CommercialLocationService
 from src.models.commercial_location import CommercialLocation
+from src.utils.job_queue import QueueFullError, get_job_queue
+from src.utils.sse import SSE_HEADERS, analysis_event_stream
 
 # Créer un blueprint pour les routes commerciales
 commercial_bp = Blueprint('commercial', __name__)
@@ -12,6 +15,24 @@ commercial_bp = Blueprint('commercial', __name__)
 # Initialiser le service
 commercial_service = CommercialLocationService(use_mock=True)
 
+def run_analysis_job(params, progress):
+    """
+    Exécute une analyse soumise à la file de tâches.
+    
+    Args:
+        params (dict): Paramètres de la tâche ('location' : emplacement sérialisé)
+        progress (callable): Callback d'avancement de la tâche
+        
+    Returns:
+        dict: Résultat de l'analyse
+    """
+    location = CommercialLocation.from_dict(params['location'])
+    return commercial_service.analyze_location(location, progress_callback=progress).to_dict()
+
+# File de tâches des analyses asynchrones
+job_queue = get_job_queue()
+job_queue.register('commercial', run_analysis_job)
+
 @commercial_bp.route('/')
 def index():
     """
@@ -67,6 +88,10 @@ def analyze():
 def api_analyze():
     """
     Endpoint API pour analyser un emplacement commercial.
+    
+    Avec "async": true (ou ?async=1), l'analyse est confiée à la file de tâches
+    et la réponse (202) contient l'identifiant de la tâche à suivre via
+    /api/jobs/<job_id>.
     """
     try:
         # Récupérer les données JSON
@@ -84,12 +109,196 @@ def api_analyze():
         if importance_factors:
             location.importance_factors = importance_factors
         
+        # Mode asynchrone : renvoyer immédiatement l'identifiant de la tâche
+        if data.get('async') or request.args.get('async') in ('1', 'true'):
+            job = job_queue.submit('commercial', {'location': location.to_dict()})
+            return jsonify({
+                'job_id': job['job_id'],
+                'status': job['status'],
+                'status_url': url_for('commercial.api_job', job_id=job['job_id'])
+            }), 202
+        
         # Analyser l'emplacement
         result = commercial_service.analyze_location(location)
         
         # Renvoyer les résultats
         return jsonify(result.to_dict())
         
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@commercial_bp.route('/api/jobs/<job_id>')
+def api_job(job_id):
+    """
+    Endpoint API renvoyant l'état d'une analyse asynchrone : statut, avancement
+    par étape et, une fois terminée, le résultat de l'analyse.
+    """
+    job = job_queue.get(job_id)
+    if job is None or job['kind'] != 'commercial':
+        return jsonify({'error': f"Tâche inconnue: {job_id}"}), 404
+    return jsonify(job)
+
+@commercial_bp.route('/api/analyze/stream', methods=['POST'])
+def api_analyze_stream():
+    """
+    Endpoint API pour analyser un emplacement commercial en flux SSE.
+    
+    Les résultats partiels sont envoyés dès que chaque étape se termine :
+    géocodage, données géographiques, scores, recommandations puis URL des
+    visualisations, suivis du résultat complet (événement 'result').
+    """
+    try:
+        # Récupérer les données JSON
+        data = request.get_json()
+        
+        # Créer un objet CommercialLocation
+        location = CommercialLocation(
+            location_name=data.get('location', ''),
+            business_type=data.get('business_type', ''),
+            radius=data.get('parameters', {}).get('radius', 500)
+        )
+        
+        # Récupérer les facteurs d'importance
+        importance_factors = data.get('parameters', {}).get('importance_factors', {})
+        if importance_factors:
+            location.importance_factors = importance_factors
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+    
+    events = commercial_service.analyze_location_events(location)
+    return Response(stream_with_context(analysis_event_stream(events)), 
+                    mimetype='text/event-stream', headers=SSE_HEADERS)
+
+@commercial_bp.route('/api/analyze/batch', methods=['POST'])
+def api_analyze_batch():
+    """
+    Endpoint API pour analyser plusieurs emplacements commerciaux.
+    
+    Les données géographiques sont récupérées une seule fois pour l'ensemble
+    des sites, et les résultats sont renvoyés en NDJSON (une ligne JSON par
+    site) au fur et à mesure de leur calcul, suivis d'une ligne de synthèse.
+    """
+    try:
+        # Récupérer les données JSON
+        data = request.get_json()
+        parameters = data.get('parameters', {})
+        sites = data.get('sites', [])
+        if not sites:
+            return jsonify({'error': "Aucun site à analyser"}), 400
+        
+        # Créer un objet CommercialLocation par site (les champs du site priment sur ceux du lot)
+        locations = []
+        for site in sites:
+            if isinstance(site, str):
+                site = {'location': site}
+            location = CommercialLocation(
+                location_name=site.get('location', ''),
+                business_type=site.get('business_type', data.get('business_type', '')),
+                latitude=float(site.get('latitude', 0.0)),
+                longitude=float(site.get('longitude', 0.0)),
+                radius=int(site.get('radius', parameters.get('radius', 500)))
+            )
+            importance_factors = site.get('importance_factors', parameters.get('importance_factors', {}))
+            if importance_factors:
+                location.importance_factors = importance_factors
+            locations.append(location)
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+    
+    def generate():
+        start = time.perf_counter()
+        completed = 0
+        errors = 0
+        for result in commercial_service.analyze_locations_batch(locations):
+            completed += 1
+            errors += 'error' in result
+            yield json.dumps(result, ensure_ascii=False, default=str) + "\n"
+        yield json.dumps({
+            'summary': {
+                'sites': len(locations),
+                'completed': completed,
+                'errors': errors,
+                'elapsed_seconds': round(time.perf_counter() - start, 3)
+            }
+        }) + "\n"
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@commercial_bp.route('/api/reweight', methods=['POST'])
+def api_reweight():
+    """
+    Endpoint API pour repondérer une analyse récente sans relancer toute la chaîne.
+    
+    Seuls les facteurs d'importance changent : les sous-scores conservés sont
+    recombinés, l'analyse IA et les visualisations ne sont régénérées que si
+    'regenerate_ai' ou 'regenerate_visualizations' sont demandés.
+    
+    La réponse contient le nouveau résultat sans ses données brutes (graphe
+    routier, GeoDataFrame), complété des meilleurs emplacements recalculés.
+    """
+    try:
+        # Récupérer les données JSON
+        data = request.get_json()
+        importance_factors = {
+            name: float(value) for name, value in data.get('importance_factors', {}).items()
+        }
+        
+        # Repondérer l'analyse
+        result = commercial_service.reweight_analysis(
+            data.get('result_id', ''),
+            importance_factors,
+            regenerate_ai=bool(data.get('regenerate_ai', False)),
+            regenerate_visualizations=bool(data.get('regenerate_visualizations', False))
+        )
+        
+        response = {key: value for key, value in result.to_dict().items() if key != 'raw_data'}
+        response['best_sites'] = result.raw_data['geo_data'].get('best_sites')
+        response['reweighted_from'] = result.raw_data['reweighted_from']
+        return jsonify(response)
+        
+    except KeyError as e:
+        return jsonify({'error': str(e.args[0])}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@commercial_bp.route('/api/best-sites', methods=['POST'])
+def api_best_sites():
+    """
+    Endpoint API pour rechercher les meilleurs emplacements d'une zone.
+    """
+    try:
+        # Récupérer les données JSON
+        data = request.get_json()
+        parameters = data.get('parameters', {})
+        
+        # Créer un objet CommercialLocation décrivant la zone à explorer
+        location = CommercialLocation(
+            location_name=data.get('location', ''),
+            business_type=data.get('business_type', ''),
+            latitude=float(data.get('latitude', 0.0)),
+            longitude=float(data.get('longitude', 0.0)),
+            radius=parameters.get('radius', 500)
+        )
+        importance_factors = parameters.get('importance_factors', {})
+        if importance_factors:
+            location.importance_factors = importance_factors
+        
+        # Rechercher les meilleurs emplacements
+        result = commercial_service.find_best_sites(
+            location,
+            top_n=int(data['top_n']) if 'top_n' in data else None,
+            candidates=data.get('candidates', 'grid'),
+            resolution=int(data['resolution']) if 'resolution' in data else None
+        )
+        
+        return jsonify(result)
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -1,10 +1,12 @@
 """
 Routes pour l'API d'analyse de la qualité des sols.
 """
-from flask import Blueprint, request, jsonify, render_template, redirect, url_for
+from flask import Blueprint, request, jsonify, render_template, redirect, url_for, Response, stream_with_context
 import json
 from src.services.soil_quality_service import SoilQualityService
 from src.models.soil_quality import SoilQuality
+from src.utils.job_queue import QueueFullError, get_job_queue
+from src.utils.sse import SSE_HEADERS, analysis_event_stream
 
 # Créer un blueprint pour les routes d'analyse des sols
 soil_bp = Blueprint('soil', __name__)
@@ -12,6 +14,24 @@ soil_bp = Blueprint('soil', __name__)
 # Initialiser le service
 soil_service = SoilQualityService(use_mock=True)
 
+def run_analysis_job(params, progress):
+    """
+    Exécute une analyse soumise à la file de tâches.
+    
+    Args:
+        params (dict): Paramètres de la tâche ('soil' : analyse sérialisée)
+        progress (callable): Callback d'avancement de la tâche
+        
+    Returns:
+        dict: Résultat de l'analyse
+    """
+    soil = SoilQuality.from_dict(params['soil'])
+    return soil_service.analyze_soil(soil, progress_callback=progress).to_dict()
+
+# File de tâches des analyses asynchrones
+job_queue = get_job_queue()
+job_queue.register('soil', run_analysis_job)
+
 @soil_bp.route('/')
 def index():
     """
@@ -67,6 +87,10 @@ def analyze():
 def api_analyze():
     """
     Endpoint API pour analyser la qualité des sols.
+    
+    Avec "async": true (ou ?async=1), l'analyse est confiée à la file de tâches
+    et la réponse (202) contient l'identifiant de la tâche à suivre via
+    /api/jobs/<job_id>.
     """
     try:
         # Récupérer les données JSON
@@ -84,15 +108,69 @@ def api_analyze():
         if importance_factors:
             soil.importance_factors = importance_factors
         
+        # Mode asynchrone : renvoyer immédiatement l'identifiant de la tâche
+        if data.get('async') or request.args.get('async') in ('1', 'true'):
+            job = job_queue.submit('soil', {'soil': soil.to_dict()})
+            return jsonify({
+                'job_id': job['job_id'],
+                'status': job['status'],
+                'status_url': url_for('soil.api_job', job_id=job['job_id'])
+            }), 202
+        
         # Analyser le sol
         result = soil_service.analyze_soil(soil)
         
         # Renvoyer les résultats
         return jsonify(result.to_dict())
         
+    except QueueFullError as e:
+        return jsonify({'error': str(e)}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@soil_bp.route('/api/jobs/<job_id>')
+def api_job(job_id):
+    """
+    Endpoint API renvoyant l'état d'une analyse asynchrone : statut, avancement
+    par étape et, une fois terminée, le résultat de l'analyse.
+    """
+    job = job_queue.get(job_id)
+    if job is None or job['kind'] != 'soil':
+        return jsonify({'error': f"Tâche inconnue: {job_id}"}), 404
+    return jsonify(job)
+
+@soil_bp.route('/api/analyze/stream', methods=['POST'])
+def api_analyze_stream():
+    """
+    Endpoint API pour analyser la qualité des sols en flux SSE.
+    
+    Les résultats partiels sont envoyés dès que chaque étape se termine :
+    géocodage, données pédologiques, scores, recommandations puis URL des
+    visualisations, suivis du résultat complet (événement 'result').
+    """
+    try:
+        # Récupérer les données JSON
+        data = request.get_json()
+        
+        # Créer un objet SoilQuality
+        soil = SoilQuality(
+            location_name=data.get('location', ''),
+            crop_type=data.get('crop_type', ''),
+            depth=data.get('parameters', {}).get('depth', 30)
+        )
+        
+        # Récupérer les facteurs d'importance
+        importance_factors = data.get('parameters', {}).get('importance_factors', {})
+        if importance_factors:
+            soil.importance_factors = importance_factors
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 400
+    
+    events = soil_service.analyze_soil_events(soil)
+    return Response(stream_with_context(analysis_event_stream(events)), 
+                    mimetype='text/event-stream', headers=SSE_HEADERS)
+
 @soil_bp.route('/example')
 def load_example():
     """
@@ -1,74 +1,256 @@
 """
 Service pour l'analyse d'emplacements commerciaux.
+
+Les bibliothèques lourdes (geopandas, osmnx, scipy, folium...) ne sont importées
+que par les chemins de code utilisant des données réelles : le mode simulé et
+l'import de l'application restent rapides.
 """
 import os
 import json
-import geopandas as gpd
-import pandas as pd
-import folium
-import matplotlib.pyplot as plt
-import seaborn as sns
-from typing import Dict, Any, List, Optional, Tuple
-import osmnx as ox
-from shapely.geometry import Point, Polygon
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 import numpy as np
 from src.utils.deepseek_client import DeepseekClient
 from src.models.commercial_location import CommercialLocation
 from src.models.analysis_result import AnalysisResult
+from src.utils.scoring import combine_commercial_scores
+from src.utils.analysis_store import AnalysisStore
+from src.utils.visualization_cache import VisualizationCache, get_visualization_cache
+from src.utils.render_pool import RenderPool, get_render_pool
+from src.utils.single_flight import SingleFlight
+from src.utils.geocode_cache import normalize_place_name
+
+if TYPE_CHECKING:
+    import geopandas as gpd
+    from src.utils.osm_tile_cache import OSMTileCache
+    from src.utils.geocode_cache import GeocodeCache
+    from src.utils.osm_extract_index import OSMExtractIndex
+    from src.utils.site_dataset import SiteDataset
+
+# Paramètres de la heatmap d'attractivité (emprise et portées en degrés)
+HEATMAP_RESOLUTION = 100
+HEATMAP_HALF_EXTENT = 0.01
+HEATMAP_CENTER_SCALE = 20 * 2 * HEATMAP_HALF_EXTENT / (HEATMAP_RESOLUTION - 1)
+HEATMAP_HOTSPOT_SCALE = 15 * 2 * HEATMAP_HALF_EXTENT / (HEATMAP_RESOLUTION - 1)
+HEATMAP_RANDOM_HOTSPOTS = 5
+
+# Nombre de POI simulés pour la recherche des meilleurs emplacements en mode mock
+MOCK_SELECTION_POIS = 300
+
+# Styles de la carte interactive (concurrents et meilleurs emplacements par classe de score)
+MAP_STYLES = {
+    "competitor": {"radius": 5, "color": "#dc3545", "fillColor": "#dc3545", "fillOpacity": 0.8, "weight": 2},
+    "site_excellent": {"radius": 10, "color": "#1a9641", "fillColor": "#1a9641", "fillOpacity": 0.8, "weight": 3},
+    "site_good": {"radius": 10, "color": "#a6d96a", "fillColor": "#a6d96a", "fillOpacity": 0.8, "weight": 3},
+    "site_average": {"radius": 10, "color": "#ffffbf", "fillColor": "#ffffbf", "fillOpacity": 0.8, "weight": 3},
+    "site_poor": {"radius": 10, "color": "#d7191c", "fillColor": "#d7191c", "fillOpacity": 0.8, "weight": 3}
+}
+
+# Étapes de l'analyse signalées au callback d'avancement
+ANALYSIS_STAGES = ("geo_data", "ai_analysis", "visualizations")
+
+# Analyse par lots : nombre de sites mesurés par tâche (un appel Dijkstra) et de tâches simultanées
+BATCH_CHUNK_SIZE = 16
+BATCH_MAX_WORKERS = 4
 
 class CommercialLocationService:
     """
     Service pour l'analyse d'emplacements commerciaux.
     """
-    def __init__(self, use_mock: bool = True):
+    def __init__(self, 
+                 use_mock: bool = True, 
+                 tile_cache: Optional["OSMTileCache"] = None, 
+                 geocode_cache: Optional["GeocodeCache"] = None, 
+                 extract_index: Optional["OSMExtractIndex"] = None, 
+                 analysis_store: Optional[AnalysisStore] = None, 
+                 visualization_cache: Optional[VisualizationCache] = None, 
+                 render_pool: Optional[RenderPool] = None, 
+                 deepseek_client: Optional[DeepseekClient] = None, 
+                 single_flight: Optional[SingleFlight] = None):
         """
         Initialise le service d'analyse d'emplacements commerciaux.
         
         Args:
             use_mock (bool): Si True, utilise des données simulées au lieu de données réelles.
+            tile_cache (OSMTileCache, optional): Cache de tuiles OSM (créé par défaut en mode réel)
+            geocode_cache (GeocodeCache, optional): Cache de géocodage (partagé par défaut en mode réel)
+            extract_index (OSMExtractIndex, optional): Index hors ligne d'un extrait OSM
+                (chargé depuis $GEOMARKETING_OSM_EXTRACT par défaut en mode réel)
+            analysis_store (AnalysisStore, optional): Analyses récentes conservées pour la repondération
+            visualization_cache (VisualizationCache, optional): Cache des visualisations (partagé par défaut)
+            render_pool (RenderPool, optional): Pool de processus des rendus matplotlib (partagé par défaut)
+            deepseek_client (DeepseekClient, optional): Client de l'API DeepSeek R1, par exemple
+                un SyncDeepseekBridge (par défaut un DeepseekClient synchrone)
+            single_flight (SingleFlight, optional): Regroupement des analyses identiques en cours
         """
         self.use_mock = use_mock
-        self.deepseek_client = DeepseekClient(use_mock=use_mock)
+        self.tile_cache = tile_cache
+        self.geocode_cache = geocode_cache
+        self.extract_index = extract_index
+        if not use_mock:
+            from src.utils.osm_tile_cache import OSMTileCache
+            from src.utils.geocode_cache import get_geocode_cache
+            from src.utils.osm_extract_index import load_extract_index
+            self.tile_cache = tile_cache or OSMTileCache()
+            self.geocode_cache = geocode_cache or get_geocode_cache()
+            self.extract_index = extract_index or load_extract_index()
+        self.analysis_store = analysis_store or AnalysisStore()
+        self.visualization_cache = visualization_cache or get_visualization_cache()
+        self.render_pool = render_pool or get_render_pool()
+        self.deepseek_client = deepseek_client or DeepseekClient(use_mock=use_mock)
+        self.single_flight = single_flight or SingleFlight()
         self.cache_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 
                                      "src", "static", "visualizations")
         os.makedirs(self.cache_dir, exist_ok=True)
         
-    def analyze_location(self, location: CommercialLocation) -> AnalysisResult:
+    def analyze_location(self, 
+                         location: CommercialLocation, 
+                         progress_callback: Optional[Callable[[str, int, int], None]] = None) -> AnalysisResult:
         """
         Analyse un emplacement commercial.
         
         Args:
             location (CommercialLocation): Emplacement à analyser
+            progress_callback (callable, optional): Appelé au début de chaque étape
+                (voir ANALYSIS_STAGES) avec (étape, étapes terminées, nombre d'étapes),
+                puis avec ('done', n, n) à la fin de l'analyse
             
         Returns:
-            AnalysisResult: Résultats de l'analyse
+            AnalysisResult: Résultats de l'analyse (le même objet pour les
+                analyses identiques demandées simultanément, exécutées une seule fois)
+        """
+        def run():
+            result = None
+            for event, payload in self.analyze_location_events(location, progress_callback):
+                if event == "result":
+                    result = payload
+            return result, location
+        
+        result, analyzed = self.single_flight.do(self._flight_key(location), run)
+        if analyzed is not location:
+            # Analyse regroupée : reprendre les coordonnées géocodées par la première requête
+            if location.latitude == 0.0 and location.longitude == 0.0:
+                location.latitude = analyzed.latitude
+                location.longitude = analyzed.longitude
+            if progress_callback is not None:
+                progress_callback("done", len(ANALYSIS_STAGES), len(ANALYSIS_STAGES))
+        return result
+    
+    def _flight_key(self, location: CommercialLocation) -> Tuple[Any, ...]:
+        """
+        Clé des analyses identiques : lieu et type de commerce normalisés,
+        coordonnées, rayon et facteurs d'importance.
+        """
+        return (
+            "commercial",
+            normalize_place_name(location.location_name),
+            normalize_place_name(location.business_type),
+            round(float(location.latitude), 6),
+            round(float(location.longitude), 6),
+            location.radius,
+            tuple(sorted(location.importance_factors.items()))
+        )
+    
+    def coalescing_stats(self) -> Dict[str, Any]:
+        """
+        Renvoie les statistiques de regroupement des analyses identiques.
+        
+        Returns:
+            dict: Appels, exécutions et appels regroupés (collapsed)
         """
+        return self.single_flight.stats()
+    
+    def analyze_location_events(self, 
+                                location: CommercialLocation, 
+                                progress_callback: Optional[Callable[[str, int, int], None]] = None
+                                ) -> Iterator[Tuple[str, Any]]:
+        """
+        Analyse un emplacement commercial en produisant les résultats partiels
+        dès que chaque étape se termine.
+        
+        Événements produits, dans l'ordre :
+            - 'geocode' : nom, coordonnées et rayon de l'emplacement
+            - 'features' : POI, concurrents, réseau routier et accessibilité mesurés
+            - 'scores' : scores connus (sous-scores géographiques dès qu'ils sont
+              mesurés, puis scores fusionnés avec l'analyse IA s'ils diffèrent)
+            - 'recommendations' : analyse et recommandations de l'IA
+            - 'visualizations' : URL de la carte et de la heatmap
+            - 'result' : AnalysisResult complet (ou précédé d'un événement 'error')
+        
+        Args:
+            location (CommercialLocation): Emplacement à analyser
+            progress_callback (callable, optional): Callback d'avancement (voir analyze_location)
+            
+        Yields:
+            tuple: (nom de l'événement, données)
+        """
+        def progress(stage: str):
+            if progress_callback is not None:
+                completed = ANALYSIS_STAGES.index(stage) if stage in ANALYSIS_STAGES else len(ANALYSIS_STAGES)
+                progress_callback(stage, completed, len(ANALYSIS_STAGES))
+        
         # Créer un résultat d'analyse
         result = AnalysisResult(analysis_type="commercial")
         
         try:
             # Récupérer les données géographiques
+            progress("geo_data")
             if not self.use_mock:
+                self._resolve_coordinates(location)
+                yield "geocode", self._location_summary(location)
                 geo_data = self._get_geographic_data(location)
             else:
                 geo_data = self._mock_geographic_data(location)
+                yield "geocode", self._location_summary(location)
+            yield "features", self._features_summary(geo_data)
             
-            # Analyser les données avec DeepSeek R1
-            ai_analysis = self.deepseek_client.analyze_commercial_location(
+            # Les sous-scores géographiques sont connus avant l'analyse IA
+            geo_scores = self._merge_geo_scores({}, geo_data, location.importance_factors)
+            if geo_scores:
+                yield "scores", geo_scores
+            
+            # Analyser les données avec DeepSeek R1 (réponse lue en flux : les
+            # scores sont publiés dès qu'ils sont reçus, avant les recommandations)
+            progress("ai_analysis")
+            ai_analysis = {}
+            for name, value in self.deepseek_client.stream_commercial_location(
                 location.location_name,
                 location.business_type,
                 {
                     "radius": location.radius,
-                    "importance_factors": location.importance_factors
+                    "importance_factors": location.importance_factors,
+                    "accessibility": geo_data.get("accessibility")
                 }
+            ):
+                if name == "scores":
+                    scores = self._merge_geo_scores(value, geo_data, location.importance_factors)
+                    if scores != geo_scores:
+                        geo_scores = scores
+                        yield "scores", scores
+                elif name == "result":
+                    ai_analysis = value
+            result.scores = self._merge_geo_scores(
+                ai_analysis.get("analysis_results", {}).get("score", {}),
+                geo_data,
+                location.importance_factors
             )
+            result.recommendations = ai_analysis.get("ai_recommendations", {}).get("recommendations", [])
+            # Le résultat final fait foi : il corrige des scores publiés à partir
+            # d'un objet que l'analyseur a ensuite abandonné
+            if result.scores != geo_scores:
+                yield "scores", result.scores
+            yield "recommendations", {
+                "analysis": ai_analysis.get("ai_recommendations", {}).get("analysis", ""),
+                "recommendations": result.recommendations
+            }
             
             # Générer les visualisations
+            progress("visualizations")
+            selection_grid = geo_data.pop("selection_grid", None)
             visualizations = self._generate_visualizations(location, geo_data, ai_analysis)
+            yield "visualizations", visualizations
             
             # Structurer les résultats
-            result.scores = ai_analysis.get("analysis_results", {}).get("score", {})
-            result.recommendations = ai_analysis.get("ai_recommendations", {}).get("recommendations", [])
             result.visualizations = visualizations
             result.raw_data = {
                 "geo_data": geo_data,
@@ -82,13 +264,386 @@ class CommercialLocationService:
                 "visualizations": result.visualizations
             })
             
-            return result
+            # Conserver les sous-scores et couches pour une repondération ultérieure
+            self.analysis_store.put(result.result_id, {
+                "location": location.to_dict(),
+                "geo_data": geo_data,
+                "selection_grid": selection_grid,
+                "ai_analysis": ai_analysis,
+                "visualizations": visualizations
+            })
+            
+            progress("done")
             
         except Exception as e:
             print(f"Erreur lors de l'analyse de l'emplacement: {e}")
+            yield "error", {"error": str(e)}
+            result = AnalysisResult(result_id=result.result_id, analysis_type="commercial")
             result.add_score("error", 1.0)
             result.add_recommendation(f"Une erreur est survenue lors de l'analyse: {str(e)}")
-            return result
+        
+        yield "result", result
+    
+    def reweight_analysis(self, 
+                          result_id: str, 
+                          importance_factors: Dict[str, float], 
+                          regenerate_ai: bool = False, 
+                          regenerate_visualizations: bool = False) -> AnalysisResult:
+        """
+        Recombine les sous-scores d'une analyse récente avec de nouveaux facteurs d'importance.
+        
+        Seuls le score global et les meilleurs emplacements sont recalculés ;
+        l'analyse IA et les visualisations ne sont régénérées que sur demande.
+        
+        Args:
+            result_id (str): Identifiant du résultat à repondérer
+            importance_factors (dict): Nouveaux facteurs d'importance
+            regenerate_ai (bool): Si True, relance l'analyse IA
+            regenerate_visualizations (bool): Si True, régénère la carte et la heatmap
+            
+        Returns:
+            AnalysisResult: Nouveau résultat (conservé à son tour pour d'autres repondérations)
+            
+        Raises:
+            KeyError: Si l'analyse est inconnue ou expirée
+        """
+        entry = self.analysis_store.get(result_id)
+        if entry is None:
+            raise KeyError(f"Analyse inconnue ou expirée: {result_id}")
+        
+        location = CommercialLocation.from_dict(entry["location"])
+        location.importance_factors = dict(location.importance_factors, **importance_factors)
+        
+        ai_analysis = entry["ai_analysis"]
+        if regenerate_ai:
+            ai_analysis = self.deepseek_client.analyze_commercial_location(
+                location.location_name,
+                location.business_type,
+                {
+                    "radius": location.radius,
+                    "importance_factors": location.importance_factors,
+                    "accessibility": entry["geo_data"].get("accessibility")
+                }
+            )
+        
+        # Les meilleurs emplacements dépendent des facteurs : recombiner la grille conservée
+        geo_data = dict(entry["geo_data"])
+        if entry["selection_grid"] is not None:
+            from src.utils.site_selection import select_best_sites
+            geo_data["best_sites"] = select_best_sites(entry["selection_grid"], location.importance_factors)
+        
+        visualizations = entry["visualizations"]
+        if regenerate_visualizations:
+            visualizations = self._generate_visualizations(location, geo_data, ai_analysis)
+        
+        result = AnalysisResult(analysis_type="commercial")
+        result.scores = self._merge_geo_scores(
+            ai_analysis.get("analysis_results", {}).get("score", {}),
+            geo_data,
+            location.importance_factors
+        )
+        result.recommendations = ai_analysis.get("ai_recommendations", {}).get("recommendations", [])
+        result.visualizations = visualizations
+        result.raw_data = {
+            "geo_data": geo_data,
+            "ai_analysis": ai_analysis,
+            "reweighted_from": result_id
+        }
+        
+        location.set_results({
+            "score": result.scores,
+            "recommendations": result.recommendations,
+            "visualizations": result.visualizations
+        })
+        self.analysis_store.put(result.result_id, dict(
+            entry,
+            location=location.to_dict(),
+            geo_data=geo_data,
+            ai_analysis=ai_analysis,
+            visualizations=visualizations
+        ))
+        return result
+    
+    def find_best_sites(self, 
+                        location: CommercialLocation, 
+                        top_n: Optional[int] = None, 
+                        candidates: str = "grid", 
+                        resolution: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Recherche les meilleurs emplacements dans le cercle d'analyse.
+        
+        Args:
+            location (CommercialLocation): Zone à explorer (centre et rayon)
+            top_n (int, optional): Nombre de sites renvoyés (DEFAULT_TOP_N par défaut)
+            candidates (str): 'grid' (grille régulière) ou 'roads' (nœuds du réseau routier)
+            resolution (int, optional): Nombre de candidats par côté de la grille
+                (DEFAULT_RESOLUTION par défaut)
+            
+        Returns:
+            dict: Zone explorée, sites classés et version des données
+        """
+        from src.utils.site_selection import find_best_sites, DEFAULT_RESOLUTION, DEFAULT_TOP_N
+        top_n = top_n or DEFAULT_TOP_N
+        resolution = resolution or DEFAULT_RESOLUTION
+        
+        if self.use_mock:
+            from src.utils.proximity import CompetitorProximity
+
+            geo_data = self._mock_geographic_data(location)
+            # POI simulés concentrés autour du centre de la zone
+            spread = location.radius / 3 / 111320
+            pois = (
+                location.longitude + np.random.normal(0, spread / np.cos(np.radians(location.latitude)), MOCK_SELECTION_POIS),
+                location.latitude + np.random.normal(0, spread, MOCK_SELECTION_POIS)
+            )
+            best_sites = find_best_sites(
+                location.latitude, 
+                location.longitude, 
+                location.radius, 
+                location.importance_factors, 
+                pois=pois, 
+                competitors=CompetitorProximity.from_competitors(geo_data["competitors"]), 
+                top_n=top_n, 
+                resolution=resolution
+            )
+            data_version = None
+        else:
+            from src.utils.site_dataset import SiteDataset
+            self._resolve_coordinates(location)
+            site = (location.latitude, location.longitude, location.radius)
+            dataset = SiteDataset.fetch(self._geo_source([site]), [site])
+            best_sites = dataset.best_sites(location.latitude, location.longitude, location.radius, 
+                                            location.business_type, location.importance_factors, 
+                                            top_n=top_n, candidates=candidates, resolution=resolution)
+            data_version = dataset.data_version
+        
+        return {
+            "location": self._location_summary(location),
+            "business_type": location.business_type,
+            "best_sites": best_sites,
+            "data_version": data_version
+        }
+    
+    def analyze_locations_batch(self, 
+                                locations: List[CommercialLocation], 
+                                chunk_size: int = BATCH_CHUNK_SIZE, 
+                                max_workers: int = BATCH_MAX_WORKERS) -> Iterator[Dict[str, Any]]:
+        """
+        Analyse plusieurs emplacements sur des données géographiques récupérées une seule fois
+        par groupe de sites voisins (voir site_dataset.cluster_sites).
+        
+        Les résultats sont produits au fur et à mesure que les sites sont mesurés,
+        sans appel à l'IA ni génération de visualisations.
+        
+        Args:
+            locations (list): Emplacements à analyser
+            chunk_size (int): Nombre de sites mesurés par tâche
+            max_workers (int): Nombre de tâches simultanées
+            
+        Yields:
+            dict: Résultat d'un site ('index', 'location', 'scores', mesures) 
+                  ou erreur ('index', 'error')
+        """
+        if self.use_mock:
+            for index, location in enumerate(locations):
+                yield self._mock_batch_result(index, location)
+            return
+        
+        # Géocoder les sites (via le cache), en écartant ceux qui sont introuvables
+        pending = []
+        for index, location in enumerate(locations):
+            try:
+                self._resolve_coordinates(location, fallback=False)
+                pending.append(index)
+            except Exception as e:
+                yield {"index": index, "location": {"name": location.location_name}, "error": str(e)}
+        if not pending:
+            return
+        
+        # Récupérer une seule fois les données de chaque groupe de sites voisins
+        # (emprise bornée : des sites éloignés ne sont pas couverts par une seule requête)
+        from src.utils.site_dataset import SiteDataset, cluster_sites
+        sites = [(locations[i].latitude, locations[i].longitude, locations[i].radius) for i in pending]
+        for cluster in cluster_sites(sites):
+            indices = [pending[position] for position in cluster]
+            members = [sites[position] for position in cluster]
+            try:
+                dataset = SiteDataset.fetch(self._geo_source(members), members)
+            except Exception as e:
+                print(f"Erreur lors de la récupération des données géographiques: {e}")
+                for index in indices:
+                    yield {"index": index, "location": self._location_summary(locations[index]), "error": str(e)}
+                continue
+            yield from self._measure_batch(dataset, locations, indices, chunk_size, max_workers)
+    
+    def _geo_source(self, sites: List[Tuple[float, float, float]]):
+        """
+        Choisit la source des données géographiques de sites voisins.
+        
+        Args:
+            sites (list): Sites (latitude, longitude, rayon en mètres)
+            
+        Returns:
+            OSMExtractIndex | OSMTileCache: Index hors ligne s'il contient un réseau
+                routier et couvre l'emprise des sites, sinon cache de tuiles
+        """
+        if self.extract_index is not None:
+            from src.utils.site_dataset import union_extent
+            if self.extract_index.covers(*union_extent(sites)):
+                return self.extract_index
+        return self.tile_cache
+    
+    def _measure_batch(self, 
+                       dataset: "SiteDataset", 
+                       locations: List[CommercialLocation], 
+                       indices: List[int], 
+                       chunk_size: int, 
+                       max_workers: int) -> Iterator[Dict[str, Any]]:
+        """
+        Mesure des sites d'un même jeu de données, par tâches parallèles.
+        
+        Args:
+            dataset (SiteDataset): Données couvrant les sites
+            locations (list): Emplacements de la requête
+            indices (list): Positions des sites à mesurer
+            chunk_size (int): Nombre de sites mesurés par tâche
+            max_workers (int): Nombre de tâches simultanées
+            
+        Yields:
+            dict: Résultat d'un site ou erreur (voir analyze_locations_batch)
+        """
+        def measure_chunk(chunk: List[int]) -> List[Dict[str, Any]]:
+            measures = dataset.measure_sites(
+                [(locations[i].latitude, locations[i].longitude, locations[i].radius) for i in chunk],
+                [locations[i].business_type for i in chunk]
+            )
+            return [
+                self._batch_result(index, locations[index], site, dataset.data_version)
+                for index, site in zip(chunk, measures)
+            ]
+        
+        chunks = [indices[i:i + chunk_size] for i in range(0, len(indices), chunk_size)]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(measure_chunk, chunk): chunk for chunk in chunks}
+            for future in as_completed(futures):
+                try:
+                    for result in future.result():
+                        yield result
+                except Exception as e:
+                    print(f"Erreur lors de l'analyse par lots: {e}")
+                    for index in futures[future]:
+                        yield {"index": index, "location": self._location_summary(locations[index]), "error": str(e)}
+    
+    def _batch_result(self, 
+                      index: int, 
+                      location: CommercialLocation, 
+                      measures: Dict[str, Any], 
+                      data_version: Optional[str]) -> Dict[str, Any]:
+        """
+        Construit le résultat d'un site de l'analyse par lots.
+        
+        Args:
+            index (int): Position du site dans la requête
+            location (CommercialLocation): Emplacement analysé
+            measures (dict): Mesures du site (voir SiteDataset.measure_sites)
+            data_version (str): Version des données géographiques
+            
+        Returns:
+            dict: Scores et mesures résumées du site
+        """
+        scores = dict(measures["scores"])
+        scores["global_score"] = combine_commercial_scores(scores, location.importance_factors)
+        accessibility = measures["accessibility"]
+        return {
+            "index": index,
+            "location": self._location_summary(location),
+            "business_type": location.business_type,
+            "scores": scores,
+            "pois_count": measures["pois_count"],
+            "competitors_count": len(measures["competitors"]),
+            "competition": measures["competition"],
+            "network_metrics": measures["network_metrics"],
+            "accessibility": {
+                "mode": accessibility["mode"],
+                "accessibility_score": accessibility["accessibility_score"],
+                "bands": [
+                    {key: value for key, value in band.items() if key != "polygon"}
+                    for band in accessibility["bands"]
+                ]
+            },
+            "data_version": data_version
+        }
+    
+    def _mock_batch_result(self, index: int, location: CommercialLocation) -> Dict[str, Any]:
+        """
+        Construit le résultat simulé d'un site de l'analyse par lots.
+        
+        Args:
+            index (int): Position du site dans la requête
+            location (CommercialLocation): Emplacement analysé
+            
+        Returns:
+            dict: Scores simulés du site
+        """
+        geo_data = self._mock_geographic_data(location)
+        ai_analysis = self.deepseek_client.analyze_commercial_location(
+            location.location_name,
+            location.business_type,
+            {
+                "radius": location.radius,
+                "importance_factors": location.importance_factors
+            }
+        )
+        return {
+            "index": index,
+            "location": self._location_summary(location),
+            "business_type": location.business_type,
+            "scores": ai_analysis.get("analysis_results", {}).get("score", {}),
+            "pois_count": geo_data["pois_count"],
+            "competitors_count": len(geo_data["competitors"])
+        }
+    
+    def _location_summary(self, location: CommercialLocation) -> Dict[str, Any]:
+        """
+        Résume l'emplacement d'un site (nom, coordonnées et rayon).
+        """
+        return {
+            "name": location.location_name,
+            "latitude": location.latitude,
+            "longitude": location.longitude,
+            "radius": location.radius
+        }
+    
+    def _features_summary(self, geo_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Résume les mesures géographiques d'un site pour un résultat partiel.
+        
+        Args:
+            geo_data (dict): Données géographiques
+            
+        Returns:
+            dict: POI, concurrents, densité routière et accessibilité (sans les polygones)
+        """
+        summary = {
+            "pois_count": geo_data.get("pois_count", {}),
+            "competitors": geo_data.get("competitors", []),
+            "road_density": geo_data.get("road_density"),
+            "competition": geo_data.get("competition"),
+            "network_metrics": geo_data.get("network_metrics"),
+            "best_sites": geo_data.get("best_sites"),
+            "error": geo_data.get("error")
+        }
+        accessibility = geo_data.get("accessibility")
+        if accessibility:
+            summary["accessibility"] = {
+                "mode": accessibility["mode"],
+                "accessibility_score": accessibility["accessibility_score"],
+                "bands": [
+                    {key: value for key, value in band.items() if key != "polygon"}
+                    for band in accessibility["bands"]
+                ]
+            }
+        return {key: value for key, value in summary.items() if value is not None}
     
     def _get_geographic_data(self, location: CommercialLocation) -> Dict[str, Any]:
         """
@@ -100,44 +655,26 @@ class CommercialLocationService:
         Returns:
             dict: Données géographiques
         """
-        # Récupérer les coordonnées géographiques si elles ne sont pas déjà définies
-        if location.latitude == 0.0 and location.longitude == 0.0:
-            try:
-                gdf = ox.geocode_to_gdf(location.location_name)
-                location.latitude = gdf.iloc[0].geometry.centroid.y
-                location.longitude = gdf.iloc[0].geometry.centroid.x
-            except Exception as e:
-                print(f"Erreur lors de la géolocalisation: {e}")
-                # Valeurs par défaut pour Paris
-                location.latitude = 48.8566
-                location.longitude = 2.3522
+        from src.utils.site_dataset import SiteDataset
+        from src.utils.site_selection import select_best_sites
         
-        # Créer un point pour l'emplacement
-        point = Point(location.longitude, location.latitude)
+        # Récupérer les coordonnées géographiques si elles ne sont pas déjà définies
+        self._resolve_coordinates(location)
         
-        # Récupérer les données OpenStreetMap dans le rayon spécifié
+        # Récupérer les données OpenStreetMap dans le rayon spécifié, depuis l'index
+        # hors ligne s'il couvre la zone, sinon depuis le cache de tuiles
+        site = (location.latitude, location.longitude, location.radius)
         try:
-            # Récupérer le réseau routier
-            G = ox.graph_from_point((location.latitude, location.longitude), 
-                                   dist=location.radius, 
-                                   network_type='all')
-            
-            # Récupérer les points d'intérêt
-            tags = {
-                'amenity': True,
-                'shop': True,
-                'healthcare': True,
-                'building': True
-            }
-            pois = ox.geometries_from_point((location.latitude, location.longitude), 
-                                           tags=tags, 
-                                           dist=location.radius)
+            dataset = SiteDataset.fetch(self._geo_source([site]), [site])
             
-            # Filtrer les concurrents en fonction du type de commerce
-            competitors = self._filter_competitors(pois, location.business_type)
+            # Mesurer POI, concurrence, réseau routier et isochrones du site
+            measures = dataset.measure_sites([site], [location.business_type], polygons=True)[0]
             
-            # Calculer la densité du réseau routier
-            road_density = len(G.edges) / (np.pi * (location.radius / 1000) ** 2)  # edges par km²
+            # Rechercher les meilleurs emplacements du cercle d'analyse (la grille des
+            # sous-scores est conservée pour les repondérations)
+            selection_grid = dataset.candidate_grid(location.latitude, location.longitude, 
+                                                    location.radius, location.business_type)
+            best_sites = select_best_sites(selection_grid, location.importance_factors)
             
             return {
                 "location": {
@@ -146,10 +683,12 @@ class CommercialLocationService:
                     "longitude": location.longitude,
                     "radius": location.radius
                 },
-                "road_network": G,
-                "pois": pois,
-                "competitors": competitors,
-                "road_density": road_density
+                "road_network": dataset.G,
+                "pois": dataset.pois,
+                **measures,
+                "best_sites": best_sites,
+                "selection_grid": selection_grid,
+                "data_version": dataset.data_version
             }
             
         except Exception as e:
@@ -164,6 +703,34 @@ class CommercialLocationService:
                 "error": str(e)
             }
     
+    def _resolve_coordinates(self, location: CommercialLocation, fallback: bool = True):
+        """
+        Géocode l'emplacement si ses coordonnées ne sont pas définies.
+        
+        Args:
+            location (CommercialLocation): Emplacement à géocoder
+            fallback (bool): Si True, utilise les coordonnées de Paris en cas d'échec
+            
+        Raises:
+            ValueError: Si le lieu est introuvable et que fallback est False
+        """
+        if location.latitude != 0.0 or location.longitude != 0.0:
+            return
+        
+        try:
+            geocoded = self.geocode_cache.geocode(location.location_name)
+            if geocoded is None:
+                raise ValueError(f"Lieu introuvable: {location.location_name}")
+            location.latitude = geocoded["latitude"]
+            location.longitude = geocoded["longitude"]
+        except Exception as e:
+            if not fallback:
+                raise
+            print(f"Erreur lors de la géolocalisation: {e}")
+            # Valeurs par défaut pour Paris
+            location.latitude = 48.8566
+            location.longitude = 2.3522
+    
     def _mock_geographic_data(self, location: CommercialLocation) -> Dict[str, Any]:
         """
         Génère des données géographiques simulées pour un emplacement.
@@ -230,7 +797,7 @@ class CommercialLocationService:
         ]
         
         # Densité du réseau routier simulée
-        road_density = 0.015  # edges par km²
+        road_density = 15.0  # km de voirie par km²
         
         return {
             "location": {
@@ -244,55 +811,45 @@ class CommercialLocationService:
             "road_density": road_density
         }
     
-    def _filter_competitors(self, pois: gpd.GeoDataFrame, business_type: str) -> List[Dict[str, Any]]:
+    def _commercial_pois(self, pois: Optional["gpd.GeoDataFrame"]) -> "gpd.GeoDataFrame":
         """
-        Filtre les concurrents dans les points d'intérêt en fonction du type de commerce.
+        Ne garde que les POI commerciaux et de services (pas les bâtiments seuls).
         
         Args:
             pois (GeoDataFrame): Points d'intérêt
-            business_type (str): Type de commerce
             
         Returns:
-            list: Liste des concurrents
-        """
-        competitors = []
-        
-        # Mapping des types de commerce vers les tags OSM
-        business_type_mapping = {
-            "pharmacie": {"amenity": "pharmacy"},
-            "boulangerie": {"shop": "bakery"},
-            "supermarché": {"shop": "supermarket"},
-            "restaurant": {"amenity": "restaurant"},
-            "café": {"amenity": "cafe"},
-            "banque": {"amenity": "bank"},
-            "école": {"amenity": "school"},
-            "hôpital": {"amenity": "hospital"},
-            "médecin": {"amenity": "doctors"},
-            "dentiste": {"amenity": "dentist"}
-        }
-        
-        # Récupérer les tags correspondant au type de commerce
-        tags = business_type_mapping.get(business_type.lower(), {})
+            GeoDataFrame: POI portant un tag 'amenity', 'shop' ou 'healthcare'
+        """
+        import geopandas as gpd
+        from src.utils.site_dataset import COMMERCIAL_POI_COLUMNS
         
-        if not tags:
-            return competitors
+        if pois is None or len(pois) == 0:
+            return gpd.GeoDataFrame(geometry=[])
+        poi_columns = [column for column in COMMERCIAL_POI_COLUMNS if column in pois.columns]
+        return pois[pois[poi_columns].notna().any(axis=1)] if poi_columns else pois
+    
+    def _merge_geo_scores(self, 
+                          scores: Dict[str, Any], 
+                          geo_data: Dict[str, Any], 
+                          importance_factors: Dict[str, float]) -> Dict[str, Any]:
+        """
+        Remplace les scores de l'IA par les scores mesurés sur les données géographiques
+        et recalcule le score global avec les facteurs d'importance.
         
-        # Filtrer les POI en fonction des tags
-        for tag_key, tag_value in tags.items():
-            if tag_key in pois.columns:
-                filtered_pois = pois[pois[tag_key] == tag_value]
-                
-                for _, poi in filtered_pois.iterrows():
-                    name = poi.get("name", "Inconnu")
-                    geometry = poi.geometry
-                    
-                    competitors.append({
-                        "name": name,
-                        "latitude": geometry.centroid.y,
-                        "longitude": geometry.centroid.x
-                    })
-        
-        return competitors
+        Args:
+            scores (dict): Scores issus de l'analyse IA
+            geo_data (dict): Données géographiques
+            importance_factors (dict): Facteurs d'importance
+            
+        Returns:
+            dict: Scores fusionnés, avec un score global recalculé
+        """
+        merged = dict(scores)
+        merged.update(geo_data.get("scores") or {})
+        if any(name in merged for name in ("poi_score", "road_score", "competition_score")):
+            merged["global_score"] = combine_commercial_scores(merged, importance_factors)
+        return merged
     
     def _generate_visualizations(self, 
                                location: CommercialLocation, 
@@ -318,24 +875,61 @@ class CommercialLocationService:
         # Si on n'utilise pas les mocks, générer des visualisations réelles
         if not self.use_mock:
             try:
+                # Lancer la heatmap dans le pool de rendu pendant la génération de la carte
+                heatmap_future = self._submit_heatmap(location, geo_data)
+                
                 # Générer une carte interactive
                 map_path = self._generate_interactive_map(location, geo_data, ai_analysis)
                 visualizations["map"] = map_path
                 
-                # Générer une heatmap
-                heatmap_path = self._generate_heatmap(location, geo_data, ai_analysis)
-                visualizations["heatmap"] = heatmap_path
+                # Attendre la heatmap
+                visualizations["heatmap"] = heatmap_future.result()
             except Exception as e:
                 print(f"Erreur lors de la génération des visualisations: {e}")
         
         return visualizations
     
+    def visualization_stats(self) -> Dict[str, Any]:
+        """
+        Renvoie les statistiques de rendu et de réutilisation des visualisations.
+        
+        Returns:
+            dict: Statistiques du cache de visualisations
+        """
+        return self.visualization_cache.stats()
+    
+    def _visualization_inputs(self, 
+                              location: CommercialLocation, 
+                              geo_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Rassemble les données qui déterminent les visualisations d'une analyse.
+        
+        Sans version des données géographiques, l'identifiant de l'emplacement
+        est utilisé : la visualisation est alors générée sans réutilisation.
+        
+        Args:
+            location (CommercialLocation): Emplacement analysé
+            geo_data (dict): Données géographiques
+            
+        Returns:
+            dict: Clé de la visualisation
+        """
+        return {
+            "latitude": round(location.latitude, 6),
+            "longitude": round(location.longitude, 6),
+            "radius": location.radius,
+            "business_type": location.business_type,
+            "location_name": location.location_name,
+            "importance_factors": location.importance_factors,
+            "data_version": geo_data.get("data_version") or location.location_id
+        }
+    
     def _generate_interactive_map(self, 
                                 location: CommercialLocation, 
                                 geo_data: Dict[str, Any], 
                                 ai_analysis: Dict[str, Any]) -> str:
         """
-        Génère une carte interactive pour l'analyse d'emplacement commercial.
+        Génère (ou réutilise) une carte interactive pour l'analyse d'emplacement commercial.
         
         Args:
             location (CommercialLocation): Emplacement analysé
@@ -345,12 +939,28 @@ class CommercialLocationService:
         Returns:
             str: Chemin vers la carte générée
         """
-        # Créer une carte Folium centrée sur l'emplacement
-        m = folium.Map(
-            location=[location.latitude, location.longitude],
-            zoom_start=15,
-            tiles="OpenStreetMap"
+        return self.visualization_cache.get_or_render(
+            "location_map", "html", self._visualization_inputs(location, geo_data),
+            lambda path: self._render_interactive_map(location, geo_data, path)
         )
+    
+    def _render_interactive_map(self, 
+                                location: CommercialLocation, 
+                                geo_data: Dict[str, Any], 
+                                path: str):
+        """
+        Dessine la carte interactive de l'analyse d'emplacement commercial.
+        
+        Args:
+            location (CommercialLocation): Emplacement analysé
+            geo_data (dict): Données géographiques
+            path (str): Fichier HTML à écrire
+        """
+        import folium
+        from src.utils.map_builder import FeatureLayer, create_map
+        
+        # Créer une carte Folium centrée sur l'emplacement
+        m = create_map(location.latitude, location.longitude)
         
         # Ajouter un cercle pour le rayon d'analyse
         folium.Circle(
@@ -362,65 +972,132 @@ class CommercialLocationService:
             fill_opacity=0.1
         ).add_to(m)
         
-        # Ajouter les concurrents
-        for competitor in geo_data.get("competitors", []):
-            folium.CircleMarker(
-                location=[competitor["latitude"], competitor["longitude"]],
-                radius=5,
-                color="#dc3545",
-                fill=True,
-                fill_color="#dc3545",
-                fill_opacity=0.8,
-                popup=competitor["name"]
-            ).add_to(m)
-        
-        # Ajouter les hotspots (emplacements recommandés) s'ils existent
-        hotspots = ai_analysis.get("ai_recommendations", {}).get("score", {})
-        if hotspots:
-            # Créer des points aléatoires autour de l'emplacement pour les hotspots
-            for i, (name, score) in enumerate(hotspots.items()):
-                # Générer des coordonnées aléatoires dans le rayon d'analyse
-                angle = np.random.random() * 2 * np.pi
-                distance = np.random.random() * location.radius * 0.8
-                dx = distance * np.cos(angle) / 111320  # 1 degré = 111.32 km
-                dy = distance * np.sin(angle) / (111320 * np.cos(location.latitude * np.pi / 180))
-                
-                lat = location.latitude + dy
-                lon = location.longitude + dx
-                
-                # Déterminer la couleur en fonction du score
-                if score > 8:
-                    color = "#1a9641"
-                elif score > 7:
-                    color = "#a6d96a"
-                elif score > 6:
-                    color = "#ffffbf"
-                else:
-                    color = "#d7191c"
-                
-                folium.CircleMarker(
-                    location=[lat, lon],
-                    radius=10,
-                    color=color,
-                    fill=True,
-                    fill_color=color,
-                    fill_opacity=0.8,
-                    popup=f"{name}: {score}/10"
-                ).add_to(m)
+        # Concurrents et meilleurs emplacements dans une seule couche GeoJSON
+        layer = FeatureLayer(MAP_STYLES)
+        
+        # Ajouter les concurrents (triés par distance : les plus proches sont conservés)
+        competitors = geo_data.get("competitors", [])
+        layer.add_points(
+            [competitor["latitude"] for competitor in competitors],
+            [competitor["longitude"] for competitor in competitors],
+            "competitor",
+            popups=[competitor["name"] for competitor in competitors]
+        )
+        
+        # Ajouter les meilleurs emplacements trouvés dans la zone
+        for site in geo_data.get("best_sites", []):
+            score = site["global_score"]
+            
+            # Déterminer la classe de couleur en fonction du score
+            if score > 8:
+                style = "site_excellent"
+            elif score > 7:
+                style = "site_good"
+            elif score > 6:
+                style = "site_average"
+            else:
+                style = "site_poor"
+            
+            layer.add_points([site["latitude"]], [site["longitude"]], style,
+                             popups=[f"Emplacement n°{site['rank']}: {score}/10"])
+        
+        layer.add_to(m)
         
         # Enregistrer la carte
-        map_path = os.path.join(self.cache_dir, f"location_map_{location.location_id}.html")
-        m.save(map_path)
+        m.save(path)
+    
+    def _compute_heatmap_surface(self, 
+                               location: CommercialLocation, 
+                               geo_data: Dict[str, Any], 
+                               resolution: int = HEATMAP_RESOLUTION) -> Tuple[np.ndarray, Tuple[float, float, float, float]]:
+        """
+        Calcule la surface d'attractivité affichée par la heatmap.
+        
+        Args:
+            location (CommercialLocation): Emplacement analysé
+            geo_data (dict): Données géographiques
+            resolution (int): Nombre de cellules par côté de la grille
+            
+        Returns:
+            tuple: Surface normalisée et emprise (ouest, est, sud, nord)
+        """
+        # Utiliser les POI et concurrents réels lorsqu'ils sont disponibles
+        if "pois" in geo_data or geo_data.get("competitors"):
+            surface = self._compute_attractiveness_surface(location, geo_data, resolution=resolution)
+            return surface["normalized"], surface["extent"]
         
-        # Retourner le chemin relatif
-        return f"/static/visualizations/location_map_{location.location_id}.html"
+        bounds = (
+            location.longitude - HEATMAP_HALF_EXTENT,
+            location.latitude - HEATMAP_HALF_EXTENT,
+            location.longitude + HEATMAP_HALF_EXTENT,
+            location.latitude + HEATMAP_HALF_EXTENT
+        )
+        
+        # Un point chaud au centre, plus des points chauds aléatoires
+        kernels = [[location.longitude, location.latitude, 1.0, HEATMAP_CENTER_SCALE]]
+        for _ in range(HEATMAP_RANDOM_HOTSPOTS):
+            kernels.append([
+                np.random.uniform(bounds[0], bounds[2]),
+                np.random.uniform(bounds[1], bounds[3]),
+                np.random.random() * 0.8 + 0.2,
+                HEATMAP_HOTSPOT_SCALE
+            ])
+        
+        from src.utils.kernel_surface import compute_kernel_surface
+        return compute_kernel_surface(bounds, kernels, resolution=resolution)
+    
+    def _compute_attractiveness_surface(self, 
+                                        location: CommercialLocation, 
+                                        geo_data: Dict[str, Any], 
+                                        resolution: int = 500, 
+                                        layers: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Calcule la surface d'attractivité à partir des POI et des concurrents.
+        
+        Les POI contribuent positivement (pondérés par le facteur 'population'),
+        les concurrents négativement (pondérés par le facteur 'competition').
+        
+        Args:
+            location (CommercialLocation): Emplacement analysé
+            geo_data (dict): Données géographiques
+            resolution (int): Nombre de cellules par côté de la grille
+            layers (dict, optional): Configuration des noyaux par couche
+            
+        Returns:
+            dict: Surface d'attractivité (voir compute_attractiveness_surface)
+        """
+        from src.utils.attractiveness_surface import compute_attractiveness_surface
+        from src.utils.geo_utils import centroid_coordinates
+        
+        points = {}
+        
+        pois = self._commercial_pois(geo_data.get("pois"))
+        if len(pois) > 0:
+            points["pois"] = centroid_coordinates(pois.geometry)
+        
+        competitors = geo_data.get("competitors", [])
+        if competitors:
+            points["competitors"] = (
+                np.array([competitor["longitude"] for competitor in competitors]),
+                np.array([competitor["latitude"] for competitor in competitors])
+            )
+        
+        return compute_attractiveness_surface(
+            location.latitude,
+            location.longitude,
+            location.radius,
+            points,
+            location.importance_factors,
+            resolution=resolution,
+            layers=layers
+        )
     
     def _generate_heatmap(self, 
                         location: CommercialLocation, 
                         geo_data: Dict[str, Any], 
                         ai_analysis: Dict[str, Any]) -> str:
         """
-        Génère une heatmap pour l'analyse d'emplacement commercial.
+        Génère (ou réutilise) une heatmap pour l'analyse d'emplacement commercial.
         
         Args:
             location (CommercialLocation): Emplacement analysé
@@ -430,59 +1107,29 @@ class CommercialLocationService:
         Returns:
             str: Chemin vers la heatmap générée
         """
-        # Créer une figure
-        fig, ax = plt.subplots(figsize=(10, 8))
-        
-        # Générer une grille de points
-        grid_size = 100
-        x = np.linspace(location.longitude - 0.01, location.longitude + 0.01, grid_size)
-        y = np.linspace(location.latitude - 0.01, location.latitude + 0.01, grid_size)
-        X, Y = np.meshgrid(x, y)
-        
-        # Générer des valeurs d'attractivité simulées
-        Z = np.zeros((grid_size, grid_size))
-        
-        # Ajouter un point chaud au centre
-        center_x = grid_size // 2
-        center_y = grid_size // 2
-        for i in range(grid_size):
-            for j in range(grid_size):
-                # Distance au centre
-                d = np.sqrt((i - center_x) ** 2 + (j - center_y) ** 2)
-                # Valeur d'attractivité décroissante avec la distance
-                Z[i, j] = np.exp(-d / 20)
-        
-        # Ajouter des points chauds aléatoires
-        for _ in range(5):
-            x_idx = np.random.randint(0, grid_size)
-            y_idx = np.random.randint(0, grid_size)
-            intensity = np.random.random() * 0.8 + 0.2
-            
-            for i in range(grid_size):
-                for j in range(grid_size):
-                    # Distance au point chaud
-                    d = np.sqrt((i - x_idx) ** 2 + (j - y_idx) ** 2)
-                    # Valeur d'attractivité décroissante avec la distance
-                    Z[i, j] += intensity * np.exp(-d / 15)
-        
-        # Normaliser les valeurs
-        Z = Z / np.max(Z)
-        
-        # Créer la heatmap
-        im = ax.imshow(Z, cmap='hot', extent=[x.min(), x.max(), y.min(), y.max()], 
-                      origin='lower', alpha=0.7)
-        
-        # Ajouter une barre de couleur
-        cbar = plt.colorbar(im, ax=ax)
-        cbar.set_label('Attractivité')
-        
-        # Ajouter un titre
-        plt.title(f"Carte de chaleur d'attractivité - {location.location_name}")
-        
-        # Enregistrer la figure
-        heatmap_path = os.path.join(self.cache_dir, f"location_heatmap_{location.location_id}.png")
-        plt.savefig(heatmap_path, dpi=100, bbox_inches='tight')
-        plt.close(fig)
-        
-        # Retourner le chemin relatif
-        return f"/static/visualizations/location_heatmap_{location.location_id}.png"
+        return self._submit_heatmap(location, geo_data).result()
+    
+    def _submit_heatmap(self, 
+                        location: CommercialLocation, 
+                        geo_data: Dict[str, Any]) -> Future:
+        """
+        Lance le rendu de la heatmap dans le pool de rendu (sauf si elle est en cache).
+        
+        La surface d'attractivité est calculée dans le thread appelant ; seul le
+        dessin matplotlib est exécuté dans un processus du pool.
+        
+        Args:
+            location (CommercialLocation): Emplacement analysé
+            geo_data (dict): Données géographiques
+            
+        Returns:
+            Future: Chemin vers la heatmap générée
+        """
+        def submit(path: str) -> Future:
+            Z, extent = self._compute_heatmap_surface(location, geo_data)
+            return self.render_pool.submit_chart("render_heatmap", path, Z, extent, 
+                                           f"Carte de chaleur d'attractivité - {location.location_name}")
+        
+        return self.visualization_cache.get_or_render_async(
+            "location_heatmap", "png", self._visualization_inputs(location, geo_data), submit
+        )
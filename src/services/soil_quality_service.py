@@ -3,72 +3,192 @@ Service pour l'analyse de la qualité des sols.
 """
 import os
 import json
-import geopandas as gpd
-import pandas as pd
-import folium
-import matplotlib.pyplot as plt
-import seaborn as sns
-from typing import Dict, Any, List, Optional, Tuple
-import osmnx as ox
-from shapely.geometry import Point, Polygon
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple
+from concurrent.futures import Future
 import numpy as np
 from src.utils.deepseek_client import DeepseekClient
 from src.models.soil_quality import SoilQuality
 from src.models.analysis_result import AnalysisResult
+from src.utils.visualization_cache import VisualizationCache, get_visualization_cache, visualization_key
+from src.utils.render_pool import RenderPool, get_render_pool
+from src.utils.single_flight import SingleFlight
+from src.utils.geocode_cache import normalize_place_name
+
+if TYPE_CHECKING:
+    from src.utils.geocode_cache import GeocodeCache
+
+# Étapes de l'analyse signalées au callback d'avancement
+ANALYSIS_STAGES = ("soil_data", "ai_analysis", "visualizations")
 
 class SoilQualityService:
     """
     Service pour l'analyse de la qualité des sols.
     """
-    def __init__(self, use_mock: bool = True):
+    def __init__(self, 
+                 use_mock: bool = True, 
+                 geocode_cache: Optional["GeocodeCache"] = None, 
+                 visualization_cache: Optional[VisualizationCache] = None, 
+                 render_pool: Optional[RenderPool] = None, 
+                 deepseek_client: Optional[DeepseekClient] = None, 
+                 single_flight: Optional[SingleFlight] = None):
         """
         Initialise le service d'analyse de la qualité des sols.
         
         Args:
             use_mock (bool): Si True, utilise des données simulées au lieu de données réelles.
+            geocode_cache (GeocodeCache, optional): Cache de géocodage (partagé par défaut en mode réel)
+            visualization_cache (VisualizationCache, optional): Cache des visualisations (partagé par défaut)
+            render_pool (RenderPool, optional): Pool de processus des rendus matplotlib (partagé par défaut)
+            deepseek_client (DeepseekClient, optional): Client de l'API DeepSeek R1, par exemple
+                un SyncDeepseekBridge (par défaut un DeepseekClient synchrone)
+            single_flight (SingleFlight, optional): Regroupement des analyses identiques en cours
         """
         self.use_mock = use_mock
-        self.deepseek_client = DeepseekClient(use_mock=use_mock)
+        self.geocode_cache = geocode_cache
+        if not use_mock and geocode_cache is None:
+            from src.utils.geocode_cache import get_geocode_cache
+            self.geocode_cache = get_geocode_cache()
+        self.visualization_cache = visualization_cache or get_visualization_cache()
+        self.render_pool = render_pool or get_render_pool()
+        self.deepseek_client = deepseek_client or DeepseekClient(use_mock=use_mock)
+        self.single_flight = single_flight or SingleFlight()
         self.cache_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 
                                      "src", "static", "visualizations")
         os.makedirs(self.cache_dir, exist_ok=True)
         
-    def analyze_soil(self, soil: SoilQuality) -> AnalysisResult:
+    def analyze_soil(self, 
+                     soil: SoilQuality, 
+                     progress_callback: Optional[Callable[[str, int, int], None]] = None) -> AnalysisResult:
         """
         Analyse la qualité des sols.
         
         Args:
             soil (SoilQuality): Sol à analyser
+            progress_callback (callable, optional): Appelé au début de chaque étape
+                (voir ANALYSIS_STAGES) avec (étape, étapes terminées, nombre d'étapes),
+                puis avec ('done', n, n) à la fin de l'analyse
             
         Returns:
-            AnalysisResult: Résultats de l'analyse
+            AnalysisResult: Résultats de l'analyse (le même objet pour les
+                analyses identiques demandées simultanément, exécutées une seule fois)
+        """
+        def run():
+            result = None
+            for event, payload in self.analyze_soil_events(soil, progress_callback):
+                if event == "result":
+                    result = payload
+            return result, soil
+        
+        result, analyzed = self.single_flight.do(self._flight_key(soil), run)
+        if analyzed is not soil:
+            # Analyse regroupée : reprendre les coordonnées géocodées par la première requête
+            if soil.latitude == 0.0 and soil.longitude == 0.0:
+                soil.latitude = analyzed.latitude
+                soil.longitude = analyzed.longitude
+            if progress_callback is not None:
+                progress_callback("done", len(ANALYSIS_STAGES), len(ANALYSIS_STAGES))
+        return result
+    
+    def _flight_key(self, soil: SoilQuality) -> Tuple[Any, ...]:
+        """
+        Clé des analyses identiques : lieu et culture normalisés, coordonnées,
+        profondeur et facteurs d'importance.
+        """
+        return (
+            "soil",
+            normalize_place_name(soil.location_name),
+            normalize_place_name(soil.crop_type),
+            round(float(soil.latitude), 6),
+            round(float(soil.longitude), 6),
+            soil.depth,
+            tuple(sorted(soil.importance_factors.items()))
+        )
+    
+    def coalescing_stats(self) -> Dict[str, Any]:
+        """
+        Renvoie les statistiques de regroupement des analyses identiques.
+        
+        Returns:
+            dict: Appels, exécutions et appels regroupés (collapsed)
         """
+        return self.single_flight.stats()
+    
+    def analyze_soil_events(self, 
+                            soil: SoilQuality, 
+                            progress_callback: Optional[Callable[[str, int, int], None]] = None
+                            ) -> Iterator[Tuple[str, Any]]:
+        """
+        Analyse la qualité des sols en produisant les résultats partiels dès
+        que chaque étape se termine.
+        
+        Événements produits, dans l'ordre :
+            - 'geocode' : nom et coordonnées de la parcelle
+            - 'features' : propriétés du sol, zones (sans les polygones) et échantillons
+            - 'scores' : scores de compatibilité de l'analyse IA
+            - 'recommendations' : analyse et recommandations de l'IA
+            - 'visualizations' : URL de la carte et de la carte de qualité des sols
+            - 'result' : AnalysisResult complet (ou précédé d'un événement 'error')
+        
+        Args:
+            soil (SoilQuality): Sol à analyser
+            progress_callback (callable, optional): Callback d'avancement (voir analyze_soil)
+            
+        Yields:
+            tuple: (nom de l'événement, données)
+        """
+        def progress(stage: str):
+            if progress_callback is not None:
+                completed = ANALYSIS_STAGES.index(stage) if stage in ANALYSIS_STAGES else len(ANALYSIS_STAGES)
+                progress_callback(stage, completed, len(ANALYSIS_STAGES))
+        
         # Créer un résultat d'analyse
         result = AnalysisResult(analysis_type="soil")
         
         try:
             # Récupérer les données pédologiques
+            progress("soil_data")
             if not self.use_mock:
+                self._resolve_coordinates(soil)
+                yield "geocode", self._location_summary(soil)
                 soil_data = self._get_soil_data(soil)
             else:
                 soil_data = self._mock_soil_data(soil)
+                yield "geocode", self._location_summary(soil)
+            yield "features", self._features_summary(soil_data)
             
-            # Analyser les données avec DeepSeek R1
-            ai_analysis = self.deepseek_client.analyze_soil_quality(
+            # Analyser les données avec DeepSeek R1 (réponse lue en flux : les
+            # scores sont publiés dès qu'ils sont reçus, avant les recommandations)
+            progress("ai_analysis")
+            ai_analysis = {}
+            partial_scores = None
+            for name, value in self.deepseek_client.stream_soil_quality(
                 soil.location_name,
                 soil.crop_type,
                 {
                     "depth": soil.depth,
                     "importance_factors": soil.importance_factors
                 }
-            )
+            ):
+                if name == "compatibility":
+                    partial_scores = value
+                    yield "scores", value
+                elif name == "result":
+                    ai_analysis = value
+            result.scores = ai_analysis.get("analysis_results", {}).get("compatibility", {})
+            result.recommendations = ai_analysis.get("ai_recommendations", {}).get("recommendations", [])
+            if result.scores != partial_scores:
+                yield "scores", result.scores
+            yield "recommendations", {
+                "analysis": ai_analysis.get("ai_recommendations", {}).get("analysis", ""),
+                "recommendations": result.recommendations
+            }
             
             # Générer les visualisations
+            progress("visualizations")
             visualizations = self._generate_visualizations(soil, soil_data, ai_analysis)
+            yield "visualizations", visualizations
             
             # Structurer les résultats
-            result.scores = ai_analysis.get("analysis_results", {}).get("compatibility", {})
-            result.recommendations = ai_analysis.get("ai_recommendations", {}).get("recommendations", [])
             result.visualizations = visualizations
             result.raw_data = {
                 "soil_data": soil_data,
@@ -82,13 +202,71 @@ class SoilQualityService:
                 "visualizations": result.visualizations
             })
             
-            return result
+            progress("done")
             
         except Exception as e:
             print(f"Erreur lors de l'analyse du sol: {e}")
+            yield "error", {"error": str(e)}
+            result = AnalysisResult(result_id=result.result_id, analysis_type="soil")
             result.add_score("error", 1.0)
             result.add_recommendation(f"Une erreur est survenue lors de l'analyse: {str(e)}")
-            return result
+        
+        yield "result", result
+    
+    def _location_summary(self, soil: SoilQuality) -> Dict[str, Any]:
+        """
+        Résume l'emplacement d'une parcelle (nom et coordonnées).
+        """
+        return {
+            "name": soil.location_name,
+            "latitude": soil.latitude,
+            "longitude": soil.longitude
+        }
+    
+    def _features_summary(self, soil_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Résume les données pédologiques d'une parcelle pour un résultat partiel.
+        
+        Args:
+            soil_data (dict): Données pédologiques
+            
+        Returns:
+            dict: Propriétés du sol, zones (sans les polygones) et échantillons
+        """
+        summary = {
+            "crop_type": soil_data.get("crop_type"),
+            "soil_properties": soil_data.get("soil_properties"),
+            "zones": [
+                {key: value for key, value in zone.items() if key != "polygon"}
+                for zone in soil_data.get("zones", [])
+            ],
+            "samples": soil_data.get("samples"),
+            "error": soil_data.get("error")
+        }
+        return {key: value for key, value in summary.items() if value is not None}
+    
+    def _resolve_coordinates(self, soil: SoilQuality):
+        """
+        Géocode la parcelle si ses coordonnées ne sont pas définies
+        (Toulouse par défaut en cas d'échec).
+        
+        Args:
+            soil (SoilQuality): Sol à géocoder
+        """
+        if soil.latitude != 0.0 or soil.longitude != 0.0:
+            return
+        
+        try:
+            geocoded = self.geocode_cache.geocode(soil.location_name)
+            if geocoded is None:
+                raise ValueError(f"Lieu introuvable: {soil.location_name}")
+            soil.latitude = geocoded["latitude"]
+            soil.longitude = geocoded["longitude"]
+        except Exception as e:
+            print(f"Erreur lors de la géolocalisation: {e}")
+            # Valeurs par défaut pour Toulouse
+            soil.latitude = 43.6047
+            soil.longitude = 1.4442
     
     def _get_soil_data(self, soil: SoilQuality) -> Dict[str, Any]:
         """
@@ -101,18 +279,10 @@ class SoilQualityService:
             dict: Données pédologiques
         """
         # Récupérer les coordonnées géographiques si elles ne sont pas déjà définies
-        if soil.latitude == 0.0 and soil.longitude == 0.0:
-            try:
-                gdf = ox.geocode_to_gdf(soil.location_name)
-                soil.latitude = gdf.iloc[0].geometry.centroid.y
-                soil.longitude = gdf.iloc[0].geometry.centroid.x
-            except Exception as e:
-                print(f"Erreur lors de la géolocalisation: {e}")
-                # Valeurs par défaut pour Toulouse
-                soil.latitude = 43.6047
-                soil.longitude = 1.4442
+        self._resolve_coordinates(soil)
         
         # Créer un point pour l'emplacement
+        from shapely.geometry import Point
         point = Point(soil.longitude, soil.latitude)
         
         # Récupérer les données de sol
@@ -374,24 +544,56 @@ class SoilQualityService:
         # Si on n'utilise pas les mocks, générer des visualisations réelles
         if not self.use_mock:
             try:
+                # Lancer la carte de qualité des sols dans le pool de rendu pendant la génération de la carte
+                soil_map_future = self._submit_soil_quality_map(soil, soil_data)
+                
                 # Générer une carte interactive
                 map_path = self._generate_interactive_map(soil, soil_data, ai_analysis)
                 visualizations["map"] = map_path
                 
-                # Générer une carte de qualité des sols
-                soil_map_path = self._generate_soil_quality_map(soil, soil_data, ai_analysis)
-                visualizations["soil_map"] = soil_map_path
+                # Attendre la carte de qualité des sols
+                visualizations["soil_map"] = soil_map_future.result()
             except Exception as e:
                 print(f"Erreur lors de la génération des visualisations: {e}")
         
         return visualizations
     
+    def visualization_stats(self) -> Dict[str, Any]:
+        """
+        Renvoie les statistiques de rendu et de réutilisation des visualisations.
+        
+        Returns:
+            dict: Statistiques du cache de visualisations
+        """
+        return self.visualization_cache.stats()
+    
+    def _visualization_inputs(self, soil: SoilQuality, soil_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Rassemble les données qui déterminent les visualisations d'une analyse.
+        
+        Les données pédologiques n'ayant pas de version, leur condensat en tient lieu.
+        
+        Args:
+            soil (SoilQuality): Sol analysé
+            soil_data (dict): Données pédologiques
+            
+        Returns:
+            dict: Clé de la visualisation
+        """
+        return {
+            "latitude": round(soil.latitude, 6),
+            "longitude": round(soil.longitude, 6),
+            "crop_type": soil.crop_type,
+            "location_name": soil.location_name,
+            "data_version": visualization_key(soil_data)
+        }
+    
     def _generate_interactive_map(self, 
                                 soil: SoilQuality, 
                                 soil_data: Dict[str, Any], 
                                 ai_analysis: Dict[str, Any]) -> str:
         """
-        Génère une carte interactive pour l'analyse de la qualité des sols.
+        Génère (ou réutilise) une carte interactive pour l'analyse de la qualité des sols.
         
         Args:
             soil (SoilQuality): Sol analysé
@@ -401,35 +603,52 @@ class SoilQualityService:
         Returns:
             str: Chemin vers la carte générée
         """
-        # Créer une carte Folium centrée sur l'emplacement
-        m = folium.Map(
-            location=[soil.latitude, soil.longitude],
-            zoom_start=15,
-            tiles="OpenStreetMap"
+        return self.visualization_cache.get_or_render(
+            "soil_map", "html", self._visualization_inputs(soil, soil_data),
+            lambda path: self._render_interactive_map(soil, soil_data, path)
         )
+    
+    def _render_interactive_map(self, soil: SoilQuality, soil_data: Dict[str, Any], path: str):
+        """
+        Dessine la carte interactive de l'analyse de la qualité des sols.
+        
+        Args:
+            soil (SoilQuality): Sol analysé
+            soil_data (dict): Données pédologiques
+            path (str): Fichier HTML à écrire
+        """
+        # Créer une carte Folium centrée sur l'emplacement
+        import folium
+        from src.utils.map_builder import FeatureLayer, create_map
+        
+        m = create_map(soil.latitude, soil.longitude)
+        
+        # Zones et échantillons dans une seule couche GeoJSON stylée côté client
+        zones = soil_data.get("zones", [])
+        styles = {
+            f"zone_{i}": {"color": zone["color"], "fillColor": zone["color"], "fillOpacity": 0.5, "weight": 3}
+            for i, zone in enumerate(zones)
+        }
+        styles["sample"] = {"radius": 5, "color": "#000", "fillColor": "#fff", "fillOpacity": 0.8, "weight": 2}
+        layer = FeatureLayer(styles)
         
         # Ajouter les zones de qualité des sols
-        for zone in soil_data.get("zones", []):
-            folium.Polygon(
-                locations=zone["polygon"],
-                color=zone["color"],
-                fill=True,
-                fill_color=zone["color"],
-                fill_opacity=0.5,
-                popup=f"{zone['name']} - Score: {zone['score']}/10 - {zone['proportion']}%"
-            ).add_to(m)
+        for i, zone in enumerate(zones):
+            layer.add_polygon(zone["polygon"], f"zone_{i}",
+                              popup=f"{zone['name']} - Score: {zone['score']}/10 - {zone['proportion']}%")
         
         # Ajouter les échantillons de sol
-        for sample in soil_data.get("samples", []):
-            folium.CircleMarker(
-                location=sample["position"],
-                radius=5,
-                color="#000",
-                fill=True,
-                fill_color="#fff",
-                fill_opacity=0.8,
-                popup=f"pH: {sample['ph']}<br>Texture: {sample['texture']}<br>Matière organique: {sample['organic_matter']}%"
-            ).add_to(m)
+        samples = soil_data.get("samples", [])
+        layer.add_points(
+            [sample["position"][0] for sample in samples],
+            [sample["position"][1] for sample in samples],
+            "sample",
+            popups=[
+                f"pH: {sample['ph']}\nTexture: {sample['texture']}\nMatière organique: {sample['organic_matter']}%"
+                for sample in samples
+            ]
+        )
+        layer.add_to(m)
         
         # Ajouter une légende
         legend_html = """
@@ -460,18 +679,14 @@ class SoilQualityService:
         m.get_root().html.add_child(folium.Element(legend_html))
         
         # Enregistrer la carte
-        map_path = os.path.join(self.cache_dir, f"soil_map_{soil.soil_id}.html")
-        m.save(map_path)
-        
-        # Retourner le chemin relatif
-        return f"/static/visualizations/soil_map_{soil.soil_id}.html"
+        m.save(path)
     
     def _generate_soil_quality_map(self, 
                                  soil: SoilQuality, 
                                  soil_data: Dict[str, Any], 
                                  ai_analysis: Dict[str, Any]) -> str:
         """
-        Génère une carte de qualité des sols.
+        Génère (ou réutilise) une carte de qualité des sols.
         
         Args:
             soil (SoilQuality): Sol analysé
@@ -481,41 +696,27 @@ class SoilQualityService:
         Returns:
             str: Chemin vers la carte générée
         """
-        # Créer une figure
-        fig, ax = plt.subplots(figsize=(10, 8))
-        
-        # Dessiner un fond blanc
-        ax.set_facecolor('white')
-        
-        # Dessiner une grille légère
-        ax.grid(True, linestyle='--', alpha=0.3)
-        
-        # Dessiner les zones de qualité des sols
-        for zone in soil_data.get("zones", []):
-            polygon = np.array(zone["polygon"])
-            ax.fill(polygon[:, 1], polygon[:, 0], color=zone["color"], alpha=0.5, 
-                   label=f"{zone['name']} ({zone['proportion']}%)")
-            ax.plot(polygon[:, 1], polygon[:, 0], color='black', linewidth=1)
-        
-        # Dessiner les échantillons de sol
-        for sample in soil_data.get("samples", []):
-            ax.plot(sample["position"][1], sample["position"][0], 'ko', markersize=8, 
-                   markerfacecolor='white', label='_nolegend_')
-        
-        # Ajouter une légende
-        ax.legend(loc='upper right')
-        
-        # Ajouter un titre
-        plt.title(f"Analyse de la qualité des sols pour {soil.crop_type} - {soil.location_name}")
-        
-        # Ajouter des étiquettes d'axes
-        plt.xlabel("Longitude")
-        plt.ylabel("Latitude")
+        return self._submit_soil_quality_map(soil, soil_data).result()
+    
+    def _submit_soil_quality_map(self, soil: SoilQuality, soil_data: Dict[str, Any]) -> Future:
+        """
+        Lance le rendu de la carte de qualité des sols dans le pool de rendu (sauf si elle est en cache).
         
-        # Enregistrer la figure
-        soil_map_path = os.path.join(self.cache_dir, f"soil_quality_map_{soil.soil_id}.png")
-        plt.savefig(soil_map_path, dpi=100, bbox_inches='tight')
-        plt.close(fig)
+        Args:
+            soil (SoilQuality): Sol analysé
+            soil_data (dict): Données pédologiques
+            
+        Returns:
+            Future: Chemin vers la carte générée
+        """
+        def submit(path: str) -> Future:
+            return self.render_pool.submit_chart(
+                "render_soil_quality_map", path, 
+                soil_data.get("zones", []), 
+                soil_data.get("samples", []), 
+                f"Analyse de la qualité des sols pour {soil.crop_type} - {soil.location_name}"
+            )
         
-        # Retourner le chemin relatif
-        return f"/static/visualizations/soil_quality_map_{soil.soil_id}.png"
+        return self.visualization_cache.get_or_render_async(
+            "soil_quality_map", "png", self._visualization_inputs(soil, soil_data), submit
+        )
@@ -10,6 +10,10 @@ document.addEventListener('DOMContentLoaded', function() {
   const loadingContainer = document.getElementById('loading-container');
   const resultsContainer = document.getElementById('results-container');
   
+  // Dernière analyse terminée (identifiant et données envoyées), repondérable sans relancer la chaîne
+  let lastResultId = null;
+  let lastRequest = null;
+  
   // Gestion du formulaire
   if (form) {
     form.addEventListener('submit', function(e) {
@@ -29,12 +33,18 @@ document.addEventListener('DOMContentLoaded', function() {
   
   // Fonction pour analyser un emplacement
   function analyzeLocation() {
-    // Afficher le chargement
-    initialContainer.style.display = 'none';
-    loadingContainer.style.display = 'block';
-    resultsContainer.style.display = 'none';
+    const data = getFormData();
     
-    // Récupérer les données du formulaire
+    // Seuls les facteurs d'importance ont changé : repondérer la dernière analyse
+    if (lastResultId && onlyFactorsChanged(lastRequest, data)) {
+      reweightAnalysis(data);
+    } else {
+      runAnalysis(data);
+    }
+  }
+  
+  // Fonction pour récupérer les données du formulaire
+  function getFormData() {
     const location = document.getElementById('location').value;
     const businessType = document.getElementById('business-type').value;
     const radius = document.getElementById('radius').value;
@@ -46,7 +56,7 @@ document.addEventListener('DOMContentLoaded', function() {
     const visibilityFactor = document.getElementById('visibility-factor').value / 10;
     
     // Préparer les données pour l'API
-    const data = {
+    return {
       location: location,
       business_type: businessType,
       parameters: {
@@ -59,15 +69,151 @@ document.addEventListener('DOMContentLoaded', function() {
         }
       }
     };
+  }
+  
+  // Fonction pour comparer deux demandes : même emplacement et même rayon, facteurs différents
+  function onlyFactorsChanged(previous, current) {
+    if (!previous) {
+      return false;
+    }
+    return previous.location === current.location
+      && previous.business_type === current.business_type
+      && previous.parameters.radius === current.parameters.radius
+      && JSON.stringify(previous.parameters.importance_factors) !== JSON.stringify(current.parameters.importance_factors);
+  }
+  
+  // Fonction pour lancer une analyse complète
+  function runAnalysis(data) {
+    // Afficher le chargement
+    initialContainer.style.display = 'none';
+    loadingContainer.style.display = 'block';
+    resultsContainer.style.display = 'none';
+    lastResultId = null;
+    lastRequest = null;
     
-    // Appel à l'API (simulé pour le prototype)
+    // Appel à l'API en flux : chaque étape terminée est affichée dès sa réception
     console.log('Données envoyées à l\'API:', data);
     
-    // Simuler un délai de chargement
-    setTimeout(() => {
-      // Dans une implémentation réelle, ceci serait un appel fetch à l'API
-      mockApiResponse(data);
-    }, 2000);
+    let received = false;
+    streamAnalysis('/commercial/api/analyze/stream', data, (event, payload) => {
+      if (!received) {
+        received = true;
+        clearResults();
+        showResults();
+      }
+      handleStreamEvent(event, payload, data);
+    }).catch(error => {
+      console.error('Erreur:', error);
+      // Utiliser des données mockées si l'API est indisponible
+      if (!received) {
+        mockApiResponse(data);
+      }
+    });
+  }
+  
+  // Fonction pour repondérer la dernière analyse avec les nouveaux facteurs d'importance
+  function reweightAnalysis(data) {
+    console.log('Repondération de l\'analyse', lastResultId, data.parameters.importance_factors);
+    fetch('/commercial/api/reweight', {
+      method: 'POST',
+      headers: {'Content-Type': 'application/json'},
+      body: JSON.stringify({
+        result_id: lastResultId,
+        importance_factors: data.parameters.importance_factors
+      })
+    })
+      .then(response => {
+        if (response.status === 404) {
+          // Analyse expirée côté serveur : relancer l'analyse complète
+          runAnalysis(data);
+          return;
+        }
+        return response.json().then(result => {
+          if (!response.ok) {
+            throw new Error(result.error || `HTTP ${response.status}`);
+          }
+          lastResultId = result.result_id;
+          lastRequest = data;
+          displayScores(result.scores);
+          displayBestSites(result.best_sites);
+        });
+      })
+      .catch(error => {
+        console.error('Erreur lors de la repondération:', error);
+        displayRecommendations(`Une erreur est survenue lors de la repondération: ${error.message}`);
+      });
+  }
+  
+  // Fonction pour lire un flux Server-Sent Events renvoyé par une requête POST
+  async function streamAnalysis(url, data, onEvent) {
+    const response = await fetch(url, {
+      method: 'POST',
+      headers: {'Content-Type': 'application/json', 'Accept': 'text/event-stream'},
+      body: JSON.stringify(data)
+    });
+    if (!response.ok || !response.body) {
+      throw new Error(`Erreur lors de l'analyse (HTTP ${response.status})`);
+    }
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      const {done, value} = await reader.read();
+      if (done) {
+        break;
+      }
+      buffer += decoder.decode(value, {stream: true});
+      
+      // Un événement se termine par une ligne vide
+      let separator;
+      while ((separator = buffer.indexOf('\n\n')) >= 0) {
+        const block = buffer.slice(0, separator);
+        buffer = buffer.slice(separator + 2);
+        let event = 'message';
+        const lines = [];
+        block.split('\n').forEach(line => {
+          if (line.startsWith('event:')) {
+            event = line.slice(6).trim();
+          } else if (line.startsWith('data:')) {
+            lines.push(line.slice(5).trimStart());
+          }
+        });
+        if (lines.length > 0) {
+          onEvent(event, JSON.parse(lines.join('\n')));
+        }
+      }
+    }
+  }
+  
+  // Fonction pour afficher un résultat partiel de l'analyse
+  function handleStreamEvent(event, payload, requestData) {
+    switch (event) {
+      case 'features':
+        displayFeatures(payload.pois_count, payload.road_density, (payload.competitors || []).length);
+        displayBestSites(payload.best_sites);
+        break;
+      case 'scores':
+        displayScores(payload);
+        break;
+      case 'recommendations':
+        displayRecommendations(payload.analysis);
+        break;
+      case 'visualizations':
+        displayVisualizations(payload, requestData.location);
+        break;
+      case 'result':
+        // Conserver l'identifiant du résultat pour les repondérations suivantes
+        if (payload.scores && payload.scores.error === undefined) {
+          lastResultId = payload.result_id;
+          lastRequest = requestData;
+        }
+        break;
+      case 'error':
+        console.error('Erreur lors de l\'analyse:', payload.error);
+        displayRecommendations(`Une erreur est survenue lors de l'analyse: ${payload.error}`);
+        break;
+    }
   }
   
   // Fonction pour charger un exemple
@@ -198,40 +344,88 @@ document.addEventListener('DOMContentLoaded', function() {
   
   // Fonction pour afficher les résultats
   function displayResults(data) {
+    showResults();
+    displayScores(data.analysis_results.score);
+    displayVisualizations(data.visualizations, data.location);
+    if (data.ai_recommendations) {
+      displayRecommendations(data.ai_recommendations.analysis);
+    }
+    if (data.analysis_results) {
+      displayFeatures(data.analysis_results.poi_counts, data.analysis_results.road_density, data.analysis_results.competitors);
+    }
+  }
+  
+  // Fonction pour afficher le conteneur des résultats
+  function showResults() {
     // Masquer le chargement et afficher les résultats
     loadingContainer.style.display = 'none';
     resultsContainer.style.display = 'block';
-    
-    // Afficher les scores
-    document.getElementById('global-score').textContent = data.analysis_results.score.global_score;
-    document.getElementById('poi-score').textContent = data.analysis_results.score.poi_score;
-    document.getElementById('road-score').textContent = data.analysis_results.score.road_score;
-    document.getElementById('competition-score').textContent = data.analysis_results.score.competition_score;
-    
+  }
+  
+  // Fonction pour effacer les résultats d'une analyse précédente
+  function clearResults() {
+    displayScores({});
+    displayRecommendations('Analyse en cours...');
+    document.getElementById('map-frame').src = 'about:blank';
+    document.getElementById('heatmap-image').removeAttribute('src');
+    displayBestSites(null);
+  }
+  
+  // Fonction pour afficher les scores
+  function displayScores(score) {
+    ['global', 'poi', 'road', 'competition'].forEach(name => {
+      const value = score[`${name}_score`];
+      document.getElementById(`${name}-score`).textContent = value !== undefined ? value : '-';
+    });
+  }
+  
+  // Fonction pour afficher la carte et la heatmap
+  function displayVisualizations(visualizations, location) {
     // Afficher la carte
     const mapFrame = document.getElementById('map-frame');
-    if (mapFrame && data.visualizations && data.visualizations.map) {
-      mapFrame.src = data.visualizations.map;
+    if (mapFrame && visualizations && visualizations.map) {
+      mapFrame.src = visualizations.map;
     }
     
     // Afficher la heatmap
     const heatmapImage = document.getElementById('heatmap-image');
-    if (heatmapImage && data.visualizations && data.visualizations.heatmap) {
-      heatmapImage.src = data.visualizations.heatmap;
-      heatmapImage.alt = `Carte de chaleur d'attractivité pour ${data.location}`;
+    if (heatmapImage && visualizations && visualizations.heatmap) {
+      heatmapImage.src = visualizations.heatmap;
+      heatmapImage.alt = `Carte de chaleur d'attractivité pour ${location}`;
     }
-    
-    // Afficher les recommandations
+  }
+  
+  // Fonction pour afficher les recommandations
+  function displayRecommendations(analysis) {
     const aiRecommendations = document.getElementById('ai-recommendations');
-    if (aiRecommendations && data.ai_recommendations) {
-      aiRecommendations.innerHTML = data.ai_recommendations.analysis.replace(/\n/g, '<br>');
+    if (aiRecommendations && analysis) {
+      aiRecommendations.innerHTML = analysis.replace(/\n/g, '<br>');
     }
-    
-    // Afficher les données d'analyse
+  }
+  
+  // Fonction pour afficher les meilleurs emplacements de la zone
+  function displayBestSites(sites) {
+    const container = document.getElementById('best-sites-container');
+    const table = document.getElementById('best-sites-table');
+    if (!container || !table) {
+      return;
+    }
+    table.innerHTML = '';
+    (sites || []).forEach(site => {
+      const row = document.createElement('tr');
+      row.innerHTML = `<td>${site.rank}</td><td>${site.latitude.toFixed(5)}</td>`
+        + `<td>${site.longitude.toFixed(5)}</td><td>${site.global_score}</td>`;
+      table.appendChild(row);
+    });
+    container.style.display = sites && sites.length > 0 ? 'block' : 'none';
+  }
+  
+  // Fonction pour afficher les données d'analyse
+  function displayFeatures(poiCounts, roadDensity, competitorsCount) {
     const poiTable = document.getElementById('poi-table');
-    if (poiTable && data.analysis_results && data.analysis_results.poi_counts) {
+    if (poiTable && poiCounts) {
       poiTable.innerHTML = '';
-      for (const [type, count] of Object.entries(data.analysis_results.poi_counts)) {
+      for (const [type, count] of Object.entries(poiCounts)) {
         const row = document.createElement('tr');
         row.innerHTML = `<td>${type}</td><td>${count}</td>`;
         poiTable.appendChild(row);
@@ -239,9 +433,9 @@ document.addEventListener('DOMContentLoaded', function() {
     }
     
     // Afficher les autres métriques
-    if (data.analysis_results) {
-      document.getElementById('road-density').textContent = data.analysis_results.road_density.toFixed(3);
-      document.getElementById('competitors-count').textContent = data.analysis_results.competitors;
+    if (typeof roadDensity === 'number') {
+      document.getElementById('road-density').textContent = roadDensity.toFixed(3);
     }
+    document.getElementById('competitors-count').textContent = competitorsCount;
   }
 });
@@ -60,14 +60,90 @@ document.addEventListener('DOMContentLoaded', function() {
       }
     };
     
-    // Appel à l'API (simulé pour le prototype)
+    // Appel à l'API en flux : chaque étape terminée est affichée dès sa réception
     console.log('Données envoyées à l\'API:', data);
     
-    // Simuler un délai de chargement
-    setTimeout(() => {
-      // Dans une implémentation réelle, ceci serait un appel fetch à l'API
-      mockApiResponse(data);
-    }, 2000);
+    let received = false;
+    streamAnalysis('/soil/api/analyze/stream', data, (event, payload) => {
+      if (!received) {
+        received = true;
+        clearResults();
+        showResults();
+        document.getElementById('crop-name').textContent = data.crop_type;
+      }
+      handleStreamEvent(event, payload, data);
+    }).catch(error => {
+      console.error('Erreur:', error);
+      // Utiliser des données mockées si l'API est indisponible
+      if (!received) {
+        mockApiResponse(data);
+      }
+    });
+  }
+  
+  // Fonction pour lire un flux Server-Sent Events renvoyé par une requête POST
+  async function streamAnalysis(url, data, onEvent) {
+    const response = await fetch(url, {
+      method: 'POST',
+      headers: {'Content-Type': 'application/json', 'Accept': 'text/event-stream'},
+      body: JSON.stringify(data)
+    });
+    if (!response.ok || !response.body) {
+      throw new Error(`Erreur lors de l'analyse (HTTP ${response.status})`);
+    }
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      const {done, value} = await reader.read();
+      if (done) {
+        break;
+      }
+      buffer += decoder.decode(value, {stream: true});
+      
+      // Un événement se termine par une ligne vide
+      let separator;
+      while ((separator = buffer.indexOf('\n\n')) >= 0) {
+        const block = buffer.slice(0, separator);
+        buffer = buffer.slice(separator + 2);
+        let event = 'message';
+        const lines = [];
+        block.split('\n').forEach(line => {
+          if (line.startsWith('event:')) {
+            event = line.slice(6).trim();
+          } else if (line.startsWith('data:')) {
+            lines.push(line.slice(5).trimStart());
+          }
+        });
+        if (lines.length > 0) {
+          onEvent(event, JSON.parse(lines.join('\n')));
+        }
+      }
+    }
+  }
+  
+  // Fonction pour afficher un résultat partiel de l'analyse
+  function handleStreamEvent(event, payload, requestData) {
+    switch (event) {
+      case 'features':
+        displaySoilProperties(payload.soil_properties);
+        displayZones(payload.zones);
+        break;
+      case 'scores':
+        displayScores(payload);
+        break;
+      case 'recommendations':
+        displayRecommendations(payload.analysis);
+        break;
+      case 'visualizations':
+        displayVisualizations(payload, requestData.location);
+        break;
+      case 'error':
+        console.error('Erreur lors de l\'analyse:', payload.error);
+        displayRecommendations(`Une erreur est survenue lors de l'analyse: ${payload.error}`);
+        break;
+    }
   }
   
   // Fonction pour charger un exemple
@@ -241,61 +317,94 @@ document.addEventListener('DOMContentLoaded', function() {
   
   // Fonction pour afficher les résultats
   function displayResults(data) {
-    // Masquer le chargement et afficher les résultats
-    loadingContainer.style.display = 'none';
-    resultsContainer.style.display = 'block';
+    showResults();
     
     // Mettre à jour le nom de la culture
     document.getElementById('crop-name').textContent = data.crop_type;
     
-    // Afficher les scores
     if (data.analysis_results && data.analysis_results.compatibility) {
-      const compatibility = data.analysis_results.compatibility;
-      document.getElementById('global-score').textContent = compatibility.global_score;
-      document.getElementById('ph-score').textContent = compatibility.ph_score;
-      document.getElementById('drainage-score').textContent = compatibility.drainage_score;
-      document.getElementById('texture-score').textContent = compatibility.texture_score;
+      displayScores(data.analysis_results.compatibility);
     }
-    
+    displayVisualizations(data.visualizations, data.location);
+    if (data.ai_recommendations) {
+      displayRecommendations(data.ai_recommendations.analysis);
+    }
+    if (data.analysis_results) {
+      displaySoilProperties(data.analysis_results.soil_properties);
+      displayZones(data.analysis_results.zones);
+    }
+  }
+  
+  // Fonction pour afficher le conteneur des résultats
+  function showResults() {
+    // Masquer le chargement et afficher les résultats
+    loadingContainer.style.display = 'none';
+    resultsContainer.style.display = 'block';
+  }
+  
+  // Fonction pour effacer les résultats d'une analyse précédente
+  function clearResults() {
+    displayScores({});
+    displayRecommendations('Analyse en cours...');
+    document.getElementById('map-frame').src = 'about:blank';
+    document.getElementById('soil-map-image').removeAttribute('src');
+  }
+  
+  // Fonction pour afficher les scores de compatibilité
+  function displayScores(compatibility) {
+    ['global', 'ph', 'drainage', 'texture'].forEach(name => {
+      const value = compatibility[`${name}_score`];
+      document.getElementById(`${name}-score`).textContent = value !== undefined ? value : '-';
+    });
+  }
+  
+  // Fonction pour afficher la carte et la carte de qualité des sols
+  function displayVisualizations(visualizations, location) {
     // Afficher la carte
     const mapFrame = document.getElementById('map-frame');
-    if (mapFrame && data.visualizations && data.visualizations.map) {
-      mapFrame.src = data.visualizations.map;
+    if (mapFrame && visualizations && visualizations.map) {
+      mapFrame.src = visualizations.map;
     }
     
     // Afficher la carte de qualité des sols
     const soilMapImage = document.getElementById('soil-map-image');
-    if (soilMapImage && data.visualizations && data.visualizations.soil_map) {
-      soilMapImage.src = data.visualizations.soil_map;
-      soilMapImage.alt = `Carte de qualité des sols pour ${data.location}`;
+    if (soilMapImage && visualizations && visualizations.soil_map) {
+      soilMapImage.src = visualizations.soil_map;
+      soilMapImage.alt = `Carte de qualité des sols pour ${location}`;
     }
-    
-    // Afficher les recommandations
+  }
+  
+  // Fonction pour afficher les recommandations
+  function displayRecommendations(analysis) {
     const aiRecommendations = document.getElementById('ai-recommendations');
-    if (aiRecommendations && data.ai_recommendations) {
-      aiRecommendations.innerHTML = data.ai_recommendations.analysis.replace(/\n/g, '<br>');
+    if (aiRecommendations && analysis) {
+      aiRecommendations.innerHTML = analysis.replace(/\n/g, '<br>');
     }
-    
-    // Afficher les propriétés du sol
-    if (data.analysis_results && data.analysis_results.soil_properties) {
-      const properties = data.analysis_results.soil_properties;
+  }
+  
+  // Fonction pour afficher les propriétés du sol
+  function displaySoilProperties(properties) {
+    if (properties) {
       document.getElementById('soil-texture').textContent = properties.texture;
       document.getElementById('soil-ph').textContent = properties.ph;
       document.getElementById('soil-organic').textContent = `${properties.organic_matter}%`;
       document.getElementById('soil-drainage').textContent = properties.drainage;
     }
-    
-    // Afficher les zones
+  }
+  
+  // Fonction pour afficher les zones (couleur selon le score : les zones de l'API
+  // portent une couleur hexadécimale)
+  function displayZones(zones) {
     const zonesSummary = document.getElementById('zones-summary');
-    if (zonesSummary && data.analysis_results && data.analysis_results.zones) {
+    if (zonesSummary && zones) {
       zonesSummary.innerHTML = '';
       
-      data.analysis_results.zones.forEach(zone => {
+      zones.forEach(zone => {
         const zoneCard = document.createElement('div');
         zoneCard.className = 'card mb-2';
         
         const cardHeader = document.createElement('div');
-        cardHeader.className = `card-header ${zone.color === 'green' ? 'bg-success' : zone.color === 'yellow' ? 'bg-warning' : 'bg-danger'} text-white`;
+        cardHeader.className = `card-header ${zone.score >= 7 ? 'bg-success' : zone.score >= 5 ? 'bg-warning' : 'bg-danger'} text-white`;
         cardHeader.innerHTML = `${zone.name} (${zone.proportion}%)`;
         
         const cardBody = document.createElement('div');
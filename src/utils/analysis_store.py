@@ -0,0 +1,85 @@
+"""
+Stockage en mémoire des analyses récentes, indexé par identifiant de résultat.
+Les sous-scores, données géographiques et couches d'une analyse y sont
+conservés pour pouvoir la repondérer sans relancer toute la chaîne.
+"""
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+DEFAULT_MAX_ENTRIES = 32
+DEFAULT_TTL = 3600
+
+
+class AnalysisStore:
+    """
+    Stockage LRU borné (nombre d'entrées et durée de vie) et thread-safe.
+    """
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL):
+        """
+        Initialise le stockage.
+
+        Args:
+            max_entries (int): Nombre maximal d'analyses conservées
+            ttl (float): Durée de conservation d'une analyse en secondes
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def put(self, result_id: str, entry: Dict[str, Any]):
+        """
+        Conserve une analyse, en évinçant la moins récemment utilisée si nécessaire.
+
+        Args:
+            result_id (str): Identifiant du résultat
+            entry (dict): Données de l'analyse
+        """
+        with self._lock:
+            self._entries[result_id] = (time.time() + self.ttl, entry)
+            self._entries.move_to_end(result_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get(self, result_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Récupère une analyse conservée.
+
+        Args:
+            result_id (str): Identifiant du résultat
+
+        Returns:
+            dict: Données de l'analyse, ou None si elle est inconnue ou expirée
+        """
+        with self._lock:
+            item = self._entries.get(result_id)
+            if item is None or item[0] < time.time():
+                if item is not None:
+                    del self._entries[result_id]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(result_id)
+            self.hits += 1
+            return item[1]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Renvoie les statistiques d'utilisation du stockage.
+
+        Returns:
+            dict: Nombre d'entrées, succès, échecs et évictions
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions
+            }
@@ -0,0 +1,488 @@
+"""
+Client asynchrone (asyncio + aiohttp) pour l'API DeepSeek R1.
+Les analyses par lots ou multi-scénarios lancent de nombreux appels à l'IA :
+ce client les exécute simultanément sur un pool de connexions HTTP/1.1
+keep-alive, avec les mêmes prompts, le même cache et les mêmes traitements de
+réponse que DeepseekClient. Le nombre d'appels simultanés est borné par un
+sémaphore et leur débit par un seau à jetons, ralenti à chaque réponse 429
+puis accéléré progressivement. SyncDeepseekBridge permet aux services
+synchrones d'utiliser ce client.
+
+La session HTTP et les primitives asyncio sont créées dans la boucle
+d'événements de l'appelant, puis recréées si le client est utilisé depuis une
+nouvelle boucle (appels successifs à asyncio.run) ; la session d'une boucle
+est fermée à l'arrêt de celle-ci. Le client ne doit être utilisé que par une
+boucle à la fois.
+"""
+import time
+import asyncio
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import aiohttp
+
+from src.utils.deepseek_client import COMMERCIAL_RESPONSE_KEYS, SOIL_RESPONSE_KEYS, DeepseekClient
+from src.utils.http_transport import (
+    DEFAULT_BACKOFF_BASE, DEFAULT_BACKOFF_MAX, DEFAULT_CONNECT_TIMEOUT, DEFAULT_MAX_RETRIES,
+    DEFAULT_READ_TIMEOUT, RETRY_STATUSES, backoff_delay, retry_after_seconds
+)
+from src.utils.llm_cache import LLMResponseCache
+
+# Appels simultanés (taille du pool de connexions) et débit maximal (appels par seconde)
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_RATE = 10.0
+
+# Débit minimal après des réponses 429 et part du débit maximal regagnée à chaque succès
+MIN_RATE = 0.2
+RATE_RECOVERY = 0.1
+
+# Durée de conservation des connexions inactives en secondes
+KEEPALIVE_TIMEOUT = 30.0
+
+# Analyse demandée au client par lot : (lieu, type de commerce ou de culture, paramètres)
+AnalysisRequest = Tuple[str, str, Dict[str, Any]]
+
+
+class TokenBucket:
+    """
+    Seau à jetons adaptatif : le débit est divisé par deux à chaque réponse 429
+    (et les appels suspendus pendant la durée demandée par le serveur), puis
+    augmenté de RATE_RECOVERY * débit maximal à chaque succès.
+    """
+    def __init__(self, rate: float = DEFAULT_RATE, capacity: Optional[float] = None, min_rate: float = MIN_RATE):
+        """
+        Initialise le seau.
+
+        Args:
+            rate (float): Débit maximal en jetons par seconde
+            capacity (float, optional): Nombre de jetons accumulables (par défaut le débit)
+            min_rate (float): Débit minimal en jetons par seconde
+        """
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop = None
+
+    async def acquire(self):
+        """
+        Attend un jeton (les appelants sont servis dans l'ordre d'arrivée).
+        """
+        # Verrou propre à la boucle d'événements courante
+        loop = asyncio.get_running_loop()
+        if self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._blocked_until:
+                    await asyncio.sleep(self._blocked_until - now)
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def throttle(self, delay: float):
+        """
+        Réduit le débit après une réponse 429.
+
+        Args:
+            delay (float): Durée pendant laquelle aucun jeton n'est distribué, en secondes
+        """
+        self.rate = max(self.min_rate, self.rate / 2)
+        self._tokens = 0.0
+        self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+
+    def recover(self):
+        """
+        Augmente progressivement le débit après un succès.
+        """
+        self.rate = min(self.max_rate, self.rate + RATE_RECOVERY * self.max_rate)
+
+
+class AsyncDeepseekClient(DeepseekClient):
+    """
+    Variante asynchrone de DeepseekClient pour les appels en parallèle.
+    """
+    def __init__(self,
+                 api_key: Optional[str] = None,
+                 use_mock: bool = True,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 rate: float = DEFAULT_RATE,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout: float = DEFAULT_READ_TIMEOUT,
+                 max_retries: int = DEFAULT_MAX_RETRIES,
+                 response_cache: Optional[LLMResponseCache] = None,
+                 use_cache: bool = True,
+                 api_url: Optional[str] = None):
+        """
+        Initialise le client (la session HTTP est créée au premier appel, dans
+        la boucle d'événements de l'appelant, et fermée à l'arrêt de celle-ci).
+
+        Args:
+            api_key (str, optional): Clé API pour DeepSeek R1 (par défaut $DEEPSEEK_API_KEY)
+            use_mock (bool): Si True, utilise des réponses simulées au lieu d'appeler l'API réelle
+            max_concurrency (int): Nombre maximal d'appels simultanés (et de connexions)
+            rate (float): Débit maximal en appels par seconde
+            connect_timeout (float): Délai d'établissement de la connexion en secondes
+            read_timeout (float): Délai maximal entre deux lectures de la réponse en secondes
+            max_retries (int): Nombre maximal de relances d'un appel (429, 5xx, erreurs réseau)
+            response_cache (LLMResponseCache, optional): Cache des réponses (partagé par défaut)
+            use_cache (bool): Si False, chaque analyse appelle l'API
+            api_url (str, optional): URL de base de l'API (par défaut $DEEPSEEK_API_URL
+                ou l'API DeepSeek)
+        """
+        super().__init__(api_key=api_key, use_mock=use_mock,
+                         response_cache=response_cache, use_cache=use_cache, api_url=api_url)
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+        self.max_retries = max_retries
+        self.rate_limiter = TokenBucket(rate)
+        # Ressources liées à une boucle d'événements (voir _bind_loop)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._closer: Optional[asyncio.Task] = None
+        self._stats = {"calls": 0, "attempts": 0, "retries": 0, "throttled": 0, "failures": 0,
+                       "in_flight": 0, "max_in_flight": 0}
+
+    async def analyze_commercial_location(self,
+                                          location: str,
+                                          business_type: str,
+                                          parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Analyse un emplacement commercial (voir DeepseekClient.analyze_commercial_location).
+
+        Args:
+            location (str): Nom de l'emplacement
+            business_type (str): Type de commerce
+            parameters (dict): Paramètres d'analyse
+
+        Returns:
+            dict: Résultats de l'analyse
+        """
+        if self.use_mock:
+            return self._mock_commercial_location_response(location, business_type, parameters)
+        return await self._analyze(location, business_type, parameters,
+                                   self._build_commercial_location_prompt,
+                                   self._normalize_commercial_location_response,
+                                   COMMERCIAL_RESPONSE_KEYS)
+
+    async def analyze_soil_quality(self,
+                                   location: str,
+                                   crop_type: str,
+                                   parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Analyse la qualité des sols (voir DeepseekClient.analyze_soil_quality).
+
+        Args:
+            location (str): Nom de l'emplacement
+            crop_type (str): Type de culture
+            parameters (dict): Paramètres d'analyse
+
+        Returns:
+            dict: Résultats de l'analyse
+        """
+        if self.use_mock:
+            return self._mock_soil_quality_response(location, crop_type, parameters)
+        return await self._analyze(location, crop_type, parameters,
+                                   self._build_soil_quality_prompt,
+                                   self._normalize_soil_quality_response,
+                                   SOIL_RESPONSE_KEYS)
+
+    async def analyze_commercial_locations(self,
+                                           requests: Iterable[AnalysisRequest],
+                                           return_exceptions: bool = False) -> List[Any]:
+        """
+        Analyse plusieurs emplacements commerciaux simultanément.
+
+        Args:
+            requests (iterable): Analyses (lieu, type de commerce, paramètres)
+            return_exceptions (bool): Si True, une erreur est renvoyée à la place
+                du résultat concerné au lieu d'interrompre le lot
+
+        Returns:
+            list: Résultats, dans l'ordre des demandes
+        """
+        return await asyncio.gather(
+            *(self.analyze_commercial_location(*request) for request in requests),
+            return_exceptions=return_exceptions
+        )
+
+    async def analyze_soil_qualities(self,
+                                     requests: Iterable[AnalysisRequest],
+                                     return_exceptions: bool = False) -> List[Any]:
+        """
+        Analyse plusieurs sols simultanément.
+
+        Args:
+            requests (iterable): Analyses (lieu, type de culture, paramètres)
+            return_exceptions (bool): Si True, une erreur est renvoyée à la place
+                du résultat concerné au lieu d'interrompre le lot
+
+        Returns:
+            list: Résultats, dans l'ordre des demandes
+        """
+        return await asyncio.gather(
+            *(self.analyze_soil_quality(*request) for request in requests),
+            return_exceptions=return_exceptions
+        )
+
+    async def close(self):
+        """
+        Ferme la session HTTP et ses connexions (le prochain appel les recrée).
+        """
+        closer, self._closer, self._loop = self._closer, None, None
+        if closer is not None and closer is not asyncio.current_task():
+            closer.cancel()
+        if self._session is not None:
+            session, self._session = self._session, None
+            await session.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def async_stats(self) -> Dict[str, Any]:
+        """
+        Renvoie les compteurs des appels asynchrones.
+
+        Returns:
+            dict: Appels, tentatives, relances, réponses 429, échecs, appels en
+                cours (et maximum atteint) et débit courant
+        """
+        stats = dict(self._stats)
+        stats["rate"] = round(self.rate_limiter.rate, 2)
+        stats["max_concurrency"] = self.max_concurrency
+        return stats
+
+    async def _analyze(self,
+                       location: str,
+                       subject: str,
+                       parameters: Dict[str, Any],
+                       build_prompt: Callable[[str, str, Dict[str, Any]], str],
+                       normalize: Callable[[Dict[str, Any]], Dict[str, Any]],
+                       expected_keys: Tuple[str, ...]) -> Dict[str, Any]:
+        """
+        Appelle l'API si la réponse n'est pas en cache, puis la traite
+        (voir DeepseekClient._analyze_events).
+        """
+        cache, key, parameters = self._cache_entry(location, subject, parameters, build_prompt)
+        response = cache.get(key) if cache is not None else None
+        if response is None:
+            response = await self._call_api_async(build_prompt(location, subject, parameters))
+            result = self._structured_result(response, normalize, expected_keys)
+            if cache is not None and "error" not in result:
+                cache.set(key, response)
+            return result
+        return self._structured_result(response, normalize, expected_keys)
+
+    async def _call_api_async(self, prompt: str) -> Dict[str, Any]:
+        """
+        Appelle l'API DeepSeek R1.
+
+        Les réponses 429 réduisent le débit du seau à jetons ; les erreurs 5xx
+        et réseau sont relancées avec un délai exponentiel aléatoire.
+
+        Args:
+            prompt (str): Prompt à envoyer à l'API
+
+        Returns:
+            dict: Réponse de l'API
+
+        Raises:
+            Exception: En cas d'erreur lors de l'appel à l'API (après les relances)
+        """
+        self._bind_loop()
+        session = self._get_session()
+        self._stats["calls"] += 1
+        attempt = 0
+        while True:
+            await self.rate_limiter.acquire()
+            async with self._semaphore:
+                self._stats["attempts"] += 1
+                self._stats["in_flight"] += 1
+                self._stats["max_in_flight"] = max(self._stats["max_in_flight"], self._stats["in_flight"])
+                try:
+                    async with session.post(f"{self.api_url}/chat/completions",
+                                            headers=self._headers(), json=self._payload(prompt)) as response:
+                        if response.status == 200:
+                            self.rate_limiter.recover()
+                            return await response.json(content_type=None)
+                        status = response.status
+                        error = await response.text()
+                        retry_after = retry_after_seconds(response.headers)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    status = None
+                    error = str(e) or type(e).__name__
+                    retry_after = 0.0
+                finally:
+                    self._stats["in_flight"] -= 1
+
+            if (status is not None and status not in RETRY_STATUSES) or attempt >= self.max_retries:
+                self._stats["failures"] += 1
+                raise Exception(f"Erreur lors de l'appel à l'API DeepSeek R1: {error}")
+
+            if status == 429:
+                # Le seau à jetons suspend tous les appels, pas seulement celui-ci
+                self._stats["throttled"] += 1
+                self.rate_limiter.throttle(max(retry_after, backoff_delay(attempt)))
+                delay = 0.0
+            else:
+                delay = backoff_delay(attempt, DEFAULT_BACKOFF_BASE, DEFAULT_BACKOFF_MAX)
+            attempt += 1
+            self._stats["retries"] += 1
+            await asyncio.sleep(delay)
+
+    def _bind_loop(self):
+        """
+        Associe le client à la boucle d'événements courante.
+
+        Au premier appel dans une boucle, le sémaphore est recréé et une tâche
+        d'arrière-plan est lancée pour fermer la session à l'arrêt de la boucle
+        (asyncio.run annule alors les tâches en cours). La session d'une boucle
+        précédente y a déjà été fermée.
+        """
+        loop = asyncio.get_running_loop()
+        if loop is self._loop:
+            return
+        self._loop = loop
+        self._session = None
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._closer = loop.create_task(self._close_with_loop())
+
+    async def _close_with_loop(self):
+        """
+        Attend l'arrêt de la boucle d'événements, puis ferme la session.
+        """
+        try:
+            await asyncio.get_running_loop().create_future()
+        finally:
+            if self._closer is asyncio.current_task():
+                await self.close()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """
+        Crée la session HTTP au premier appel (connexions keep-alive réutilisées).
+        """
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency, keepalive_timeout=KEEPALIVE_TIMEOUT)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+
+class SyncDeepseekBridge:
+    """
+    Interface synchrone d'un AsyncDeepseekClient.
+
+    Le client s'exécute dans une boucle d'événements dédiée (thread d'arrière-plan),
+    de sorte que ses connexions restent ouvertes d'un appel à l'autre. Le pont
+    expose les méthodes de DeepseekClient utilisées par les services, ainsi que
+    les analyses par lot.
+    """
+    def __init__(self, client: Optional[AsyncDeepseekClient] = None):
+        """
+        Démarre la boucle d'événements du client.
+
+        Args:
+            client (AsyncDeepseekClient, optional): Client à exposer (appels réels par défaut)
+        """
+        self.client = client or AsyncDeepseekClient(use_mock=False)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="deepseek-async", daemon=True)
+        self._thread.start()
+
+    @property
+    def use_mock(self) -> bool:
+        return self.client.use_mock
+
+    def run(self, coroutine) -> Any:
+        """
+        Exécute une coroutine dans la boucle du client et attend son résultat.
+
+        Args:
+            coroutine: Coroutine à exécuter (par exemple une méthode du client)
+
+        Returns:
+            any: Résultat de la coroutine
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def analyze_commercial_location(self,
+                                    location: str,
+                                    business_type: str,
+                                    parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Voir AsyncDeepseekClient.analyze_commercial_location.
+        """
+        return self.run(self.client.analyze_commercial_location(location, business_type, parameters))
+
+    def analyze_soil_quality(self,
+                             location: str,
+                             crop_type: str,
+                             parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Voir AsyncDeepseekClient.analyze_soil_quality.
+        """
+        return self.run(self.client.analyze_soil_quality(location, crop_type, parameters))
+
+    def stream_commercial_location(self,
+                                   location: str,
+                                   business_type: str,
+                                   parameters: Dict[str, Any],
+                                   stream: bool = True) -> Iterator[Tuple[str, Any]]:
+        """
+        Voir DeepseekClient.stream_commercial_location (la réponse est lue en une fois).
+        """
+        result = self.analyze_commercial_location(location, business_type, parameters)
+        if "analysis_results" in result:
+            yield "scores", result["analysis_results"].get("score", {})
+        yield "result", result
+
+    def stream_soil_quality(self,
+                            location: str,
+                            crop_type: str,
+                            parameters: Dict[str, Any],
+                            stream: bool = True) -> Iterator[Tuple[str, Any]]:
+        """
+        Voir DeepseekClient.stream_soil_quality (la réponse est lue en une fois).
+        """
+        result = self.analyze_soil_quality(location, crop_type, parameters)
+        if "analysis_results" in result:
+            yield "compatibility", result["analysis_results"].get("compatibility", {})
+        yield "result", result
+
+    def analyze_commercial_locations(self,
+                                     requests: Iterable[AnalysisRequest],
+                                     return_exceptions: bool = False) -> List[Any]:
+        """
+        Voir AsyncDeepseekClient.analyze_commercial_locations.
+        """
+        return self.run(self.client.analyze_commercial_locations(list(requests), return_exceptions))
+
+    def analyze_soil_qualities(self,
+                               requests: Iterable[AnalysisRequest],
+                               return_exceptions: bool = False) -> List[Any]:
+        """
+        Voir AsyncDeepseekClient.analyze_soil_qualities.
+        """
+        return self.run(self.client.analyze_soil_qualities(list(requests), return_exceptions))
+
+    def close(self):
+        """
+        Ferme la session du client et arrête la boucle d'événements.
+        """
+        self.run(self.client.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
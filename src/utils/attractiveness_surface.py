@@ -0,0 +1,253 @@
+"""
+Estimation de surfaces d'attractivité par convolution FFT.
+Les points d'intérêt (effet positif) et les concurrents (effet négatif) sont
+rastérisés sur une grille métrique, puis lissés par des noyaux configurables.
+"""
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import scipy.fft
+
+from src.utils.geo_utils import to_local_metric, metric_bounds
+
+# Configuration par défaut des couches (portées en mètres)
+DEFAULT_LAYERS = {
+    "pois": {
+        "kernel": "gaussian",
+        "bandwidth": 150.0,
+        "sign": 1.0,
+        "factor": "population"
+    },
+    "competitors": {
+        "kernel": "gaussian",
+        "bandwidth": 250.0,
+        "sign": -1.0,
+        "factor": "competition"
+    }
+}
+
+# Support des noyaux, en multiples de la portée
+KERNEL_TRUNCATION = {
+    "gaussian": 3.0,
+    "exponential": 6.0,
+    "epanechnikov": 1.0,
+    "uniform": 1.0
+}
+
+
+def rasterize_points(x: np.ndarray,
+                     y: np.ndarray,
+                     half_size: float,
+                     resolution: int,
+                     weights: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Rastérise des points métriques sur une grille carrée centrée.
+
+    Args:
+        x (np.ndarray): Coordonnées est en mètres
+        y (np.ndarray): Coordonnées nord en mètres
+        half_size (float): Demi-côté de la grille en mètres
+        resolution (int): Nombre de cellules par côté
+        weights (np.ndarray, optional): Poids de chaque point
+
+    Returns:
+        np.ndarray: Grille (lignes = nord, colonnes = est) des poids cumulés
+    """
+    cell_size = 2 * half_size / resolution
+    cols = np.floor((x + half_size) / cell_size).astype(np.int64)
+    rows = np.floor((y + half_size) / cell_size).astype(np.int64)
+    inside = (cols >= 0) & (cols < resolution) & (rows >= 0) & (rows < resolution)
+
+    if weights is not None:
+        weights = np.asarray(weights, dtype=np.float64)[inside]
+    flat = np.bincount(rows[inside] * resolution + cols[inside], weights=weights,
+                       minlength=resolution * resolution)
+    return flat.reshape(resolution, resolution).astype(np.float32)
+
+
+def kernel_grid(kernel: str, bandwidth: float, cell_size: float) -> np.ndarray:
+    """
+    Construit un noyau radial discret normalisé (somme égale à 1).
+
+    Args:
+        kernel (str): Forme du noyau ('gaussian', 'exponential', 'epanechnikov'
+                      ou 'uniform' pour un disque de rayon égal à la portée)
+        bandwidth (float): Portée du noyau en mètres
+        cell_size (float): Taille d'une cellule en mètres
+
+    Returns:
+        np.ndarray: Noyau carré de côté impair
+    """
+    if kernel not in KERNEL_TRUNCATION:
+        raise ValueError(f"Noyau inconnu: {kernel}")
+
+    radius = max(1, int(np.ceil(KERNEL_TRUNCATION[kernel] * bandwidth / cell_size)))
+    offsets = np.arange(-radius, radius + 1) * cell_size
+    d = np.hypot(offsets[None, :], offsets[:, None]) / bandwidth
+
+    if kernel == "gaussian":
+        values = np.exp(-0.5 * d * d)
+    elif kernel == "exponential":
+        values = np.exp(-d)
+    elif kernel == "uniform":
+        values = (d <= 1.0).astype(np.float64)
+    else:
+        values = np.clip(1.0 - d * d, 0.0, None)
+
+    return (values / values.sum()).astype(np.float32)
+
+
+def _kernel_radius(config: Dict[str, Any], cell_size: float) -> int:
+    """
+    Calcule le rayon en cellules du support d'un noyau.
+
+    Args:
+        config (dict): Configuration de la couche
+        cell_size (float): Taille d'une cellule en mètres
+
+    Returns:
+        int: Rayon du noyau en cellules
+    """
+    return max(1, int(np.ceil(KERNEL_TRUNCATION[config["kernel"]] * config["bandwidth"] / cell_size)))
+
+
+@lru_cache(maxsize=32)
+def _kernel_spectrum(kernel: str,
+                     bandwidth: float,
+                     cell_size: float,
+                     pad_radius: int,
+                     shape: Tuple[int, int]) -> np.ndarray:
+    """
+    Calcule (et met en cache) le spectre d'un noyau pour une taille de FFT donnée.
+
+    Le noyau est recentré sur `pad_radius` afin que toutes les couches
+    partagent le même décalage et puissent être sommées dans le domaine
+    fréquentiel.
+
+    Args:
+        kernel (str): Forme du noyau
+        bandwidth (float): Portée du noyau en mètres
+        cell_size (float): Taille d'une cellule en mètres
+        pad_radius (int): Rayon commun de recentrage en cellules
+        shape (tuple): Taille de la FFT
+
+    Returns:
+        np.ndarray: Spectre réel du noyau
+    """
+    values = kernel_grid(kernel, bandwidth, cell_size)
+    margin = pad_radius - values.shape[0] // 2
+    values = np.pad(values, margin)
+    return scipy.fft.rfft2(values, s=shape, workers=-1)
+
+
+def compute_attractiveness_surface(center_lat: float,
+                                   center_lon: float,
+                                   half_size: float,
+                                   points: Dict[str, Tuple[np.ndarray, np.ndarray]],
+                                   importance_factors: Dict[str, float],
+                                   resolution: int = 500,
+                                   layers: Optional[Dict[str, Dict[str, Any]]] = None,
+                                   return_layers: bool = False) -> Dict[str, Any]:
+    """
+    Calcule une surface d'attractivité à partir de couches de points.
+
+    Chaque couche est rastérisée puis convoluée par son noyau dans le domaine
+    fréquentiel ; les spectres pondérés sont additionnés avant une unique FFT
+    inverse, ce qui rend le coût indépendant du nombre de points.
+
+    Args:
+        center_lat (float): Latitude du centre de la grille
+        center_lon (float): Longitude du centre de la grille
+        half_size (float): Demi-côté de la grille en mètres
+        points (dict): Coordonnées (longitudes, latitudes[, poids]) par nom de couche
+        importance_factors (dict): Facteurs d'importance de l'analyse
+        resolution (int): Nombre de cellules par côté
+        layers (dict, optional): Configuration des couches (voir DEFAULT_LAYERS)
+        return_layers (bool): Si True, renvoie aussi la densité de chaque couche
+                              (poids par m² lissés par le noyau)
+
+    Returns:
+        dict: Surface brute, surface normalisée entre 0 et 1, emprise
+              (ouest, est, sud, nord), taille de cellule et densités éventuelles
+    """
+    layers = layers or DEFAULT_LAYERS
+    cell_size = 2 * half_size / resolution
+
+    # Taille de FFT minimale pour que le repliement circulaire du plus grand
+    # noyau ne touche pas la zone recadrée (N + r suffit, N + 2r est inutile)
+    max_radius = max(_kernel_radius(config, cell_size) for config in layers.values())
+    fft_size = scipy.fft.next_fast_len(resolution + max_radius, real=True)
+    shape = (fft_size, fft_size)
+
+    spectrum = None
+    layer_densities = {}
+    for name, config in layers.items():
+        if name not in points:
+            continue
+        longitudes, latitudes = points[name][:2]
+        if len(longitudes) == 0:
+            continue
+
+        weight = config.get("sign", 1.0) * importance_factors.get(config.get("factor"), 1.0)
+        x, y = to_local_metric(longitudes, latitudes, center_lon, center_lat)
+        raster = rasterize_points(x, y, half_size, resolution,
+                                  weights=points[name][2] if len(points[name]) > 2 else None)
+        layer_spectrum = scipy.fft.rfft2(raster, s=shape, workers=-1)
+        layer_spectrum *= _kernel_spectrum(config["kernel"], float(config["bandwidth"]), cell_size,
+                                           max_radius, shape)
+
+        if return_layers:
+            layer_densities[name] = _crop(scipy.fft.irfft2(layer_spectrum, s=shape, workers=-1),
+                                          max_radius, resolution) / (cell_size * cell_size)
+
+        layer_spectrum *= weight
+        if spectrum is None:
+            spectrum = layer_spectrum
+        else:
+            spectrum += layer_spectrum
+
+    if spectrum is None:
+        raw = np.zeros((resolution, resolution), dtype=np.float32)
+    else:
+        raw = _crop(scipy.fft.irfft2(spectrum, s=shape, workers=-1), max_radius, resolution)
+
+    west, south, east, north = metric_bounds(center_lon, center_lat, half_size)
+    return {
+        "surface": raw,
+        "normalized": _normalize(raw),
+        "extent": (west, east, south, north),
+        "cell_size": cell_size,
+        "layers": layer_densities
+    }
+
+
+def _crop(full: np.ndarray, radius: int, resolution: int) -> np.ndarray:
+    """
+    Recadre le résultat d'une convolution sur l'emprise de la grille.
+
+    Args:
+        full (np.ndarray): Convolution complète
+        radius (int): Décalage des noyaux en cellules
+        resolution (int): Nombre de cellules par côté
+
+    Returns:
+        np.ndarray: Densité sur la grille
+    """
+    return full[radius:radius + resolution, radius:radius + resolution]
+
+
+def _normalize(surface: np.ndarray) -> np.ndarray:
+    """
+    Ramène une surface entre 0 et 1.
+
+    Args:
+        surface (np.ndarray): Surface brute
+
+    Returns:
+        np.ndarray: Surface normalisée
+    """
+    low, high = float(surface.min()), float(surface.max())
+    if high - low <= 0:
+        return np.zeros_like(surface)
+    return (surface - low) / (high - low)
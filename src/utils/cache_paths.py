@@ -0,0 +1,26 @@
+"""
+Emplacement des caches persistants de l'application.
+"""
+import os
+
+# Variable d'environnement permettant de déplacer l'ensemble des caches
+CACHE_ROOT_ENV = "GEOMARKETING_CACHE_DIR"
+
+DEFAULT_CACHE_ROOT = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+                                  "cache")
+
+
+def get_cache_dir(name: str) -> str:
+    """
+    Renvoie (et crée si besoin) le répertoire d'un cache persistant.
+
+    Args:
+        name (str): Nom du cache (sous-répertoire)
+
+    Returns:
+        str: Chemin absolu du répertoire
+    """
+    root = os.environ.get(CACHE_ROOT_ENV) or DEFAULT_CACHE_ROOT
+    path = os.path.join(root, name)
+    os.makedirs(path, exist_ok=True)
+    return path
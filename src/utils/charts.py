@@ -0,0 +1,91 @@
+"""
+Rendu des graphiques statiques (PNG) avec l'API objet de matplotlib.
+Chaque appel crée sa propre Figure attachée à un canvas Agg, sans passer par
+l'état global de pyplot : les fonctions peuvent être appelées depuis plusieurs
+threads ou processus. Elles ne reçoivent que des données sérialisables, pour
+pouvoir être exécutées dans le pool de rendu (voir render_pool).
+"""
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# Taille et résolution des images générées
+FIGURE_SIZE = (10, 8)
+FIGURE_DPI = 100
+
+
+def new_figure() -> Figure:
+    """
+    Crée une figure indépendante de pyplot, rendue par un canvas Agg.
+
+    Returns:
+        Figure: Figure vide
+    """
+    fig = Figure(figsize=FIGURE_SIZE)
+    FigureCanvasAgg(fig)
+    return fig
+
+
+def render_heatmap(path: str, surface: np.ndarray, extent: Sequence[float], title: str):
+    """
+    Dessine une heatmap d'attractivité.
+
+    Args:
+        path (str): Fichier PNG à écrire
+        surface (np.ndarray): Surface normalisée (lignes, colonnes)
+        extent (tuple): Emprise (ouest, est, sud, nord)
+        title (str): Titre du graphique
+    """
+    fig = new_figure()
+    ax = fig.add_subplot()
+
+    # Créer la heatmap
+    im = ax.imshow(surface, cmap='hot', extent=extent, origin='lower', alpha=0.7)
+
+    # Ajouter une barre de couleur
+    cbar = fig.colorbar(im, ax=ax)
+    cbar.set_label('Attractivité')
+
+    ax.set_title(title)
+    fig.savefig(path, dpi=FIGURE_DPI, bbox_inches='tight')
+
+
+def render_soil_quality_map(path: str,
+                            zones: List[Dict[str, Any]],
+                            samples: List[Dict[str, Any]],
+                            title: str):
+    """
+    Dessine une carte des zones de qualité des sols et des échantillons.
+
+    Args:
+        path (str): Fichier PNG à écrire
+        zones (list): Zones (polygon, color, name, proportion)
+        samples (list): Échantillons (position [latitude, longitude])
+        title (str): Titre du graphique
+    """
+    fig = new_figure()
+    ax = fig.add_subplot()
+
+    # Dessiner un fond blanc et une grille légère
+    ax.set_facecolor('white')
+    ax.grid(True, linestyle='--', alpha=0.3)
+
+    # Dessiner les zones de qualité des sols
+    for zone in zones:
+        polygon = np.array(zone["polygon"])
+        ax.fill(polygon[:, 1], polygon[:, 0], color=zone["color"], alpha=0.5,
+                label=f"{zone['name']} ({zone['proportion']}%)")
+        ax.plot(polygon[:, 1], polygon[:, 0], color='black', linewidth=1)
+
+    # Dessiner les échantillons de sol
+    for sample in samples:
+        ax.plot(sample["position"][1], sample["position"][0], 'ko', markersize=8,
+                markerfacecolor='white', label='_nolegend_')
+
+    ax.legend(loc='upper right')
+    ax.set_title(title)
+    ax.set_xlabel("Longitude")
+    ax.set_ylabel("Latitude")
+    fig.savefig(path, dpi=FIGURE_DPI, bbox_inches='tight')
@@ -3,15 +3,67 @@ Module pour l'intégration avec DeepSeek R1.
 Ce client permet d'utiliser l'IA DeepSeek R1 pour l'analyse géospatiale.
 """
 import os
+import re
 import json
-import requests
-from typing import Dict, Any, Optional, List, Union
+import unicodedata
+from typing import Dict, Any, Optional, List, Union, Callable, Iterator, Tuple
+from src.utils.scoring import combine_commercial_scores
+from src.utils.http_transport import HttpTransport, get_http_transport
+from src.utils.llm_cache import LLMResponseCache, get_llm_response_cache, quantize_factors
+from src.utils.json_stream import JSONObjectStream, extract_json_object
+from src.utils.sse import parse_event_data
+
+# Modèle et paramètres de génération (inclus dans la clé du cache des réponses)
+MODEL = "deepseek-r1"
+TEMPERATURE = 0.2
+MAX_TOKENS = 2000
+
+# URL de l'API (remplaçable, par exemple par le serveur de substitution
+# benchmarks/deepseek_stub_server.py pour les tests de charge)
+DEFAULT_API_URL = "https://api.deepseek.com/v1"
+API_URL_ENV = "DEEPSEEK_API_URL"
+
+# Clés de premier niveau identifiant l'objet de réponse de chaque analyse : un
+# objet JSON cité dans le raisonnement qui n'en contient aucune est ignoré
+COMMERCIAL_RESPONSE_KEYS = ("scores", "hotspots", "analysis_results")
+SOIL_RESPONSE_KEYS = ("compatibility", "zones", "analysis_results")
+
+# Noms des scores renvoyés par le modèle (sans accents, en minuscules) et
+# noms utilisés par l'application, par clé de premier niveau de la réponse
+SCORE_ALIASES = {
+    "scores": {
+        "global": "global_score",
+        "poi": "poi_score",
+        "points_interet": "poi_score",
+        "points_d_interet": "poi_score",
+        "accessibility": "road_score",
+        "accessibilite": "road_score",
+        "road": "road_score",
+        "competition": "competition_score",
+        "concurrence": "competition_score"
+    },
+    "compatibility": {
+        "global": "global_score",
+        "ph": "ph_score",
+        "drainage": "drainage_score",
+        "texture": "texture_score",
+        "organic": "organic_score",
+        "organic_matter": "organic_score",
+        "matiere_organique": "organic_score"
+    }
+}
 
 class DeepseekClient:
     """
     Client pour l'API DeepSeek R1.
     """
-    def __init__(self, api_key: Optional[str] = None, use_mock: bool = True):
+    def __init__(self, 
+                 api_key: Optional[str] = None, 
+                 use_mock: bool = True, 
+                 transport: Optional[HttpTransport] = None, 
+                 response_cache: Optional[LLMResponseCache] = None, 
+                 use_cache: bool = True, 
+                 api_url: Optional[str] = None):
         """
         Initialise le client DeepSeek R1.
         
@@ -19,10 +71,19 @@ class DeepseekClient:
             api_key (str, optional): Clé API pour DeepSeek R1. Si non fournie, 
                                      utilise la variable d'environnement DEEPSEEK_API_KEY.
             use_mock (bool): Si True, utilise des réponses simulées au lieu d'appeler l'API réelle.
+            transport (HttpTransport, optional): Transport HTTP (pool de connexions,
+                délais et relances ; partagé par défaut)
+            response_cache (LLMResponseCache, optional): Cache des réponses (partagé par défaut)
+            use_cache (bool): Si False, chaque analyse appelle l'API
+            api_url (str, optional): URL de base de l'API (par défaut $DEEPSEEK_API_URL
+                                     ou l'API DeepSeek)
         """
         self.api_key = api_key or os.environ.get("DEEPSEEK_API_KEY", "")
-        self.api_url = "https://api.deepseek.com/v1"
+        self.api_url = (api_url or os.environ.get(API_URL_ENV) or DEFAULT_API_URL).rstrip("/")
         self.use_mock = use_mock
+        self.transport = transport or get_http_transport()
+        self.response_cache = response_cache
+        self.use_cache = use_cache
         
     def analyze_commercial_location(self, 
                                    location: str, 
@@ -39,17 +100,7 @@ class DeepseekClient:
         Returns:
             dict: Résultats de l'analyse
         """
-        if self.use_mock:
-            return self._mock_commercial_location_response(location, business_type, parameters)
-        
-        # Construction de la requête pour l'API réelle
-        prompt = self._build_commercial_location_prompt(location, business_type, parameters)
-        
-        # Appel à l'API DeepSeek R1
-        response = self._call_api(prompt)
-        
-        # Traitement de la réponse
-        return self._parse_commercial_location_response(response)
+        return self._last_result(self.stream_commercial_location(location, business_type, parameters, stream=False))
     
     def analyze_soil_quality(self, 
                             location: str, 
@@ -66,55 +117,309 @@ class DeepseekClient:
         Returns:
             dict: Résultats de l'analyse
         """
-        if self.use_mock:
-            return self._mock_soil_quality_response(location, crop_type, parameters)
-        
-        # Construction de la requête pour l'API réelle
-        prompt = self._build_soil_quality_prompt(location, crop_type, parameters)
-        
-        # Appel à l'API DeepSeek R1
-        response = self._call_api(prompt)
+        return self._last_result(self.stream_soil_quality(location, crop_type, parameters, stream=False))
+    
+    def stream_commercial_location(self, 
+                                   location: str, 
+                                   business_type: str, 
+                                   parameters: Dict[str, Any], 
+                                   stream: bool = True) -> Iterator[Tuple[str, Any]]:
+        """
+        Analyse un emplacement commercial en produisant chaque partie de la
+        réponse dès qu'elle est complète.
         
-        # Traitement de la réponse
-        return self._parse_soil_quality_response(response)
+        Args:
+            location (str): Nom de l'emplacement (ville, adresse, etc.)
+            business_type (str): Type de commerce (pharmacie, boulangerie, etc.)
+            parameters (dict): Paramètres d'analyse (rayon, facteurs d'importance, etc.)
+            stream (bool): Si True, la réponse de l'API est lue en flux
+            
+        Yields:
+            tuple: ('scores', scores normalisés) dès que la clé est refermée, puis
+                   ('hotspots', ...), ('recommendations', ...) et enfin
+                   ('result', résultats complets au format de analyze_commercial_location)
+        """
+        if self.use_mock:
+            response = self._mock_commercial_location_response(location, business_type, parameters)
+            yield "scores", response["analysis_results"]["score"]
+            yield "result", response
+            return
+        
+        yield from self._analyze_events(location, business_type, parameters,
+                                        self._build_commercial_location_prompt,
+                                        self._normalize_commercial_location_response,
+                                        COMMERCIAL_RESPONSE_KEYS, stream)
     
-    def _call_api(self, prompt: str) -> Dict[str, Any]:
+    def stream_soil_quality(self, 
+                            location: str, 
+                            crop_type: str, 
+                            parameters: Dict[str, Any], 
+                            stream: bool = True) -> Iterator[Tuple[str, Any]]:
         """
-        Appelle l'API DeepSeek R1.
+        Analyse la qualité des sols en produisant chaque partie de la réponse
+        dès qu'elle est complète.
         
         Args:
-            prompt (str): Prompt à envoyer à l'API
+            location (str): Nom de l'emplacement (ville, région, etc.)
+            crop_type (str): Type de culture (stevia, blé, etc.)
+            parameters (dict): Paramètres d'analyse (profondeur, facteurs d'importance, etc.)
+            stream (bool): Si True, la réponse de l'API est lue en flux
             
-        Returns:
-            dict: Réponse de l'API
+        Yields:
+            tuple: ('compatibility', scores normalisés) dès que la clé est refermée,
+                   puis ('zones', ...), ('recommendations', ...) et enfin
+                   ('result', résultats complets au format de analyze_soil_quality)
+        """
+        if self.use_mock:
+            response = self._mock_soil_quality_response(location, crop_type, parameters)
+            yield "compatibility", response["analysis_results"]["compatibility"]
+            yield "result", response
+            return
+        
+        yield from self._analyze_events(location, crop_type, parameters,
+                                        self._build_soil_quality_prompt,
+                                        self._normalize_soil_quality_response,
+                                        SOIL_RESPONSE_KEYS, stream)
+    
+    def _last_result(self, events: Iterator[Tuple[str, Any]]) -> Dict[str, Any]:
+        """
+        Consomme les événements d'une analyse et renvoie son résultat final.
+        """
+        result = None
+        for name, value in events:
+            if name == "result":
+                result = value
+        return result
+    
+    def _analyze_events(self, 
+                        location: str, 
+                        subject: str, 
+                        parameters: Dict[str, Any], 
+                        build_prompt: Callable[[str, str, Dict[str, Any]], str], 
+                        normalize: Callable[[Dict[str, Any]], Dict[str, Any]], 
+                        expected_keys: Tuple[str, ...], 
+                        stream: bool) -> Iterator[Tuple[str, Any]]:
+        """
+        Construit le prompt, appelle l'API si la réponse n'est pas en cache et
+        produit les membres de l'objet JSON renvoyé par le modèle, puis le résultat.
+        
+        La clé du cache est le prompt construit à partir des entrées normalisées
+        (noms, paramètres réels arrondis) : une modification du prompt invalide
+        donc les réponses existantes. Les réponses impossibles à traiter ne sont
+        pas conservées.
+        
+        Une clé peut être produite plusieurs fois (membre d'un objet finalement
+        abandonné par l'analyseur, réponse relue en entier) : la dernière valeur
+        produite et le résultat final font foi.
+        
+        Args:
+            location (str): Nom de l'emplacement
+            subject (str): Type de commerce ou de culture
+            parameters (dict): Paramètres d'analyse
+            build_prompt (callable): Construction du prompt (lieu, sujet, paramètres)
+            normalize (callable): Mise au format de l'application de l'objet renvoyé
+            expected_keys (tuple): Clés de premier niveau dont l'une au moins
+                identifie l'objet de réponse
+            stream (bool): Si True, la réponse est lue en flux
             
-        Raises:
-            Exception: En cas d'erreur lors de l'appel à l'API
+        Yields:
+            tuple: (clé de premier niveau, valeur) puis ('result', résultats structurés)
+        """
+        cache, key, parameters = self._cache_entry(location, subject, parameters, build_prompt)
+        response = cache.get(key) if cache is not None else None
+        
+        members = None
+        if response is None and stream:
+            # Chaque membre est produit dès que sa valeur est refermée
+            parser = JSONObjectStream(expected_keys)
+            content = []
+            for delta in self._call_api_stream(build_prompt(location, subject, parameters)):
+                content.append(delta)
+                for name, value in parser.feed(delta):
+                    yield name, self._normalize_member(name, value)
+            response = {"choices": [{"message": {"role": "assistant", "content": "".join(content)}}]}
+            members = parser.members if parser.complete else None
+            if members is not None:
+                # Des membres d'un objet abandonné ont pu être produits : les
+                # valeurs de l'objet retenu les remplacent
+                for name in parser.retracted:
+                    if name in members:
+                        yield name, self._normalize_member(name, members[name])
+        elif response is None:
+            response = self._call_api(build_prompt(location, subject, parameters))
+        
+        try:
+            if members is None:
+                members = self._parse_response(response, expected_keys)
+                for name, value in members.items():
+                    yield name, self._normalize_member(name, value)
+            result = normalize(members)
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"Erreur lors du parsing de la réponse: {e}")
+            result = {
+                "error": "Impossible de parser la réponse de l'API",
+                "raw_response": response
+            }
+        
+        if cache is not None and "error" not in result:
+            cache.set(key, response)
+        yield "result", result
+    
+    def _headers(self) -> Dict[str, str]:
+        """
+        En-têtes des requêtes à l'API DeepSeek R1.
         """
-        headers = {
+        return {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
         }
+    
+    def _payload(self, prompt: str, stream: bool = False) -> Dict[str, Any]:
+        """
+        Corps d'une requête de complétion.
         
+        Args:
+            prompt (str): Prompt à envoyer à l'API
+            stream (bool): Si True, demande une réponse en flux (SSE)
+            
+        Returns:
+            dict: Corps JSON de la requête
+        """
         data = {
-            "model": "deepseek-r1",
+            "model": MODEL,
             "messages": [
                 {"role": "user", "content": prompt}
             ],
-            "temperature": 0.2,
-            "max_tokens": 2000
+            "temperature": TEMPERATURE,
+            "max_tokens": MAX_TOKENS
         }
+        if stream:
+            data["stream"] = True
+        return data
+    
+    def _cache_entry(self, 
+                     location: str, 
+                     subject: str, 
+                     parameters: Dict[str, Any], 
+                     build_prompt: Callable[[str, str, Dict[str, Any]], str]
+                     ) -> Tuple[Optional[LLMResponseCache], Optional[str], Dict[str, Any]]:
+        """
+        Calcule la clé du cache des réponses d'une analyse.
         
-        response = requests.post(
+        Args:
+            location (str): Nom de l'emplacement
+            subject (str): Type de commerce ou de culture
+            parameters (dict): Paramètres d'analyse
+            build_prompt (callable): Construction du prompt (lieu, sujet, paramètres)
+            
+        Returns:
+            tuple: (cache, clé, paramètres arrondis à envoyer à l'API), ou
+                   (None, None, paramètres) si le cache est désactivé
+        """
+        if not self.use_cache:
+            return None, None, parameters
+        cache = self.response_cache or get_llm_response_cache()
+        parameters = quantize_factors(parameters, cache.factor_quantum)
+        normalized = cache.normalize_inputs(location, subject, parameters)
+        settings = {"model": MODEL, "temperature": TEMPERATURE, "max_tokens": MAX_TOKENS}
+        if self.api_url != DEFAULT_API_URL:
+            # Les réponses d'une autre API (serveur de substitution) ne sont pas partagées
+            settings["api_url"] = self.api_url
+        key = cache.key(
+            build_prompt(normalized["location"], normalized["subject"], normalized["parameters"]),
+            settings
+        )
+        return cache, key, parameters
+    
+    def _request(self, prompt: str, stream: bool = False):
+        """
+        Envoie une requête de complétion à l'API DeepSeek R1.
+        
+        Args:
+            prompt (str): Prompt à envoyer à l'API
+            stream (bool): Si True, demande une réponse en flux (SSE)
+            
+        Returns:
+            requests.Response: Réponse HTTP (statut 200)
+            
+        Raises:
+            Exception: En cas d'erreur lors de l'appel à l'API (après les relances
+                       des erreurs 429/5xx, ou si le délai de réponse est dépassé)
+        """
+        response = self.transport.post(
             f"{self.api_url}/chat/completions",
-            headers=headers,
-            json=data
+            headers=self._headers(),
+            json=self._payload(prompt, stream),
+            stream=stream
         )
         
         if response.status_code != 200:
             raise Exception(f"Erreur lors de l'appel à l'API DeepSeek R1: {response.text}")
         
-        return response.json()
+        return response
+    
+    def _call_api(self, prompt: str) -> Dict[str, Any]:
+        """
+        Appelle l'API DeepSeek R1.
+        
+        Args:
+            prompt (str): Prompt à envoyer à l'API
+            
+        Returns:
+            dict: Réponse de l'API
+            
+        Raises:
+            Exception: En cas d'erreur lors de l'appel à l'API
+        """
+        return self._request(prompt).json()
+    
+    def _call_api_stream(self, prompt: str) -> Iterator[str]:
+        """
+        Appelle l'API DeepSeek R1 en mode stream.
+        
+        Seul le contenu de la réponse est produit : le raisonnement du modèle
+        ('reasoning_content') est ignoré.
+        
+        Args:
+            prompt (str): Prompt à envoyer à l'API
+            
+        Yields:
+            str: Morceaux successifs du contenu de la réponse
+            
+        Raises:
+            Exception: En cas d'erreur lors de l'appel à l'API
+        """
+        response = self._request(prompt, stream=True)
+        try:
+            response.encoding = "utf-8"
+            for data in parse_event_data(response.iter_lines(decode_unicode=True)):
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                for choice in chunk.get("choices", []):
+                    content = (choice.get("delta") or {}).get("content")
+                    if content:
+                        yield content
+        finally:
+            response.close()
+    
+    def transport_stats(self) -> Dict[str, Any]:
+        """
+        Renvoie les statistiques des appels HTTP (latences, relances, échecs).
+        
+        Returns:
+            dict: Statistiques du transport
+        """
+        return self.transport.stats()
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Renvoie les statistiques du cache des réponses.
+        
+        Returns:
+            dict: Compteurs du cache
+        """
+        return (self.response_cache or get_llm_response_cache()).stats()
     
     def _build_commercial_location_prompt(self, 
                                          location: str, 
@@ -134,6 +439,18 @@ class DeepseekClient:
         radius = parameters.get("radius", 500)
         importance_factors = parameters.get("importance_factors", {})
         
+        # Accessibilité mesurée sur le réseau routier (isochrones), si disponible
+        accessibility = parameters.get("accessibility") or {}
+        accessibility_lines = "".join(
+            f"\n        - {band['minutes']} min: {band['pois_reached']} points d'intérêt accessibles"
+            for band in accessibility.get("bands", [])
+        )
+        if accessibility_lines:
+            accessibility_lines = (
+                f"\n        Accessibilité mesurée ({accessibility.get('mode', 'walk')}, "
+                f"score {accessibility.get('accessibility_score')}/10):{accessibility_lines}\n"
+            )
+        
         prompt = f"""
         En tant qu'expert en géomarketing, analyse l'emplacement suivant pour y implanter un commerce:
         
@@ -146,16 +463,17 @@ class DeepseekClient:
         - Concurrence: {importance_factors.get('competition', 0.3)}
         - Accessibilité: {importance_factors.get('accessibility', 0.2)}
         - Visibilité: {importance_factors.get('visibility', 0.1)}
-        
+        {accessibility_lines}
         Fournir une analyse détaillée avec:
         1. Scores d'attractivité (global, points d'intérêt, accessibilité, concurrence)
         2. Identification des emplacements optimaux avec leurs avantages et inconvénients
         3. Recommandations stratégiques
         
-        Présenter les résultats sous forme de JSON structuré avec les clés suivantes:
-        - scores: objet contenant les scores d'attractivité
+        Présenter les résultats sous forme de JSON structuré avec les clés suivantes, dans cet ordre:
+        - scores: objet contenant les scores d'attractivité sur 10
+          (global_score, poi_score, road_score, competition_score)
         - hotspots: liste des emplacements optimaux avec leurs caractéristiques
-        - recommendations: liste des recommandations stratégiques
+        - recommendations: liste des recommandations stratégiques (textes)
         """
         
         return prompt
@@ -196,63 +514,172 @@ class DeepseekClient:
         2. Identification des zones optimales, intermédiaires et peu adaptées
         3. Recommandations agronomiques pour chaque zone
         
-        Présenter les résultats sous forme de JSON structuré avec les clés suivantes:
-        - compatibility: objet contenant les scores de compatibilité
+        Présenter les résultats sous forme de JSON structuré avec les clés suivantes, dans cet ordre:
+        - compatibility: objet contenant les scores de compatibilité sur 10
+          (global_score, ph_score, drainage_score, texture_score, organic_score)
         - zones: liste des zones identifiées avec leurs caractéristiques
-        - recommendations: liste des recommandations agronomiques
+        - recommendations: liste des recommandations agronomiques (textes)
         """
         
         return prompt
     
-    def _parse_commercial_location_response(self, response: Dict[str, Any]) -> Dict[str, Any]:
+    def _structured_result(self, 
+                           response: Dict[str, Any], 
+                           normalize: Callable[[Dict[str, Any]], Dict[str, Any]], 
+                           expected_keys: Tuple[str, ...]) -> Dict[str, Any]:
         """
-        Parse la réponse de l'API pour l'analyse d'emplacement commercial.
+        Extrait et normalise le résultat d'une réponse complète de l'API.
         
         Args:
             response (dict): Réponse de l'API
+            normalize (callable): Mise au format de l'application de l'objet renvoyé
+            expected_keys (tuple): Clés de premier niveau identifiant l'objet de réponse
             
         Returns:
-            dict: Résultats structurés
+            dict: Résultats structurés, ou erreur si la réponse est impossible à traiter
         """
         try:
-            content = response["choices"][0]["message"]["content"]
-            # Extraire le JSON de la réponse
-            json_start = content.find("{")
-            json_end = content.rfind("}") + 1
-            json_str = content[json_start:json_end]
-            
-            return json.loads(json_str)
-        except (KeyError, json.JSONDecodeError, ValueError) as e:
+            return normalize(self._parse_response(response, expected_keys))
+        except (KeyError, TypeError, ValueError) as e:
             print(f"Erreur lors du parsing de la réponse: {e}")
             return {
                 "error": "Impossible de parser la réponse de l'API",
                 "raw_response": response
             }
     
-    def _parse_soil_quality_response(self, response: Dict[str, Any]) -> Dict[str, Any]:
+    def _parse_response(self, response: Dict[str, Any], expected_keys: Tuple[str, ...]) -> Dict[str, Any]:
         """
-        Parse la réponse de l'API pour l'analyse de la qualité des sols.
+        Extrait l'objet JSON du contenu d'une réponse de l'API.
+        
+        Les blocs <think>...</think> sont ignorés ; est retenu le premier objet
+        JSON de premier niveau contenant l'une des clés attendues. Le texte qui
+        le précède (raisonnement, accolades isolées, objets JSON cités en
+        exemple) est ignoré.
         
         Args:
             response (dict): Réponse de l'API
+            expected_keys (tuple): Clés de premier niveau identifiant l'objet de réponse
+            
+        Returns:
+            dict: Objet JSON renvoyé par le modèle
+            
+        Raises:
+            KeyError: Si la réponse n'a pas de contenu
+            ValueError: Si le contenu ne contient aucun objet JSON complet portant
+                l'une des clés attendues
+        """
+        return extract_json_object(response["choices"][0]["message"]["content"], expected_keys)
+    
+    def _normalize_member(self, name: str, value: Any) -> Any:
+        """
+        Normalise un membre de la réponse (noms des scores).
+        
+        Args:
+            name (str): Clé de premier niveau
+            value (any): Valeur
+            
+        Returns:
+            any: Valeur normalisée
+        """
+        aliases = SCORE_ALIASES.get(name)
+        if aliases is None or not isinstance(value, dict):
+            return value
+        scores = {}
+        for key, score in value.items():
+            if isinstance(score, (int, float)) and not isinstance(score, bool):
+                slug = unicodedata.normalize("NFKD", str(key)).encode("ascii", "ignore").decode().lower()
+                slug = re.sub(r"[^a-z]+", "_", slug).strip("_")
+                scores[aliases.get(slug, slug)] = score
+        return scores
+    
+    def _format_analysis(self, items: List[Any], recommendations: List[str]) -> str:
+        """
+        Rédige le texte d'analyse affiché à partir des emplacements ou zones et des recommandations.
+        
+        Args:
+            items (list): Emplacements optimaux ou zones identifiées
+            recommendations (list): Recommandations
+            
+        Returns:
+            str: Texte d'analyse
+        """
+        lines = []
+        for index, item in enumerate(items, 1):
+            if isinstance(item, dict):
+                name = item.get("name") or item.get("nom") or f"Emplacement {index}"
+                details = ", ".join(f"{key}: {value}" for key, value in item.items() if key not in ("name", "nom"))
+                lines.append(f"{index}. {name}" + (f" - {details}" if details else ""))
+            else:
+                lines.append(f"{index}. {item}")
+        if recommendations:
+            if lines:
+                lines.append("")
+            lines.extend(recommendations)
+        return "\n".join(lines)
+    
+    def _text_list(self, values: Any) -> List[str]:
+        """
+        Convertit une liste de recommandations (textes ou objets) en textes.
+        """
+        if not isinstance(values, list):
+            values = [values] if values else []
+        return [
+            value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+            for value in values
+        ]
+    
+    def _normalize_commercial_location_response(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Met la réponse du modèle pour une analyse d'emplacement commercial au
+        format de l'application (voir _mock_commercial_location_response).
+        
+        Args:
+            data (dict): Objet JSON renvoyé par le modèle (scores, hotspots, recommendations)
             
         Returns:
             dict: Résultats structurés
         """
-        try:
-            content = response["choices"][0]["message"]["content"]
-            # Extraire le JSON de la réponse
-            json_start = content.find("{")
-            json_end = content.rfind("}") + 1
-            json_str = content[json_start:json_end]
+        if "analysis_results" in data:
+            return data
+        hotspots = data.get("hotspots") or []
+        recommendations = self._text_list(data.get("recommendations"))
+        return {
+            "analysis_results": {
+                "score": self._normalize_member("scores", data.get("scores") or {})
+            },
+            "ai_recommendations": {
+                "analysis": self._format_analysis(hotspots, recommendations),
+                "recommendations": recommendations,
+                "hotspots": hotspots
+            }
+        }
+    
+    def _normalize_soil_quality_response(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Met la réponse du modèle pour une analyse de la qualité des sols au
+        format de l'application (voir _mock_soil_quality_response).
+        
+        Args:
+            data (dict): Objet JSON renvoyé par le modèle (compatibility, zones, recommendations)
             
-            return json.loads(json_str)
-        except (KeyError, json.JSONDecodeError, ValueError) as e:
-            print(f"Erreur lors du parsing de la réponse: {e}")
-            return {
-                "error": "Impossible de parser la réponse de l'API",
-                "raw_response": response
+        Returns:
+            dict: Résultats structurés
+        """
+        if "analysis_results" in data:
+            return data
+        zones = data.get("zones") or []
+        recommendations = self._text_list(data.get("recommendations"))
+        return {
+            "analysis_results": {
+                "compatibility": self._normalize_member("compatibility", data.get("compatibility") or {}),
+                "zones": zones
+            },
+            "ai_recommendations": {
+                "analysis": self._format_analysis(zones, recommendations),
+                "recommendations": recommendations,
+                "zones": zones
             }
+        }
     
     def _mock_commercial_location_response(self, 
                                           location: str, 
@@ -282,22 +709,17 @@ class DeepseekClient:
         road_score = 7.2 * radius_factor
         competition_score = 5.0 * radius_factor
         
-        # Ajustement en fonction des facteurs d'importance
-        pop_factor = importance_factors.get("population", 0.4)
-        comp_factor = importance_factors.get("competition", 0.3)
-        acc_factor = importance_factors.get("accessibility", 0.2)
-        vis_factor = importance_factors.get("visibility", 0.1)
-        
-        # Score global ajusté
-        global_score = (
-            poi_score * pop_factor + 
-            road_score * acc_factor + 
-            competition_score * comp_factor +
-            (poi_score + road_score) / 2 * vis_factor
+        # Score global ajusté en fonction des facteurs d'importance
+        global_score = combine_commercial_scores(
+            {
+                "poi_score": poi_score,
+                "road_score": road_score,
+                "competition_score": competition_score
+            },
+            importance_factors
         )
         
         # Arrondir les scores à 1 décimale
-        global_score = round(global_score, 1)
         poi_score = round(poi_score, 1)
         road_score = round(road_score, 1)
         competition_score = round(competition_score, 1)
@@ -0,0 +1,139 @@
+"""
+Cache des résultats de géocodage placé devant ox.geocode_to_gdf.
+Les noms de lieux sont normalisés, les résultats (centroïde, emprise et
+polygone) sont conservés en mémoire et dans SQLite, et les échecs de
+géocodage sont mémorisés pendant une courte durée.
+"""
+import os
+import re
+import threading
+import unicodedata
+from typing import Any, Dict, Optional
+
+from src.utils.cache_paths import get_cache_dir
+from src.utils.persistent_cache import PersistentLRUCache, MISSING
+
+DEFAULT_TTL = 90 * 24 * 3600
+DEFAULT_NEGATIVE_TTL = 15 * 60
+
+
+def normalize_place_name(name: str) -> str:
+    """
+    Normalise un nom de lieu pour l'utiliser comme clé de cache.
+
+    Supprime accents, casse, espaces et ponctuation superflus, de sorte que
+    « Paris , France » et « paris, france » partagent la même entrée.
+
+    Args:
+        name (str): Nom de lieu saisi
+
+    Returns:
+        str: Clé normalisée
+    """
+    text = unicodedata.normalize("NFKD", name or "")
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    text = text.casefold()
+    text = re.sub(r"\s*,\s*", ", ", text)
+    text = re.sub(r"\s+", " ", text)
+    return text.strip(" ,.;")
+
+
+class GeocodeCache:
+    """
+    Cache de géocodage à deux niveaux (LRU mémoire + SQLite).
+    """
+    def __init__(self,
+                 db_path: Optional[str] = None,
+                 ttl: float = DEFAULT_TTL,
+                 negative_ttl: float = DEFAULT_NEGATIVE_TTL,
+                 max_memory_entries: int = 2048,
+                 max_entries: int = 100000):
+        """
+        Initialise le cache de géocodage.
+
+        Args:
+            db_path (str, optional): Chemin de la base SQLite (par défaut cache/geocode/geocode.sqlite)
+            ttl (float): Durée de vie d'un résultat positif en secondes
+            negative_ttl (float): Durée de vie d'un échec de géocodage en secondes
+            max_memory_entries (int): Nombre maximal d'entrées en mémoire
+            max_entries (int): Nombre maximal d'entrées persistantes
+        """
+        self.negative_ttl = negative_ttl
+        self._cache = PersistentLRUCache(
+            db_path or os.path.join(get_cache_dir("geocode"), "geocode.sqlite"),
+            table="geocode",
+            max_memory_entries=max_memory_entries,
+            max_entries=max_entries,
+            default_ttl=ttl
+        )
+
+    def geocode(self, location_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Géocode un nom de lieu en passant par le cache.
+
+        Args:
+            location_name (str): Nom du lieu
+
+        Returns:
+            dict: Centroïde, emprise et polygone du lieu, ou None si le lieu est introuvable
+
+        Raises:
+            Exception: En cas d'erreur réseau (non mise en cache)
+        """
+        key = normalize_place_name(location_name)
+        cached = self._cache.get(key, MISSING)
+        if cached is not MISSING:
+            return cached if cached.get("found") else None
+
+        # osmnx n'est importé qu'au premier géocodage réel (normalize_place_name reste léger)
+        import osmnx as ox
+        try:
+            gdf = ox.geocode_to_gdf(location_name)
+        except (ValueError, TypeError) as e:
+            # Lieu introuvable : mémoriser l'échec pendant une courte durée
+            print(f"Lieu introuvable lors du géocodage de '{location_name}': {e}")
+            self._cache.set(key, {"found": False}, ttl=self.negative_ttl)
+            return None
+
+        row = gdf.iloc[0]
+        geometry = row.geometry
+        centroid = geometry.centroid
+        west, south, east, north = geometry.bounds
+        result = {
+            "found": True,
+            "query": location_name,
+            "display_name": row.get("display_name", location_name),
+            "latitude": centroid.y,
+            "longitude": centroid.x,
+            "bbox": {"north": north, "south": south, "east": east, "west": west},
+            "polygon_wkt": geometry.wkt
+        }
+        self._cache.set(key, result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Renvoie les statistiques d'utilisation du cache.
+
+        Returns:
+            dict: Compteurs du cache
+        """
+        return self._cache.stats()
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_geocode_cache() -> GeocodeCache:
+    """
+    Renvoie le cache de géocodage partagé par les services.
+
+    Returns:
+        GeocodeCache: Instance partagée
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = GeocodeCache()
+        return _default_cache
@@ -0,0 +1,234 @@
+"""
+Transport HTTP partagé des appels aux API externes (DeepSeek).
+Une session requests unique conserve les connexions ouvertes (keep-alive) dans
+un pool dimensionné pour les threads appelants : seul le premier appel paie la
+poignée de main TLS. Chaque appel est borné par des délais de connexion et de
+lecture, et les réponses 429/5xx ou les erreurs réseau sont relancées avec un
+délai exponentiel aléatoire (jitter). Latences et relances sont comptabilisées.
+"""
+import os
+import time
+import random
+import threading
+from collections import deque
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Délais en secondes (connexion, lecture) : un appel bloqué ne retient jamais un worker
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 120.0
+
+# Relances : statuts concernés, nombre maximal et délai exponentiel (base, plafond)
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BACKOFF_BASE = 0.5
+DEFAULT_BACKOFF_MAX = 8.0
+
+# Taille du pool de connexions par hôte : au moins le nombre de threads pouvant
+# appeler l'API en même temps (workers de la file de tâches et du serveur)
+DEFAULT_POOL_SIZE = 8
+POOL_SIZE_ENV = "GEOMARKETING_HTTP_POOL_SIZE"
+
+# Nombre d'appels récents conservés pour les percentiles de latence
+LATENCY_WINDOW = 1000
+
+
+def backoff_delay(attempt: int,
+                  base: float = DEFAULT_BACKOFF_BASE,
+                  maximum: float = DEFAULT_BACKOFF_MAX) -> float:
+    """
+    Délai exponentiel avec jitter complet avant une relance.
+
+    Args:
+        attempt (int): Numéro de la relance (0 pour la première)
+        base (float): Délai avant la première relance en secondes
+        maximum (float): Délai maximal en secondes
+
+    Returns:
+        float: Délai tiré uniformément entre 0 et min(maximum, base * 2^attempt)
+    """
+    return random.uniform(0, min(maximum, base * 2 ** attempt))
+
+
+def retry_after_seconds(headers: Any, maximum: float = DEFAULT_BACKOFF_MAX) -> float:
+    """
+    Délai demandé par le serveur (en-tête Retry-After en secondes), borné.
+
+    Args:
+        headers (mapping): En-têtes de la réponse
+        maximum (float): Délai maximal en secondes
+
+    Returns:
+        float: Délai en secondes (0 si l'en-tête est absent ou n'est pas numérique)
+    """
+    try:
+        return min(maximum, float(headers.get("Retry-After", 0)))
+    except ValueError:
+        return 0.0
+
+
+class HttpTransport:
+    """
+    Session HTTP avec pool de connexions, délais et relances.
+    """
+    def __init__(self,
+                 pool_size: Optional[int] = None,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout: float = DEFAULT_READ_TIMEOUT,
+                 max_retries: int = DEFAULT_MAX_RETRIES,
+                 backoff_base: float = DEFAULT_BACKOFF_BASE,
+                 backoff_max: float = DEFAULT_BACKOFF_MAX):
+        """
+        Initialise la session.
+
+        Args:
+            pool_size (int, optional): Connexions conservées par hôte
+                (par défaut $GEOMARKETING_HTTP_POOL_SIZE ou 8)
+            connect_timeout (float): Délai d'établissement de la connexion en secondes
+            read_timeout (float): Délai maximal entre deux octets de la réponse en secondes
+            max_retries (int): Nombre maximal de relances d'un appel
+            backoff_base (float): Délai avant la première relance en secondes
+            backoff_max (float): Délai maximal entre deux relances en secondes
+        """
+        if pool_size is None:
+            pool_size = int(os.environ.get(POOL_SIZE_ENV) or DEFAULT_POOL_SIZE)
+        self.pool_size = max(1, pool_size)
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        # Les relances sont gérées ici (comptées), pas par urllib3
+        adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size,
+                              max_retries=0, pool_block=False)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._stats = {"calls": 0, "attempts": 0, "retries": 0, "failures": 0, "timeouts": 0,
+                       "total_seconds": 0.0}
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """
+        Envoie une requête POST (voir request).
+        """
+        return self.request("POST", url, **kwargs)
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Envoie une requête, relancée en cas de statut 429/5xx ou d'erreur réseau.
+
+        Le délai avant la relance n est tiré uniformément entre 0 et
+        min(backoff_max, backoff_base * 2^n) ; un en-tête Retry-After numérique
+        est respecté s'il est plus long.
+
+        Args:
+            method (str): Méthode HTTP
+            url (str): URL appelée
+            **kwargs: Arguments de requests (headers, json, timeout...)
+
+        Returns:
+            requests.Response: Dernière réponse reçue (éventuellement en erreur
+                si les relances sont épuisées)
+
+        Raises:
+            requests.RequestException: Si la dernière tentative échoue sans réponse
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        start = time.perf_counter()
+        attempt = 0
+        try:
+            while True:
+                self._count("attempts")
+                try:
+                    response = self.session.request(method, url, **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    if isinstance(e, requests.Timeout):
+                        self._count("timeouts")
+                    if attempt >= self.max_retries:
+                        self._count("failures")
+                        raise
+                    delay = self._backoff(attempt)
+                else:
+                    if response.status_code not in RETRY_STATUSES:
+                        return response
+                    if attempt >= self.max_retries:
+                        self._count("failures")
+                        return response
+                    delay = max(self._backoff(attempt), retry_after_seconds(response.headers, self.backoff_max))
+                    response.close()
+
+                attempt += 1
+                self._count("retries")
+                time.sleep(delay)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._stats["calls"] += 1
+                self._stats["total_seconds"] += elapsed
+                self._latencies.append(elapsed)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Renvoie les compteurs d'appels et les latences (relances comprises).
+
+        Returns:
+            dict: Appels, tentatives, relances, échecs, délais dépassés et
+                latences en millisecondes (moyenne, p50, p95, max des derniers appels)
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            latencies = sorted(self._latencies)
+        total_seconds = stats.pop("total_seconds")
+        if latencies:
+            stats["latency_ms"] = {
+                "mean": round(1000 * total_seconds / stats["calls"], 1),
+                "p50": round(1000 * latencies[len(latencies) // 2], 1),
+                "p95": round(1000 * latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))], 1),
+                "max": round(1000 * latencies[-1], 1)
+            }
+        else:
+            stats["latency_ms"] = None
+        stats["pool_size"] = self.pool_size
+        return stats
+
+    def close(self):
+        """
+        Ferme les connexions du pool.
+        """
+        self.session.close()
+
+    def _backoff(self, attempt: int) -> float:
+        """
+        Délai exponentiel avec jitter complet avant une relance.
+        """
+        return backoff_delay(attempt, self.backoff_base, self.backoff_max)
+
+    def _count(self, name: str):
+        """
+        Incrémente un compteur.
+        """
+        with self._lock:
+            self._stats[name] += 1
+
+
+_default_transport = None
+_default_transport_lock = threading.Lock()
+
+
+def get_http_transport() -> HttpTransport:
+    """
+    Renvoie le transport HTTP partagé par les clients d'API.
+
+    Returns:
+        HttpTransport: Instance partagée
+    """
+    global _default_transport
+    with _default_transport_lock:
+        if _default_transport is None:
+            _default_transport = HttpTransport()
+        return _default_transport
@@ -0,0 +1,305 @@
+"""
+Moteur d'isochrones fondé sur scipy.sparse.csgraph.
+Le réseau routier est converti une seule fois en matrice creuse des temps de
+parcours ; un seul appel à Dijkstra calcule ensuite les temps d'accès depuis
+un ou plusieurs sites, et les POI atteints sont dénombrés par bande de temps
+en opérations matricielles.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import networkx as nx
+import shapely
+from shapely.geometry import mapping
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from scipy.spatial import cKDTree
+
+from src.utils.geo_utils import to_local_metric, from_local_metric
+
+DEFAULT_BANDS = (5, 10, 15)
+
+# Vitesse de marche et vitesses par défaut en voiture par type de voie (km/h)
+WALK_SPEED_KMH = 4.8
+DRIVE_SPEEDS_KMH = {
+    "motorway": 110, "motorway_link": 60, "trunk": 90, "trunk_link": 50,
+    "primary": 50, "primary_link": 40, "secondary": 45, "secondary_link": 35,
+    "tertiary": 40, "tertiary_link": 30, "unclassified": 30, "residential": 30,
+    "living_street": 15, "service": 15, "road": 30
+}
+DEFAULT_DRIVE_SPEED_KMH = 30
+
+# Types de voie interdits à chaque mode de déplacement
+EXCLUDED_HIGHWAYS = {
+    "walk": {"motorway", "motorway_link", "trunk", "trunk_link"},
+    "drive": {"footway", "pedestrian", "path", "steps", "cycleway", "bridleway", "track", "corridor"}
+}
+
+# Pondération des POI selon la bande de temps dans laquelle ils sont atteints
+ACCESSIBILITY_BAND_WEIGHTS = (1.0, 0.6, 0.3)
+ACCESSIBILITY_REFERENCE = 40.0
+
+# Catégorie attribuée aux POI non classés
+UNCLASSIFIED_CATEGORY = "other"
+
+
+class IsochroneEngine:
+    """
+    Calcule des isochrones à pied ou en voiture sur un réseau routier osmnx.
+    """
+    def __init__(self,
+                 G: nx.MultiDiGraph,
+                 mode: str = "walk",
+                 speed_kmh: Optional[float] = None,
+                 max_snap_distance: float = 250.0,
+                 hull_ratio: float = 0.3,
+                 hull_buffer: float = 30.0):
+        """
+        Construit la matrice creuse des temps de parcours du réseau.
+
+        Args:
+            G (MultiDiGraph): Réseau routier (coordonnées WGS84)
+            mode (str): Mode de déplacement ('walk' ou 'drive')
+            speed_kmh (float, optional): Vitesse uniforme (par défaut : marche,
+                                         ou limitation de vitesse / type de voie en voiture)
+            max_snap_distance (float): Distance maximale en mètres entre un point et le réseau
+            hull_ratio (float): Paramètre de l'enveloppe concave des isochrones (0 à 1)
+            hull_buffer (float): Tampon en mètres appliqué autour des isochrones
+        """
+        if mode not in EXCLUDED_HIGHWAYS:
+            raise ValueError(f"Mode de déplacement inconnu: {mode}")
+
+        self.mode = mode
+        self.max_snap_distance = max_snap_distance
+        self.hull_ratio = hull_ratio
+        self.hull_buffer = hull_buffer
+        # Le réseau est rejoint à pied depuis le site et les POI
+        self.access_speed = ((speed_kmh or WALK_SPEED_KMH) if mode == "walk" else WALK_SPEED_KMH) / 3.6
+
+        # Nœuds : coordonnées dans un repère métrique centré sur le réseau
+        node_ids, node_data = zip(*G.nodes(data=True))
+        self.node_index = pd.Index(node_ids)
+        lons = np.fromiter((data["x"] for data in node_data), dtype=np.float64, count=len(node_ids))
+        lats = np.fromiter((data["y"] for data in node_data), dtype=np.float64, count=len(node_ids))
+        self.center_lon = float(lons.mean())
+        self.center_lat = float(lats.mean())
+        self.x, self.y = to_local_metric(lons, lats, self.center_lon, self.center_lat)
+        self.tree = cKDTree(np.column_stack((self.x, self.y)))
+
+        # Arêtes : temps de parcours en secondes
+        u, v, edge_data = zip(*G.edges(data=True))
+        rows = self.node_index.get_indexer(u)
+        cols = self.node_index.get_indexer(v)
+        highway = pd.Series([data.get("highway") for data in edge_data]).explode()
+        highway = highway.groupby(level=0).first().fillna("road").astype(str).to_numpy()
+        length = np.array([data.get("length", np.nan) for data in edge_data], dtype=np.float64)
+        straight = np.hypot(self.x[rows] - self.x[cols], self.y[rows] - self.y[cols])
+        length = np.where(np.isfinite(length), length, straight)
+
+        allowed = ~np.isin(highway, list(EXCLUDED_HIGHWAYS[mode]))
+        if mode == "walk":
+            speed = np.full(len(length), (speed_kmh or WALK_SPEED_KMH) / 3.6)
+        elif speed_kmh:
+            speed = np.full(len(length), speed_kmh / 3.6)
+        else:
+            speed = _drive_speeds(highway, [data.get("maxspeed") for data in edge_data]) / 3.6
+        # Poids strictement positifs : csgraph ignorerait les arêtes de poids nul
+        seconds = np.maximum(length / speed, 1e-3)
+
+        rows, cols, seconds = rows[allowed], cols[allowed], seconds[allowed]
+        # Conserver l'arête la plus rapide entre deux nœuds (csr_matrix additionnerait les doublons)
+        order = np.lexsort((seconds, cols, rows))
+        rows, cols, seconds = rows[order], cols[order], seconds[order]
+        first = np.ones(len(rows), dtype=bool)
+        first[1:] = (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])
+        self.matrix = csr_matrix((seconds[first], (rows[first], cols[first])), shape=(len(node_ids), len(node_ids)))
+
+        self.poi_nodes = np.empty(0, dtype=np.int64)
+        self.poi_access = np.empty(0)
+        self.poi_categories = np.empty(0, dtype=object)
+
+    def snap(self, latitudes, longitudes):
+        """
+        Rattache des points au nœud le plus proche du réseau.
+
+        Args:
+            latitudes (array-like): Latitudes des points
+            longitudes (array-like): Longitudes des points
+
+        Returns:
+            tuple: Indices des nœuds et distances en mètres (inf au-delà de max_snap_distance)
+        """
+        x, y = to_local_metric(np.atleast_1d(longitudes), np.atleast_1d(latitudes), self.center_lon, self.center_lat)
+        distances, nodes = self.tree.query(np.column_stack((x, y)), distance_upper_bound=self.max_snap_distance)
+        nodes = np.where(np.isfinite(distances), nodes, 0)
+        return nodes, distances
+
+    def set_pois(self, latitudes, longitudes, categories: Optional[Sequence[Any]] = None):
+        """
+        Rattache les POI au réseau pour les dénombrer dans les isochrones.
+
+        Args:
+            latitudes (array-like): Latitudes des POI
+            longitudes (array-like): Longitudes des POI
+            categories (array-like, optional): Catégorie de chaque POI
+        """
+        self.poi_nodes, distances = self.snap(latitudes, longitudes)
+        self.poi_access = distances / self.access_speed
+        if categories is None:
+            self.poi_categories = np.full(len(self.poi_nodes), UNCLASSIFIED_CATEGORY, dtype=object)
+        else:
+            categories = pd.Series(np.asarray(categories, dtype=object))
+            self.poi_categories = categories.where(categories.notna(), UNCLASSIFIED_CATEGORY).astype(str).to_numpy()
+
+    def travel_times(self, latitudes, longitudes, max_minutes: float = max(DEFAULT_BANDS)) -> np.ndarray:
+        """
+        Calcule les temps d'accès à tous les nœuds depuis plusieurs sites en un appel.
+
+        Args:
+            latitudes (array-like): Latitudes des sites
+            longitudes (array-like): Longitudes des sites
+            max_minutes (float): Temps au-delà duquel l'exploration s'arrête
+
+        Returns:
+            np.ndarray: Temps en secondes (n_sites, n_nœuds), inf si non atteint
+        """
+        origins, distances = self.snap(latitudes, longitudes)
+        times = np.full((len(origins), self.matrix.shape[0]), np.inf)
+        valid = np.isfinite(distances)
+        if valid.any():
+            access = distances[valid] / self.access_speed
+            limit = max_minutes * 60.0 - access.min()
+            times[valid] = dijkstra(self.matrix, directed=self.mode == "drive",
+                                    indices=origins[valid], limit=max(limit, 0.0)).reshape(int(valid.sum()), -1)
+            times[valid] += access[:, np.newaxis]
+        return times
+
+    def compute(self,
+                latitudes,
+                longitudes,
+                bands: Sequence[float] = DEFAULT_BANDS,
+                polygons: bool = True) -> List[Dict[str, Any]]:
+        """
+        Calcule les isochrones et les POI atteints pour un ou plusieurs sites.
+
+        Args:
+            latitudes (array-like): Latitudes des sites
+            longitudes (array-like): Longitudes des sites
+            bands (list): Bandes de temps en minutes, croissantes
+            polygons (bool): Si True, construit les polygones des isochrones
+
+        Returns:
+            list: Pour chaque site, les bandes (polygone GeoJSON, surface, POI
+                  atteints par catégorie) et le score d'accessibilité
+        """
+        latitudes = np.atleast_1d(np.asarray(latitudes, dtype=np.float64))
+        longitudes = np.atleast_1d(np.asarray(longitudes, dtype=np.float64))
+        bands = sorted(bands)
+        times = self.travel_times(latitudes, longitudes, max_minutes=bands[-1])
+
+        # POI atteints : (n_sites, n_poi) puis dénombrement par catégorie via une matrice indicatrice
+        categories, category_codes = np.unique(self.poi_categories, return_inverse=True)
+        indicator = np.zeros((len(self.poi_nodes), len(categories)))
+        indicator[np.arange(len(self.poi_nodes)), category_codes] = 1.0
+        poi_times = times[:, self.poi_nodes] + self.poi_access[np.newaxis, :]
+
+        reached_counts = np.empty((len(latitudes), len(bands)), dtype=np.int64)
+        results = [{"latitude": float(lat), "longitude": float(lon), "mode": self.mode, "bands": []}
+                   for lat, lon in zip(latitudes, longitudes)]
+        for band_index, minutes in enumerate(bands):
+            seconds = minutes * 60.0
+            by_category = (poi_times <= seconds).astype(np.float64) @ indicator
+            reached_counts[:, band_index] = by_category.sum(axis=1)
+            nodes_reached = times <= seconds
+            hulls = self._hulls(nodes_reached) if polygons else [None] * len(latitudes)
+
+            for site, result in enumerate(results):
+                hull = hulls[site]
+                result["bands"].append({
+                    "minutes": minutes,
+                    "nodes_reached": int(nodes_reached[site].sum()),
+                    "area_km2": round(float(shapely.area(hull)) / 1e6, 3) if hull is not None else None,
+                    "polygon": self._to_geojson(hull) if hull is not None else None,
+                    "pois_reached": int(reached_counts[site, band_index]),
+                    "pois_by_category": {
+                        str(category): int(count)
+                        for category, count in zip(categories, by_category[site]) if count > 0
+                    }
+                })
+
+        scores = accessibility_score(reached_counts)
+        for result, score in zip(results, scores):
+            result["accessibility_score"] = round(float(score), 1)
+        return results
+
+    def _hulls(self, nodes_reached: np.ndarray) -> np.ndarray:
+        """
+        Construit les enveloppes concaves des nœuds atteints (repère métrique).
+
+        Args:
+            nodes_reached (np.ndarray): Masque booléen (n_sites, n_nœuds)
+
+        Returns:
+            np.ndarray: Polygones (ou None si aucun nœud atteint)
+        """
+        # Un point par cellule de la taille du tampon suffit à l'enveloppe et
+        # réduit fortement le coût de concave_hull sur les réseaux denses
+        cells = np.column_stack((np.round(self.x / self.hull_buffer), np.round(self.y / self.hull_buffer)))
+        clouds = np.empty(len(nodes_reached), dtype=object)
+        for site, mask in enumerate(nodes_reached):
+            if mask.any():
+                clouds[site] = shapely.multipoints(np.unique(cells[mask], axis=0) * self.hull_buffer)
+        present = clouds != None  # noqa: E711 (comparaison élément par élément)
+        hulls = np.full(len(clouds), None, dtype=object)
+        if present.any():
+            hulls[present] = shapely.buffer(shapely.concave_hull(clouds[present], ratio=self.hull_ratio),
+                                            self.hull_buffer)
+        return hulls
+
+    def _to_geojson(self, polygon) -> Dict[str, Any]:
+        """
+        Convertit un polygone du repère métrique en géométrie GeoJSON WGS84.
+        """
+        polygon = shapely.transform(polygon, lambda coords: np.column_stack(
+            from_local_metric(coords[:, 0], coords[:, 1], self.center_lon, self.center_lat)))
+        return mapping(polygon)
+
+
+def _drive_speeds(highway: np.ndarray, maxspeed: List[Any]) -> np.ndarray:
+    """
+    Détermine la vitesse de chaque arête en voiture (limitation OSM, sinon type de voie).
+
+    Args:
+        highway (np.ndarray): Type de voie de chaque arête
+        maxspeed (list): Valeur OSM 'maxspeed' de chaque arête (texte, liste ou None)
+
+    Returns:
+        np.ndarray: Vitesses en km/h
+    """
+    default = pd.Series(highway).map(DRIVE_SPEEDS_KMH).fillna(DEFAULT_DRIVE_SPEED_KMH).to_numpy(dtype=np.float64)
+    limits = pd.Series(maxspeed, dtype=object).explode()
+    limits = pd.to_numeric(limits.astype(str).str.extract(r"(\d+)", expand=False), errors="coerce")
+    limits = limits.groupby(level=0).min().to_numpy(dtype=np.float64)
+    return np.where(np.isfinite(limits) & (limits > 0), limits, default)
+
+
+def accessibility_score(reached_counts: np.ndarray) -> np.ndarray:
+    """
+    Convertit le nombre de POI atteints par bande de temps en score sur 10.
+
+    Les POI atteints dans la première bande comptent davantage que ceux qui
+    ne sont atteints que dans les bandes suivantes.
+
+    Args:
+        reached_counts (np.ndarray): POI atteints (cumulés) par bande, (n_sites, n_bandes)
+
+    Returns:
+        np.ndarray: Scores entre 0 et 10
+    """
+    reached_counts = np.asarray(reached_counts, dtype=np.float64)
+    increments = np.diff(reached_counts, axis=1, prepend=0.0)
+    weights = np.asarray(ACCESSIBILITY_BAND_WEIGHTS[:increments.shape[1]])
+    weights = np.pad(weights, (0, increments.shape[1] - len(weights)), constant_values=weights[-1])
+    weighted = increments @ weights
+    return 10.0 * (1.0 - np.exp(-weighted / ACCESSIBILITY_REFERENCE))
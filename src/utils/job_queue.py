@@ -0,0 +1,542 @@
+"""
+File de tâches en arrière-plan pour les analyses longues.
+Une analyse soumise reçoit immédiatement un identifiant ; un pool borné de
+threads l'exécute et publie son avancement étape par étape. L'état des tâches
+est conservé par un backend interchangeable : en mémoire (développement) ou
+SQLite (les tâches non terminées sont relancées au redémarrage).
+
+Plusieurs processus peuvent partager la base SQLite : chaque file détient ses
+tâches par un bail qu'elle renouvelle périodiquement. Une tâche inachevée
+n'est relancée que par la file qui la réclame, atomiquement, une fois le bail
+de sa détentrice expiré (processus arrêté) ; les écritures d'une file qui a
+perdu le bail d'une tâche sont ignorées.
+"""
+import os
+import json
+import time
+import uuid
+import socket
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from src.utils.cache_paths import get_cache_dir
+
+# Statuts d'une tâche
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+DEFAULT_MAX_WORKERS = 2
+DEFAULT_MAX_PENDING = 64
+DEFAULT_TTL = 24 * 3600
+
+# Durée du bail d'une tâche en secondes (renouvelé par la file qui la détient
+# toutes les LEASE_DURATION / 3 secondes, tant qu'elle est en attente ou en cours)
+DEFAULT_LEASE_DURATION = 60.0
+
+# Variable d'environnement choisissant le backend ('memory' ou 'sqlite')
+BACKEND_ENV = "GEOMARKETING_JOB_BACKEND"
+
+# Fonction exécutant une tâche : (paramètres, callback d'avancement) -> résultat sérialisable
+JobHandler = Callable[[Dict[str, Any], Callable[[str, int, int], None]], Dict[str, Any]]
+
+
+class QueueFullError(Exception):
+    """
+    Levée lorsque le nombre de tâches en attente atteint la limite de la file.
+    """
+
+
+def _json_default(value: Any) -> Any:
+    """
+    Convertit les valeurs NumPy ; les objets non sérialisables (graphes,
+    GeoDataFrame des données brutes) sont omis.
+    """
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return None
+
+
+def to_json(value: Any) -> str:
+    """
+    Sérialise l'état ou le résultat d'une tâche.
+
+    Args:
+        value (any): Valeur à sérialiser
+
+    Returns:
+        str: JSON
+    """
+    return json.dumps(value, ensure_ascii=False, default=_json_default)
+
+
+class InMemoryJobBackend:
+    """
+    Tâches conservées dans un dictionnaire (perdues au redémarrage).
+    """
+    def __init__(self):
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        # Bail de chaque tâche : (détentrice, date d'expiration)
+        self._leases: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def save(self, job: Dict[str, Any], owner: Optional[str] = None, lease_until: Optional[float] = None):
+        """
+        Enregistre (ou remplace) une tâche, sauf si une autre file en détient le bail.
+
+        Args:
+            job (dict): État complet de la tâche
+            owner (str, optional): File détentrice de la tâche
+            lease_until (float, optional): Expiration du bail (timestamp)
+        """
+        with self._lock:
+            current = self._leases.get(job["job_id"])
+            if current is not None and current[0] not in (None, owner):
+                return
+            # Copie sérialisée : l'état exposé ne partage rien avec le worker
+            self._jobs[job["job_id"]] = json.loads(to_json(job))
+            self._leases[job["job_id"]] = (owner, lease_until)
+
+    def claim(self, job_id: str, owner: str, lease_until: float, now: float) -> bool:
+        """
+        Réclame une tâche inachevée dont le bail a expiré.
+
+        Args:
+            job_id (str): Identifiant de la tâche
+            owner (str): File qui réclame la tâche
+            lease_until (float): Expiration du nouveau bail (timestamp)
+            now (float): Date courante (timestamp)
+
+        Returns:
+            bool: True si la tâche est désormais détenue par cette file
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            lease = self._leases.get(job_id, (None, None))[1]
+            if job is None or job["status"] not in (QUEUED, RUNNING) or (lease is not None and lease >= now):
+                return False
+            self._leases[job_id] = (owner, lease_until)
+            return True
+
+    def renew(self, owner: str, lease_until: float):
+        """
+        Prolonge le bail des tâches inachevées détenues par une file.
+
+        Args:
+            owner (str): File détentrice
+            lease_until (float): Nouvelle expiration (timestamp)
+        """
+        with self._lock:
+            for job_id, (job_owner, _) in self._leases.items():
+                if job_owner == owner and self._jobs[job_id]["status"] in (QUEUED, RUNNING):
+                    self._leases[job_id] = (owner, lease_until)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Récupère une tâche.
+
+        Args:
+            job_id (str): Identifiant de la tâche
+
+        Returns:
+            dict: État de la tâche, ou None si elle est inconnue
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return json.loads(json.dumps(job)) if job is not None else None
+
+    def incomplete(self) -> List[Dict[str, Any]]:
+        """
+        Renvoie les tâches en attente ou en cours.
+
+        Returns:
+            list: Tâches non terminées, par date de création
+        """
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job["status"] in (QUEUED, RUNNING)]
+        return sorted(jobs, key=lambda job: job["created_at"])
+
+    def purge(self, before: float):
+        """
+        Supprime les tâches terminées avant une date.
+
+        Args:
+            before (float): Date limite (timestamp)
+        """
+        with self._lock:
+            for job_id in [job_id for job_id, job in self._jobs.items()
+                           if job["status"] in (SUCCEEDED, FAILED) and job["updated_at"] < before]:
+                del self._jobs[job_id]
+                self._leases.pop(job_id, None)
+
+
+class SQLiteJobBackend:
+    """
+    Tâches conservées dans une table SQLite (survivent au redémarrage).
+    """
+    def __init__(self, db_path: Optional[str] = None):
+        """
+        Ouvre (ou crée) la base des tâches.
+
+        Args:
+            db_path (str, optional): Chemin de la base (par défaut dans le répertoire des caches)
+        """
+        self.db_path = db_path or os.path.join(get_cache_dir("jobs"), "jobs.sqlite")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "job_id TEXT PRIMARY KEY, status TEXT NOT NULL, created_at REAL NOT NULL, "
+            "updated_at REAL NOT NULL, data TEXT NOT NULL, owner TEXT, lease_until REAL)"
+        )
+        # Bases créées avant l'introduction des baux : tâches sans détentrice
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, column_type in (("owner", "TEXT"), ("lease_until", "REAL")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        self._conn.commit()
+
+    def save(self, job: Dict[str, Any], owner: Optional[str] = None, lease_until: Optional[float] = None):
+        """
+        Enregistre (ou remplace) une tâche, sauf si une autre file en détient le bail.
+
+        Args:
+            job (dict): État complet de la tâche
+            owner (str, optional): File détentrice de la tâche
+            lease_until (float, optional): Expiration du bail (timestamp)
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, status, created_at, updated_at, data, owner, lease_until) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (job_id) DO UPDATE SET status = excluded.status, updated_at = excluded.updated_at, "
+                "data = excluded.data, owner = excluded.owner, lease_until = excluded.lease_until "
+                "WHERE jobs.owner IS NULL OR jobs.owner IS excluded.owner",
+                (job["job_id"], job["status"], job["created_at"], job["updated_at"], to_json(job),
+                 owner, lease_until)
+            )
+            self._conn.commit()
+
+    def claim(self, job_id: str, owner: str, lease_until: float, now: float) -> bool:
+        """
+        Réclame une tâche inachevée dont le bail a expiré.
+
+        La mise à jour conditionnelle est atomique : si plusieurs processus
+        réclament la même tâche, un seul l'obtient.
+
+        Args:
+            job_id (str): Identifiant de la tâche
+            owner (str): File qui réclame la tâche
+            lease_until (float): Expiration du nouveau bail (timestamp)
+            now (float): Date courante (timestamp)
+
+        Returns:
+            bool: True si la tâche est désormais détenue par cette file
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET owner = ?, lease_until = ? WHERE job_id = ? AND status IN (?, ?) "
+                "AND (lease_until IS NULL OR lease_until < ?)",
+                (owner, lease_until, job_id, QUEUED, RUNNING, now)
+            )
+            self._conn.commit()
+        return cursor.rowcount == 1
+
+    def renew(self, owner: str, lease_until: float):
+        """
+        Prolonge le bail des tâches inachevées détenues par une file.
+
+        Args:
+            owner (str): File détentrice
+            lease_until (float): Nouvelle expiration (timestamp)
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE owner = ? AND status IN (?, ?)",
+                (lease_until, owner, QUEUED, RUNNING)
+            )
+            self._conn.commit()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Récupère une tâche.
+
+        Args:
+            job_id (str): Identifiant de la tâche
+
+        Returns:
+            dict: État de la tâche, ou None si elle est inconnue
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def incomplete(self) -> List[Dict[str, Any]]:
+        """
+        Renvoie les tâches en attente ou en cours.
+
+        Returns:
+            list: Tâches non terminées, par date de création
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM jobs WHERE status IN (?, ?) ORDER BY created_at", (QUEUED, RUNNING)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def purge(self, before: float):
+        """
+        Supprime les tâches terminées avant une date.
+
+        Args:
+            before (float): Date limite (timestamp)
+        """
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?", (SUCCEEDED, FAILED, before)
+            )
+            self._conn.commit()
+
+
+class JobQueue:
+    """
+    File de tâches exécutées par un pool borné de threads.
+    """
+    def __init__(self,
+                 backend=None,
+                 max_workers: int = DEFAULT_MAX_WORKERS,
+                 max_pending: int = DEFAULT_MAX_PENDING,
+                 ttl: float = DEFAULT_TTL,
+                 lease_duration: float = DEFAULT_LEASE_DURATION):
+        """
+        Initialise la file.
+
+        Args:
+            backend: InMemoryJobBackend ou SQLiteJobBackend (en mémoire par défaut)
+            max_workers (int): Nombre de tâches exécutées simultanément
+            max_pending (int): Nombre maximal de tâches en attente ou en cours
+            ttl (float): Durée de conservation des tâches terminées en secondes
+            lease_duration (float): Durée du bail des tâches détenues en secondes
+        """
+        self.backend = backend or InMemoryJobBackend()
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self.lease_duration = lease_duration
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._handlers: Dict[str, JobHandler] = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._heartbeat = None
+
+    def register(self, kind: str, handler: JobHandler):
+        """
+        Associe une fonction d'exécution à un type de tâche, puis relance les
+        tâches de ce type restées inachevées (backend persistant après redémarrage).
+
+        Seules les tâches dont le bail a expiré sont relancées : celles d'une
+        autre file encore active ne sont pas exécutées deux fois. Les tâches
+        d'un processus arrêté depuis moins d'un bail sont reprises plus tard,
+        lors d'un renouvellement.
+
+        Args:
+            kind (str): Type de tâche (par exemple 'commercial')
+            handler (callable): Fonction (paramètres, callback d'avancement) -> résultat
+        """
+        self._handlers[kind] = handler
+        self._resume_expired(kind)
+        self._start_heartbeat()
+
+    def submit(self, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Soumet une tâche.
+
+        Args:
+            kind (str): Type de tâche enregistré
+            params (dict): Paramètres sérialisables de la tâche
+
+        Returns:
+            dict: État initial de la tâche
+
+        Raises:
+            KeyError: Si le type de tâche n'est pas enregistré
+            QueueFullError: Si la file est pleine
+        """
+        if kind not in self._handlers:
+            raise KeyError(f"Type de tâche inconnu: {kind}")
+
+        self.backend.purge(time.time() - self.ttl)
+        now = time.time()
+        job = {
+            "job_id": f"job_{uuid.uuid4().hex}",
+            "kind": kind,
+            "status": QUEUED,
+            "params": params,
+            "progress": {"stage": None, "completed": 0, "total": None, "percent": 0},
+            "stages": [],
+            "result": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now
+        }
+        snapshot = json.loads(to_json(job))
+        self._schedule(job)
+        return snapshot
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Récupère l'état d'une tâche.
+
+        Args:
+            job_id (str): Identifiant de la tâche
+
+        Returns:
+            dict: État de la tâche, ou None si elle est inconnue ou expirée
+        """
+        return self.backend.get(job_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Renvoie l'occupation de la file.
+
+        Returns:
+            dict: Tâches en attente ou en cours et limite
+        """
+        with self._lock:
+            return {"pending": self._pending, "max_pending": self.max_pending}
+
+    def _schedule(self, job: Dict[str, Any], force: bool = False):
+        """
+        Réserve une place dans la file et confie la tâche au pool.
+
+        Args:
+            job (dict): Tâche à exécuter
+            force (bool): Si True, ignore la limite (tâches relancées au démarrage)
+        """
+        with self._lock:
+            if not force and self._pending >= self.max_pending:
+                raise QueueFullError(f"File de tâches pleine ({self.max_pending} tâches en attente)")
+            self._pending += 1
+        self._update(job)
+        self._start_heartbeat()
+        self._executor.submit(self._run, job)
+
+    def _resume_expired(self, kind: str):
+        """
+        Réclame et relance les tâches inachevées d'un type dont le bail a expiré.
+
+        Args:
+            kind (str): Type de tâche
+        """
+        for job in self.backend.incomplete():
+            if job["kind"] != kind:
+                continue
+            now = time.time()
+            if self.backend.claim(job["job_id"], self.owner, now + self.lease_duration, now):
+                job["status"] = QUEUED
+                self._schedule(job, force=True)
+
+    def _start_heartbeat(self):
+        """
+        Démarre (une seule fois) le thread qui renouvelle les baux de la file
+        et reprend les tâches abandonnées par d'autres files.
+        """
+        with self._lock:
+            if self._heartbeat is not None:
+                return
+            self._heartbeat = threading.Thread(target=self._renew_leases, name="job-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def _renew_leases(self):
+        """
+        Boucle du thread de renouvellement des baux.
+        """
+        while True:
+            time.sleep(self.lease_duration / 3)
+            try:
+                self.backend.renew(self.owner, time.time() + self.lease_duration)
+                for kind in list(self._handlers):
+                    self._resume_expired(kind)
+            except Exception as e:
+                print(f"Erreur lors du renouvellement des baux des tâches: {e}")
+
+    def _run(self, job: Dict[str, Any]):
+        """
+        Exécute une tâche en publiant son avancement.
+
+        Args:
+            job (dict): Tâche à exécuter
+        """
+        def progress(stage: str, completed: int, total: int):
+            now = time.time()
+            if job["stages"] and job["stages"][-1]["finished_at"] is None:
+                job["stages"][-1]["finished_at"] = now
+            if completed < total:
+                job["stages"].append({"name": stage, "started_at": now, "finished_at": None})
+            job["progress"] = {
+                "stage": stage,
+                "completed": completed,
+                "total": total,
+                "percent": round(100 * completed / total) if total else 0
+            }
+            self._update(job)
+
+        try:
+            job["status"] = RUNNING
+            job["stages"] = []
+            self._update(job)
+            job["result"] = self._handlers[job["kind"]](job["params"], progress)
+            job["status"] = SUCCEEDED
+        except Exception as e:
+            print(f"Erreur lors de l'exécution de la tâche {job['job_id']}: {e}")
+            job["status"] = FAILED
+            job["error"] = str(e)
+        finally:
+            if job["stages"] and job["stages"][-1]["finished_at"] is None:
+                job["stages"][-1]["finished_at"] = time.time()
+            self._update(job)
+            with self._lock:
+                self._pending -= 1
+
+    def _update(self, job: Dict[str, Any]):
+        """
+        Enregistre l'état courant d'une tâche.
+        """
+        job["updated_at"] = time.time()
+        self.backend.save(job, self.owner, job["updated_at"] + self.lease_duration)
+
+
+_default_queue = None
+_default_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """
+    Renvoie la file de tâches partagée par les routes.
+
+    Le backend est choisi par $GEOMARKETING_JOB_BACKEND ('memory' par défaut, ou 'sqlite').
+
+    Returns:
+        JobQueue: Instance partagée
+    """
+    global _default_queue
+    with _default_queue_lock:
+        if _default_queue is None:
+            backend_name = os.environ.get(BACKEND_ENV, "memory")
+            if backend_name == "sqlite":
+                backend = SQLiteJobBackend()
+            elif backend_name == "memory":
+                backend = InMemoryJobBackend()
+            else:
+                raise ValueError(f"Backend de tâches inconnu: {backend_name}")
+            _default_queue = JobQueue(backend)
+        return _default_queue
@@ -0,0 +1,291 @@
+"""
+Extraction incrémentale d'un objet JSON dans un texte produit par un modèle.
+Le texte est fourni morceau par morceau (réponse en flux) ; chaque membre de
+premier niveau de l'objet est renvoyé dès que sa valeur est complète, sans
+attendre la fin de la réponse. Le texte qui précède l'objet (raisonnement,
+blocs <think>...</think>, accolades isolées) est ignoré : un candidat dont la
+structure n'est pas celle d'un objet JSON est abandonné au profit de
+l'accolade suivante. Lorsque les clés attendues sont connues, un objet JSON
+valide qui n'en contient aucune (exemple cité dans le raisonnement) est
+également ignoré et la recherche reprend après lui.
+
+Un candidat dont des membres ont déjà été renvoyés peut encore s'avérer
+invalide : ses clés sont alors notées dans `retracted`, et seules les valeurs
+de l'objet finalement retenu (`members`) font foi.
+"""
+import json
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+THINK_START = "<think>"
+THINK_END = "</think>"
+
+# États de l'extraction
+_SEARCH = "search"
+_OBJECT = "object"
+_DONE = "done"
+
+
+class JSONObjectStream:
+    """
+    Analyseur incrémental du premier objet JSON valide d'un texte contenant
+    l'une des clés attendues.
+    """
+    def __init__(self, expected_keys: Optional[Iterable[str]] = None):
+        """
+        Initialise l'analyseur.
+
+        Args:
+            expected_keys (iterable, optional): Clés de premier niveau dont l'une au
+                moins doit figurer dans l'objet recherché (None : premier objet valide)
+        """
+        self.expected_keys = frozenset(expected_keys) if expected_keys is not None else None
+        self.members: Dict[str, Any] = {}
+        # Clés déjà renvoyées par des candidats abandonnés ensuite
+        self.retracted: List[str] = []
+        self._pending: List[Tuple[str, Any]] = []
+        self._matched = False
+        self._text = ""
+        self._pos = 0
+        self._state = _SEARCH
+        self._start = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._expect = None
+        self._token_start = 0
+        self._key = None
+
+    @property
+    def complete(self) -> bool:
+        """
+        Indique si l'objet JSON a été entièrement lu.
+        """
+        return self._state == _DONE
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """
+        Ajoute un morceau de texte.
+
+        Args:
+            text (str): Suite du texte
+
+        Returns:
+            list: Membres (clé, valeur) de premier niveau complétés par ce morceau
+                (ceux d'un candidat ne sont renvoyés qu'à partir de la première
+                clé attendue, sans attendre la fin de l'objet)
+        """
+        self._text += text
+        completed = []
+        while self._state != _DONE:
+            if self._state == _SEARCH and not self._search():
+                break
+            if self._state == _OBJECT and not self._scan(completed):
+                break
+        return completed
+
+    def _search(self) -> bool:
+        """
+        Cherche le début du prochain objet candidat en sautant les blocs de raisonnement.
+
+        Returns:
+            bool: True si un candidat a été trouvé, False s'il faut plus de texte
+        """
+        while True:
+            brace = self._text.find("{", self._pos)
+            think = self._text.find(THINK_START, self._pos)
+            if think != -1 and (brace == -1 or think < brace):
+                end = self._text.find(THINK_END, think)
+                if end == -1:
+                    self._pos = think
+                    return False
+                self._pos = end + len(THINK_END)
+                continue
+            if brace == -1:
+                # Conserver un éventuel début de balise <think> coupé entre deux morceaux
+                self._pos = max(self._pos, len(self._text) - len(THINK_START) + 1)
+                return False
+            self._start = brace
+            self._pos = brace + 1
+            self._state = _OBJECT
+            self._depth = 1
+            self._in_string = False
+            self._escape = False
+            self._expect = "key_or_end"
+            self._reset_members()
+            return True
+
+    def _restart(self):
+        """
+        Abandonne le candidat courant et reprend la recherche après son accolade.
+        """
+        if self._matched:
+            # Membres déjà renvoyés : à remplacer par ceux de l'objet retenu
+            self.retracted.extend(key for key in self.members if key not in self.retracted)
+        self._state = _SEARCH
+        self._pos = self._start + 1
+        self._reset_members()
+
+    def _reset_members(self):
+        """
+        Oublie les membres du candidat courant.
+        """
+        self.members = {}
+        self._pending = []
+        self._matched = self.expected_keys is None
+
+    def _close(self) -> bool:
+        """
+        Termine le candidat courant à son accolade fermante.
+
+        Returns:
+            bool: True (l'analyse peut continuer : objet retenu, ou ignoré
+                s'il ne contient aucune clé attendue)
+        """
+        if self._matched:
+            self._state = _DONE
+        else:
+            # Objet valide cité avant la réponse : reprendre après lui
+            self._state = _SEARCH
+            self._reset_members()
+        return True
+
+    def _scan(self, completed: List[Tuple[str, Any]]) -> bool:
+        """
+        Avance dans l'objet candidat.
+
+        Args:
+            completed (list): Liste recevant les membres complétés
+
+        Returns:
+            bool: True si l'analyse peut continuer (objet terminé ou abandonné),
+                False s'il faut plus de texte
+        """
+        text = self._text
+        while self._pos < len(text):
+            i = self._pos
+            char = text[i]
+            self._pos += 1
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expect in ("key", "key_or_end"):
+                        self._key = json.loads(text[self._token_start:i + 1])
+                        self._expect = "colon"
+                continue
+
+            if self._depth > 1:
+                if char == '"':
+                    self._in_string = True
+                elif char in "{[":
+                    self._depth += 1
+                elif char in "}]":
+                    self._depth -= 1
+                    if self._depth == 1 and not self._complete_member(text[self._token_start:i + 1], completed):
+                        self._restart()
+                        return True
+                continue
+
+            if self._expect in ("key", "key_or_end"):
+                if char.isspace():
+                    continue
+                if char == '"':
+                    self._in_string = True
+                    self._token_start = i
+                elif char == "}" and self._expect == "key_or_end":
+                    return self._close()
+                else:
+                    self._restart()
+                    return True
+            elif self._expect == "colon":
+                if char.isspace():
+                    continue
+                if char != ":":
+                    self._restart()
+                    return True
+                self._expect = "value"
+                self._token_start = i + 1
+            elif self._expect == "value":
+                if char == '"':
+                    self._in_string = True
+                elif char in "{[":
+                    if text[self._token_start:i].strip():
+                        self._restart()
+                        return True
+                    self._depth += 1
+                elif char in ",}":
+                    if not self._complete_member(text[self._token_start:i], completed):
+                        self._restart()
+                        return True
+                    if char == "}":
+                        return self._close()
+                    self._expect = "key"
+                elif char == "]":
+                    self._restart()
+                    return True
+            elif self._expect == "comma_or_end":
+                if char.isspace():
+                    continue
+                if char == ",":
+                    self._expect = "key"
+                elif char == "}":
+                    return self._close()
+                else:
+                    self._restart()
+                    return True
+        return False
+
+    def _complete_member(self, value_text: str, completed: List[Tuple[str, Any]]) -> bool:
+        """
+        Décode la valeur du membre courant et l'enregistre.
+
+        Args:
+            value_text (str): Texte de la valeur
+            completed (list): Liste recevant le membre
+
+        Returns:
+            bool: False si la valeur n'est pas du JSON valide
+        """
+        try:
+            value = json.loads(value_text)
+        except ValueError:
+            return False
+        self.members[self._key] = value
+        if not self._matched and self._key in self.expected_keys:
+            # Première clé attendue : libérer les membres retenus de ce candidat
+            self._matched = True
+            completed.extend(self._pending)
+            self._pending = []
+        if self._matched:
+            completed.append((self._key, value))
+        else:
+            self._pending.append((self._key, value))
+        self._expect = "comma_or_end"
+        return True
+
+
+def extract_json_object(text: str, expected_keys: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Extrait le premier objet JSON valide d'un texte complet contenant l'une des clés attendues.
+
+    Args:
+        text (str): Texte de la réponse du modèle
+        expected_keys (iterable, optional): Clés de premier niveau dont l'une au
+            moins doit figurer dans l'objet (None : premier objet valide)
+
+    Returns:
+        dict: Objet JSON
+
+    Raises:
+        ValueError: Si le texte ne contient aucun objet JSON complet (portant
+            l'une des clés attendues)
+    """
+    stream = JSONObjectStream(expected_keys)
+    stream.feed(text)
+    if not stream.complete:
+        raise ValueError("Aucun objet JSON complet dans la réponse")
+    return stream.members
@@ -0,0 +1,168 @@
+"""
+Cache des réponses de l'API DeepSeek R1.
+Les prompts sont construits de façon déterministe à partir des entrées de
+l'analyse (lieu, type de commerce ou de culture, rayon ou profondeur, facteurs
+d'importance) : une même demande réutilise la réponse déjà obtenue au lieu de
+payer à nouveau un appel de plusieurs secondes. Les noms sont normalisés et
+les facteurs réels arrondis à un pas donné, de sorte que des requêtes quasi
+identiques partagent la même entrée.
+"""
+import os
+import json
+import hashlib
+import threading
+from typing import Any, Dict, Optional
+
+from src.utils.cache_paths import get_cache_dir
+from src.utils.geocode_cache import normalize_place_name
+from src.utils.persistent_cache import PersistentLRUCache, MISSING
+
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+
+# Pas d'arrondi des valeurs réelles (facteurs d'importance, scores d'accessibilité)
+DEFAULT_FACTOR_QUANTUM = 0.05
+
+
+def quantize_factors(value: Any, quantum: Optional[float]) -> Any:
+    """
+    Arrondit récursivement les nombres réels au multiple de `quantum` le plus proche.
+
+    Les entiers (rayon, profondeur, nombres de POI) et les textes sont conservés.
+
+    Args:
+        value (any): Valeur ou structure (dict, list) à arrondir
+        quantum (float, optional): Pas d'arrondi (None : aucune modification)
+
+    Returns:
+        any: Valeur arrondie
+    """
+    if quantum is None:
+        return value
+    if isinstance(value, dict):
+        return {key: quantize_factors(item, quantum) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [quantize_factors(item, quantum) for item in value]
+    if isinstance(value, float):
+        return round(round(value / quantum) * quantum, 10)
+    return value
+
+
+class LLMResponseCache:
+    """
+    Cache à deux niveaux (LRU mémoire + SQLite) des réponses de l'API.
+    """
+    def __init__(self,
+                 db_path: Optional[str] = None,
+                 ttl: float = DEFAULT_TTL,
+                 factor_quantum: Optional[float] = DEFAULT_FACTOR_QUANTUM,
+                 max_memory_entries: int = 256,
+                 max_entries: int = DEFAULT_MAX_ENTRIES,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Initialise le cache des réponses.
+
+        Args:
+            db_path (str, optional): Chemin de la base SQLite (par défaut cache/llm/responses.sqlite)
+            ttl (float): Durée de vie d'une réponse en secondes
+            factor_quantum (float, optional): Pas d'arrondi des paramètres réels (None : valeurs exactes)
+            max_memory_entries (int): Nombre maximal d'entrées en mémoire
+            max_entries (int): Nombre maximal d'entrées persistantes
+            max_bytes (int): Taille maximale des réponses persistantes
+        """
+        self.factor_quantum = factor_quantum
+        self._cache = PersistentLRUCache(
+            db_path or os.path.join(get_cache_dir("llm"), "responses.sqlite"),
+            table="llm_responses",
+            max_memory_entries=max_memory_entries,
+            max_entries=max_entries,
+            max_bytes=max_bytes,
+            default_ttl=ttl
+        )
+
+    def normalize_inputs(self,
+                         location: str,
+                         subject: str,
+                         parameters: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Normalise les entrées d'une analyse.
+
+        Args:
+            location (str): Nom du lieu
+            subject (str): Type de commerce ou de culture
+            parameters (dict): Paramètres de l'analyse
+
+        Returns:
+            dict: Lieu et sujet normalisés, paramètres arrondis
+        """
+        return {
+            "location": normalize_place_name(location),
+            "subject": normalize_place_name(subject),
+            "parameters": quantize_factors(parameters, self.factor_quantum)
+        }
+
+    def key(self, prompt: str, settings: Dict[str, Any]) -> str:
+        """
+        Calcule la clé d'une requête.
+
+        Args:
+            prompt (str): Prompt construit à partir des entrées normalisées
+            settings (dict): Modèle et paramètres de génération
+
+        Returns:
+            str: Condensat hexadécimal
+        """
+        payload = json.dumps({"prompt": " ".join(prompt.split()), "settings": settings},
+                             sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Récupère une réponse en cache.
+
+        Args:
+            key (str): Clé de la requête
+
+        Returns:
+            dict: Réponse de l'API, ou None si elle est absente ou expirée
+        """
+        cached = self._cache.get(key, MISSING)
+        return None if cached is MISSING else cached
+
+    def set(self, key: str, response: Dict[str, Any]):
+        """
+        Enregistre une réponse.
+
+        Args:
+            key (str): Clé de la requête
+            response (dict): Réponse de l'API
+        """
+        self._cache.set(key, response)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Renvoie les statistiques d'utilisation du cache.
+
+        Returns:
+            dict: Compteurs du cache
+        """
+        return self._cache.stats()
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_llm_response_cache() -> LLMResponseCache:
+    """
+    Renvoie le cache des réponses partagé par les clients DeepSeek.
+
+    Returns:
+        LLMResponseCache: Instance partagée
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LLMResponseCache()
+        return _default_cache
@@ -0,0 +1,202 @@
+"""
+Construction de cartes Folium compactes pour des jeux d'entités denses.
+Toutes les entités d'une couche (points ou polygones) sont émises dans un
+seul objet GeoJSON aux coordonnées arrondies ; les styles sont déclarés une
+fois par classe et appliqués côté navigateur, et les popups sont construites
+au clic. La taille du HTML ne croît donc que de quelques dizaines d'octets
+par entité, et le nombre d'entités par couche est plafonné.
+"""
+import json
+from typing import Any, Dict, List, Optional, Sequence
+
+import folium
+from branca.element import MacroElement
+from jinja2 import Template
+from jinja2.utils import htmlsafe_json_dumps
+
+# Nombre maximal d'entités émises par couche
+DEFAULT_MAX_FEATURES = 5000
+
+# Décimales conservées pour les coordonnées (5 décimales : environ 1 m)
+COORDINATE_PRECISION = 5
+
+
+def create_map(latitude: float, longitude: float, zoom_start: int = 15) -> folium.Map:
+    """
+    Crée une carte Folium rendue sur un canvas unique (et non un nœud SVG par entité).
+
+    Args:
+        latitude (float): Latitude du centre
+        longitude (float): Longitude du centre
+        zoom_start (int): Niveau de zoom initial
+
+    Returns:
+        folium.Map: Carte vide
+    """
+    return folium.Map(
+        location=[latitude, longitude],
+        zoom_start=zoom_start,
+        tiles="OpenStreetMap",
+        prefer_canvas=True
+    )
+
+
+class FeatureLayer(MacroElement):
+    """
+    Couche GeoJSON unique stylée côté client.
+
+    Chaque entité ne porte que sa géométrie, la clé de son style ('s') et
+    éventuellement le texte de sa popup ('p', lignes séparées par '\\n').
+    """
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function() {
+                var styles = {{ this.styles_json }};
+                function popup(feature) {
+                    var div = document.createElement("div");
+                    div.style.whiteSpace = "pre-line";
+                    div.textContent = feature.properties.p;
+                    return div;
+                }
+                return L.geoJSON({{ this.data_json }}, {
+                    pointToLayer: function(feature, latlng) {
+                        return L.circleMarker(latlng, styles[feature.properties.s]);
+                    },
+                    style: function(feature) {
+                        return styles[feature.properties.s];
+                    },
+                    onEachFeature: function(feature, layer) {
+                        if (feature.properties.p) {
+                            layer.bindPopup(function() { return popup(feature); });
+                        }
+                    }
+                });
+            })().addTo({{ this._parent.get_name() }});
+        {% endmacro %}
+    """)
+
+    def __init__(self,
+                 styles: Dict[str, Dict[str, Any]],
+                 max_features: int = DEFAULT_MAX_FEATURES,
+                 precision: int = COORDINATE_PRECISION):
+        """
+        Initialise une couche vide.
+
+        Args:
+            styles (dict): Options Leaflet (color, fillColor, radius...) par clé de style
+            max_features (int): Nombre maximal d'entités émises
+            precision (int): Décimales conservées pour les coordonnées
+        """
+        super().__init__()
+        self._name = "FeatureLayer"
+        self.styles = styles
+        self.max_features = max_features
+        self.precision = precision
+        self.features: List[Dict[str, Any]] = []
+        self.dropped = 0
+
+    def add_points(self,
+                   latitudes: Sequence[float],
+                   longitudes: Sequence[float],
+                   style: str,
+                   popups: Optional[Sequence[str]] = None) -> "FeatureLayer":
+        """
+        Ajoute des points affichés en cercles (rayon en pixels).
+
+        Les points au-delà du plafond sont ignorés : les séquences doivent donc
+        être fournies par ordre de priorité (par exemple par distance croissante).
+
+        Args:
+            latitudes (list): Latitudes des points
+            longitudes (list): Longitudes des points
+            style (str): Clé du style
+            popups (list, optional): Texte de la popup de chaque point
+
+        Returns:
+            FeatureLayer: La couche elle-même
+        """
+        for i, (latitude, longitude) in enumerate(zip(latitudes, longitudes)):
+            geometry = {
+                "type": "Point",
+                "coordinates": [round(float(longitude), self.precision), round(float(latitude), self.precision)]
+            }
+            self._append(geometry, style, popups[i] if popups is not None else None)
+        return self
+
+    def add_polygon(self,
+                    locations: Sequence[Sequence[float]],
+                    style: str,
+                    popup: Optional[str] = None) -> "FeatureLayer":
+        """
+        Ajoute un polygone.
+
+        Args:
+            locations (list): Sommets [latitude, longitude] du polygone
+            style (str): Clé du style
+            popup (str, optional): Texte de la popup
+
+        Returns:
+            FeatureLayer: La couche elle-même
+        """
+        ring = [[round(float(lon), self.precision), round(float(lat), self.precision)] for lat, lon in locations]
+        if ring and ring[0] != ring[-1]:
+            ring.append(ring[0])
+        self._append({"type": "Polygon", "coordinates": [ring]}, style, popup)
+        return self
+
+    def _append(self, geometry: Dict[str, Any], style: str, popup: Optional[str]):
+        """
+        Ajoute une entité si le plafond n'est pas atteint.
+        """
+        if style not in self.styles:
+            raise ValueError(f"Style inconnu: {style}")
+        if len(self.features) >= self.max_features:
+            self.dropped += 1
+            return
+        properties = {"s": style}
+        if popup:
+            properties["p"] = str(popup)
+        self.features.append({"type": "Feature", "geometry": geometry, "properties": properties})
+
+    def to_geojson(self) -> Dict[str, Any]:
+        """
+        Renvoie les entités de la couche.
+
+        Returns:
+            dict: FeatureCollection GeoJSON
+        """
+        return {"type": "FeatureCollection", "features": self.features}
+
+    @property
+    def data_json(self) -> str:
+        """
+        GeoJSON compact (sans espaces), échappé pour une balise <script>.
+        """
+        return htmlsafe_json_dumps(self.to_geojson(), dumps=json.dumps, separators=(",", ":"))
+
+    @property
+    def styles_json(self) -> str:
+        """
+        Styles de la couche, échappés pour une balise <script>.
+        """
+        return htmlsafe_json_dumps(self.styles, dumps=json.dumps, separators=(",", ":"))
+
+    def add_to(self, parent, name: Optional[str] = None, index: Optional[int] = None) -> "FeatureLayer":
+        """
+        Ajoute la couche à une carte, avec un avertissement si des entités ont été ignorées.
+
+        Args:
+            parent (folium.Map): Carte cible
+
+        Returns:
+            FeatureLayer: La couche elle-même
+        """
+        super().add_to(parent, name=name, index=index)
+        if self.dropped:
+            notice = (
+                '<div style="position: fixed; top: 10px; left: 50px; z-index: 1000; background-color: white; '
+                'padding: 4px 8px; border-radius: 4px; font-size: 12px;">'
+                f'{len(self.features)} éléments affichés, {self.dropped} non affichés</div>'
+            )
+            parent.get_root().html.add_child(folium.Element(notice))
+        return self
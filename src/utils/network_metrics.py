@@ -0,0 +1,275 @@
+"""
+Métriques du réseau routier calculées dans un repère métrique local.
+Le graphe est converti une seule fois en tables de nœuds et d'arêtes
+projetées (projection azimutale équidistante centrée sur la zone), puis
+toutes les mesures sont des opérations vectorisées sur ces tables, ce qui
+permet de mesurer plusieurs sites sans reprojeter le réseau.
+"""
+from typing import Any, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import networkx as nx
+import shapely
+from pyproj import CRS, Transformer
+
+# Densités de référence pour le score d'accessibilité routière
+REFERENCE_STREET_DENSITY = 12.0  # km de voirie par km²
+REFERENCE_INTERSECTION_DENSITY = 80.0  # intersections par km²
+
+
+def local_metric_crs(latitude: float, longitude: float) -> CRS:
+    """
+    Construit une projection azimutale équidistante centrée sur un point.
+
+    Args:
+        latitude (float): Latitude du centre
+        longitude (float): Longitude du centre
+
+    Returns:
+        CRS: Système de coordonnées métrique local
+    """
+    return CRS.from_proj4(f"+proj=aeqd +lat_0={latitude} +lon_0={longitude} +datum=WGS84 +units=m +no_defs")
+
+
+def graph_tables(G: nx.MultiDiGraph, crs=None) -> Tuple[gpd.GeoDataFrame, gpd.GeoDataFrame]:
+    """
+    Convertit un graphe osmnx en tables de nœuds et d'arêtes.
+
+    Contrairement à ox.graph_to_gdfs, les coordonnées des nœuds sont projetées
+    en un seul appel pyproj et les géométries manquantes des arêtes sont
+    créées directement dans la projection par une opération Shapely vectorisée.
+
+    Args:
+        G (MultiDiGraph): Réseau routier (coordonnées WGS84)
+        crs (CRS, optional): Projection de sortie (celle du graphe si None)
+
+    Returns:
+        tuple: Nœuds (index osmid) et arêtes (colonnes u, v, key)
+    """
+    graph_crs = G.graph.get("crs", "epsg:4326")
+    crs = crs or graph_crs
+
+    node_ids, node_data = zip(*G.nodes(data=True))
+    nodes = pd.DataFrame(list(node_data), index=pd.Index(node_ids, name="osmid"))
+    x, y = Transformer.from_crs(graph_crs, crs, always_xy=True).transform(
+        nodes["x"].to_numpy(dtype=np.float64), nodes["y"].to_numpy(dtype=np.float64))
+    nodes = gpd.GeoDataFrame(nodes, geometry=gpd.points_from_xy(x, y), crs=crs)
+
+    u, v, k, edge_data = zip(*G.edges(keys=True, data=True))
+    edges = pd.DataFrame(list(edge_data))
+    edges["u"] = np.asarray(u)
+    edges["v"] = np.asarray(v)
+    edges["key"] = np.asarray(k)
+
+    geometry = edges["geometry"].to_numpy(dtype=object, copy=True) if "geometry" in edges.columns \
+        else np.full(len(edges), None, dtype=object)
+    missing = pd.isna(geometry)
+    if (~missing).any():
+        # Géométries simplifiées d'osmnx : les seules à reprojeter
+        geometry[~missing] = gpd.GeoSeries(geometry[~missing], crs=graph_crs).to_crs(crs).to_numpy()
+    if missing.any():
+        # Arêtes rectilignes : segment entre les nœuds déjà projetés
+        u_pos = nodes.index.get_indexer(edges["u"][missing])
+        v_pos = nodes.index.get_indexer(edges["v"][missing])
+        coords = np.stack([
+            np.column_stack((x[u_pos], y[u_pos])),
+            np.column_stack((x[v_pos], y[v_pos]))
+        ], axis=1)
+        geometry[missing] = shapely.linestrings(coords)
+    edges = gpd.GeoDataFrame(edges.drop(columns="geometry", errors="ignore"), geometry=geometry, crs=crs)
+    return nodes, edges
+
+
+def undirected_edges(edges: pd.DataFrame) -> pd.DataFrame:
+    """
+    Supprime les doublons d'arêtes bidirectionnelles (u→v et v→u).
+
+    Args:
+        edges (DataFrame): Arêtes avec colonnes u, v, key et length
+
+    Returns:
+        DataFrame: Une arête par tronçon de rue
+    """
+    u = edges["u"].to_numpy()
+    v = edges["v"].to_numpy()
+    keys = pd.DataFrame({
+        "lo": np.minimum(u, v),
+        "hi": np.maximum(u, v),
+        "length": edges["length"].round(1).to_numpy() if "length" in edges.columns else 0.0
+    })
+    return edges[~keys.duplicated().to_numpy()]
+
+
+class NetworkMeasurer:
+    """
+    Tables projetées d'un réseau routier, réutilisables pour mesurer plusieurs cercles.
+    """
+    def __init__(self, G: nx.MultiDiGraph, latitude: float, longitude: float):
+        """
+        Projette le réseau une seule fois dans un repère centré sur un point.
+
+        Args:
+            G (MultiDiGraph): Réseau routier (coordonnées WGS84)
+            latitude (float): Latitude du centre de la projection
+            longitude (float): Longitude du centre de la projection
+        """
+        crs = local_metric_crs(latitude, longitude)
+        self.transformer = Transformer.from_crs("epsg:4326", crs, always_xy=True)
+        nodes, edges = graph_tables(G, crs=crs)
+        edges = undirected_edges(edges)
+
+        self.geometries = edges.geometry.to_numpy()
+        self.tree = shapely.STRtree(self.geometries)
+        self.node_x = nodes.geometry.x.to_numpy()
+        self.node_y = nodes.geometry.y.to_numpy()
+
+        # Intersections : nœuds à 3 rues ou plus
+        if "street_count" in nodes.columns:
+            self.street_count = nodes["street_count"].fillna(0).to_numpy()
+        else:
+            positions = nodes.index.get_indexer(np.concatenate((edges["u"].to_numpy(), edges["v"].to_numpy())))
+            self.street_count = np.bincount(positions, minlength=len(nodes))
+
+        # Type de voie (première valeur quand 'highway' est une liste)
+        if "highway" in edges.columns:
+            highway = edges["highway"].reset_index(drop=True).explode()
+            highway = highway.groupby(level=0).first().fillna("unclassified").astype(str)
+        else:
+            highway = pd.Series("unclassified", index=range(len(edges)))
+        self.highway_codes, self.highway_types = pd.factorize(highway)
+
+    def street_samples(self, step: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Échantillonne la voirie en tronçons d'au plus `step` mètres.
+
+        Args:
+            step (float): Longueur maximale d'un tronçon en mètres
+
+        Returns:
+            tuple: Longitudes et latitudes du milieu de chaque tronçon, longueurs en mètres
+        """
+        coords, owner = shapely.get_coordinates(shapely.segmentize(self.geometries, step), return_index=True)
+        same = owner[1:] == owner[:-1]
+        start, end = coords[:-1][same], coords[1:][same]
+        middle = (start + end) / 2
+        lons, lats = self.transformer.transform(middle[:, 0], middle[:, 1], direction="INVERSE")
+        return lons, lats, np.hypot(*(end - start).T)
+
+    def node_coordinates(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Renvoie les coordonnées WGS84 de tous les nœuds du réseau.
+
+        Returns:
+            tuple: Longitudes et latitudes
+        """
+        return self.transformer.transform(self.node_x, self.node_y, direction="INVERSE")
+
+    def intersections(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Renvoie les coordonnées WGS84 des intersections (nœuds à 3 rues ou plus).
+
+        Returns:
+            tuple: Longitudes et latitudes
+        """
+        mask = self.street_count >= 3
+        return self.transformer.transform(self.node_x[mask], self.node_y[mask], direction="INVERSE")
+
+    def metrics(self, latitude: float, longitude: float, radius: float) -> Dict[str, Any]:
+        """
+        Calcule les métriques du réseau routier dans un cercle.
+
+        Args:
+            latitude (float): Latitude du centre du cercle
+            longitude (float): Longitude du centre du cercle
+            radius (float): Rayon du cercle en mètres
+
+        Returns:
+            dict: Longueur de voirie découpée au cercle, densités de voirie et
+                  d'intersections, répartition des longueurs par type de voie
+        """
+        area_km2 = np.pi * (radius / 1000) ** 2
+        cx, cy = self.transformer.transform(longitude, latitude)
+
+        # Longueur de voirie découpée au cercle (candidats issus du STRtree)
+        circle = shapely.Point(cx, cy).buffer(radius, quad_segs=32)
+        shapely.prepare(circle)
+        candidates = self.tree.query(circle, predicate="intersects")
+        geometries = self.geometries[candidates]
+        within = shapely.contains(circle, geometries)
+        lengths = np.empty(len(candidates))
+        lengths[within] = shapely.length(geometries[within])
+        lengths[~within] = shapely.length(shapely.intersection(geometries[~within], circle))
+
+        node_inside = np.hypot(self.node_x - cx, self.node_y - cy) <= radius
+        intersection_count = int(np.count_nonzero(node_inside & (self.street_count >= 3)))
+
+        by_type = np.bincount(self.highway_codes[candidates], weights=lengths,
+                              minlength=len(self.highway_types)) / 1000
+        order = np.argsort(-by_type)
+        length_by_type = {
+            str(self.highway_types[code]): round(float(by_type[code]), 3)
+            for code in order if by_type[code] > 0
+        }
+
+        street_length_km = float(lengths.sum()) / 1000
+        segment_count = int(np.count_nonzero(lengths > 0))
+        return {
+            "street_length_km": round(street_length_km, 3),
+            "street_density": round(street_length_km / area_km2, 3),
+            "intersection_count": intersection_count,
+            "intersection_density": round(intersection_count / area_km2, 3),
+            "segment_count": segment_count,
+            "average_segment_length": round(street_length_km * 1000 / segment_count, 1) if segment_count else 0.0,
+            "node_count": int(np.count_nonzero(node_inside)),
+            "length_by_type": length_by_type
+        }
+
+
+def compute_network_metrics(G: nx.MultiDiGraph,
+                            latitude: float,
+                            longitude: float,
+                            radius: float) -> Dict[str, Any]:
+    """
+    Calcule les métriques du réseau routier dans un cercle.
+
+    Args:
+        G (MultiDiGraph): Réseau routier (coordonnées WGS84)
+        latitude (float): Latitude du centre du cercle
+        longitude (float): Longitude du centre du cercle
+        radius (float): Rayon du cercle en mètres
+
+    Returns:
+        dict: Métriques du réseau (voir NetworkMeasurer.metrics)
+    """
+    return NetworkMeasurer(G, latitude, longitude).metrics(latitude, longitude, radius)
+
+
+def road_score(metrics: Dict[str, Any]) -> float:
+    """
+    Convertit les métriques du réseau en score d'accessibilité routière sur 10.
+
+    Args:
+        metrics (dict): Métriques calculées par compute_network_metrics
+
+    Returns:
+        float: Score arrondi à 1 décimale
+    """
+    return round(float(road_scores(metrics["street_density"], metrics["intersection_density"])), 1)
+
+
+def road_scores(street_density, intersection_density) -> np.ndarray:
+    """
+    Calcule le score d'accessibilité routière sans arrondi (scalaires ou grilles).
+
+    Args:
+        street_density (array-like): Densité de voirie en km par km²
+        intersection_density (array-like): Densité d'intersections par km²
+
+    Returns:
+        np.ndarray: Scores entre 0 et 10
+    """
+    density_term = 1.0 - np.exp(-np.asarray(street_density, dtype=np.float64) / REFERENCE_STREET_DENSITY)
+    intersection_term = 1.0 - np.exp(-np.asarray(intersection_density, dtype=np.float64) / REFERENCE_INTERSECTION_DENSITY)
+    return 10.0 * (0.7 * density_term + 0.3 * intersection_term)
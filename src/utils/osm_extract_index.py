@@ -0,0 +1,351 @@
+"""
+Index spatial hors ligne construit à partir d'un extrait OSM régional.
+L'extrait (OSM XML, PBF ou GeoPackage lisible par Fiona) est ingéré une seule
+fois en tableaux colonnes de POI et en STRtree Shapely 2 ; l'index est ensuite
+persisté pour que les workers le rechargent sans réanalyser l'extrait.
+
+Le réseau routier est lu dans les extraits OSM XML ; pour un PBF ou un fichier
+Fiona, il doit être fourni en GraphML (--graphml). Les zones hors de l'emprise
+de l'extrait sont servies par le cache de tuiles (voir covers).
+
+Usage:
+    python -m src.utils.osm_extract_index extrait.osm.pbf cache/osm_extract --graphml reseau.graphml
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import geopandas as gpd
+import networkx as nx
+import osmnx as ox
+import shapely
+from shapely import STRtree
+
+from src.utils.geo_utils import centroid_coordinates
+
+# Variable d'environnement désignant l'index persisté à utiliser en mode réel
+EXTRACT_INDEX_ENV = "GEOMARKETING_OSM_EXTRACT"
+
+# Clés OSM conservées dans les colonnes de l'index
+DEFAULT_TAG_KEYS = ("amenity", "shop", "healthcare", "building", "highway",
+                    "public_transport", "leisure", "office", "tourism")
+
+# Couches GDAL du pilote OSM contenant des POI
+PBF_LAYERS = ("points", "multipolygons")
+
+POIS_FILE = "pois.parquet"
+GRAPH_FILE = "graph.graphml"
+META_FILE = "meta.json"
+
+
+class OSMExtractIndex:
+    """
+    Index en mémoire des POI et du réseau routier d'un extrait OSM.
+    """
+    def __init__(self,
+                 pois: gpd.GeoDataFrame,
+                 graph: Optional[nx.MultiDiGraph] = None,
+                 graph_path: Optional[str] = None,
+                 version: Optional[str] = None,
+                 bounds: Optional[Tuple[float, float, float, float]] = None):
+        """
+        Initialise l'index et construit le STRtree des géométries.
+
+        Args:
+            pois (GeoDataFrame): POI de l'extrait (colonnes de tags + géométrie)
+            graph (MultiDiGraph, optional): Réseau routier de l'extrait
+            graph_path (str, optional): Fichier GraphML chargé à la première utilisation
+            version (str, optional): Version des données (date d'ingestion par défaut)
+            bounds (tuple, optional): Emprise couverte (ouest, sud, est, nord) ; par
+                défaut celle du réseau routier s'il est en mémoire, sinon celle des POI
+        """
+        self.pois = pois.reset_index(drop=True)
+        self.geometries = np.asarray(self.pois.geometry.values, dtype=object)
+        self.longitudes, self.latitudes = centroid_coordinates(self.geometries)
+        self.tree = STRtree(self.geometries)
+        self.version = version or f"extract-{int(time.time())}"
+        self._graph = graph
+        self._graph_path = graph_path
+        self._node_arrays = None
+        self._graph_lock = threading.Lock()
+        if bounds is None and graph is not None and len(graph) > 0:
+            x, y = zip(*((data["x"], data["y"]) for _, data in graph.nodes(data=True)))
+            bounds = (float(min(x)), float(min(y)), float(max(x)), float(max(y)))
+        if bounds is None and len(self.pois) > 0:
+            bounds = tuple(float(value) for value in self.pois.total_bounds)
+        self.bounds = bounds
+
+    @classmethod
+    def ingest(cls,
+               source_path: str,
+               layer: Optional[str] = None,
+               graph_path: Optional[str] = None,
+               tag_keys=DEFAULT_TAG_KEYS) -> "OSMExtractIndex":
+        """
+        Ingère un extrait OSM régional.
+
+        Args:
+            source_path (str): Extrait OSM XML (.osm), PBF (.pbf) ou fichier lisible par Fiona (.gpkg, ...)
+            layer (str, optional): Couche à lire pour les fichiers Fiona
+            graph_path (str, optional): Réseau routier GraphML associé (déduit de l'extrait XML sinon)
+            tag_keys (tuple): Clés OSM conservées
+
+        Returns:
+            OSMExtractIndex: Index construit
+
+        Raises:
+            ValueError: Si le réseau routier ne peut pas être déduit de l'extrait
+                (PBF ou fichier Fiona sans graph_path)
+        """
+        graph = None
+        if not source_path.endswith((".osm", ".xml", ".osm.bz2")) and not graph_path:
+            # Sans réseau routier, toutes les analyses sur l'index échoueraient
+            raise ValueError(f"Aucun réseau routier pour {source_path} : "
+                             "fournir le réseau GraphML de l'extrait (--graphml)")
+        if source_path.endswith((".osm", ".xml", ".osm.bz2")):
+            tags = {key: True for key in tag_keys}
+            pois = ox.geometries_from_xml(source_path, tags=tags).reset_index()
+            graph = ox.graph_from_xml(source_path, simplify=True, retain_all=True)
+        elif source_path.endswith(".pbf"):
+            pois = pd.concat(
+                [_read_gdal_osm_layer(source_path, pbf_layer, tag_keys) for pbf_layer in PBF_LAYERS],
+                ignore_index=True
+            )
+        else:
+            pois = gpd.read_file(source_path, layer=layer)
+
+        # Ne garder que les POI portant au moins un tag utile, en colonnes catégorielles
+        columns = [key for key in tag_keys if key in pois.columns]
+        pois = pois[pois[columns].notna().any(axis=1)] if columns else pois
+        keep = [column for column in ("name",) + tuple(columns) if column in pois.columns]
+        pois = gpd.GeoDataFrame(pois[keep].astype("category"), geometry=pois.geometry.values, crs="epsg:4326")
+
+        if graph is None and graph_path:
+            graph = ox.load_graphml(filepath=graph_path)
+
+        return cls(pois, graph=graph)
+
+    @classmethod
+    def load(cls, index_dir: str) -> "OSMExtractIndex":
+        """
+        Charge un index persisté (le STRtree est reconstruit en quelques millisecondes).
+
+        Args:
+            index_dir (str): Répertoire de l'index
+
+        Returns:
+            OSMExtractIndex: Index chargé
+        """
+        with open(os.path.join(index_dir, META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+
+        pois = gpd.read_parquet(os.path.join(index_dir, POIS_FILE))
+        graph_path = os.path.join(index_dir, GRAPH_FILE)
+        return cls(pois,
+                   graph_path=graph_path if os.path.exists(graph_path) else None,
+                   version=meta.get("version"),
+                   bounds=tuple(meta["bounds"]) if meta.get("bounds") else None)
+
+    def save(self, index_dir: str):
+        """
+        Persiste l'index (POI en GeoParquet, réseau en GraphML).
+
+        Args:
+            index_dir (str): Répertoire de destination
+        """
+        os.makedirs(index_dir, exist_ok=True)
+        self.pois.to_parquet(os.path.join(index_dir, POIS_FILE))
+
+        graph = self._get_full_graph()
+        if graph is not None:
+            ox.save_graphml(graph, filepath=os.path.join(index_dir, GRAPH_FILE))
+
+        with open(os.path.join(index_dir, META_FILE), "w", encoding="utf-8") as f:
+            json.dump({"version": self.version, "pois": len(self.pois), "bounds": self.bounds}, f)
+
+    @property
+    def has_graph(self) -> bool:
+        """
+        Indique si l'index contient un réseau routier.
+        """
+        return self._graph is not None or self._graph_path is not None
+
+    def covers(self, latitude: float, longitude: float, dist: float) -> bool:
+        """
+        Indique si l'index peut servir une emprise : réseau routier présent et
+        emprise entièrement comprise dans celle de l'extrait.
+
+        Args:
+            latitude (float): Latitude du centre
+            longitude (float): Longitude du centre
+            dist (float): Distance en mètres (emprise carrée)
+
+        Returns:
+            bool: True si l'emprise est couverte
+        """
+        if not self.has_graph or self.bounds is None:
+            return False
+        north, south, east, west = ox.utils_geo.bbox_from_point((latitude, longitude), dist=dist)
+        min_x, min_y, max_x, max_y = self.bounds
+        return west >= min_x and east <= max_x and south >= min_y and north <= max_y
+
+    def get_pois(self, latitude: float, longitude: float, dist: float, tags: Dict[str, Any]) -> gpd.GeoDataFrame:
+        """
+        Récupère les POI autour d'un point (équivalent hors ligne de ox.geometries_from_point).
+
+        Args:
+            latitude (float): Latitude du centre
+            longitude (float): Longitude du centre
+            dist (float): Distance en mètres (emprise carrée)
+            tags (dict): Tags OSM recherchés ({clé: True | valeur | [valeurs]})
+
+        Returns:
+            GeoDataFrame: POI intersectant l'emprise
+        """
+        north, south, east, west = ox.utils_geo.bbox_from_point((latitude, longitude), dist=dist)
+        candidates = np.sort(self.tree.query(shapely.box(west, south, east, north), predicate="intersects"))
+
+        mask = np.zeros(len(candidates), dtype=bool)
+        subset = self.pois.iloc[candidates]
+        for key, value in tags.items():
+            if key not in subset.columns:
+                continue
+            if value is True:
+                mask |= subset[key].notna().to_numpy()
+            else:
+                values = value if isinstance(value, (list, tuple, set)) else [value]
+                mask |= subset[key].isin(values).to_numpy()
+
+        return subset[mask]
+
+    def get_graph(self, latitude: float, longitude: float, dist: float) -> nx.MultiDiGraph:
+        """
+        Récupère le réseau routier autour d'un point (équivalent hors ligne de ox.graph_from_point).
+
+        Args:
+            latitude (float): Latitude du centre
+            longitude (float): Longitude du centre
+            dist (float): Distance en mètres (emprise carrée)
+
+        Returns:
+            MultiDiGraph: Réseau routier tronqué à l'emprise
+
+        Raises:
+            ValueError: Si l'extrait ne contient pas de réseau routier
+        """
+        graph = self._get_full_graph()
+        if graph is None:
+            raise ValueError("L'extrait OSM ne contient pas de réseau routier")
+
+        # Sélection vectorisée des nœuds : truncate_graph_bbox reconstruirait
+        # un GeoDataFrame de tout le réseau régional à chaque requête
+        north, south, east, west = ox.utils_geo.bbox_from_point((latitude, longitude), dist=dist)
+        node_ids, node_x, node_y = self._node_arrays
+        inside = (node_x >= west) & (node_x <= east) & (node_y >= south) & (node_y <= north)
+        G = graph.subgraph(node_ids[inside].tolist()).copy()
+        if len(G) == 0:
+            raise ValueError("Aucun réseau routier dans la zone demandée")
+        return ox.utils_graph.get_largest_component(G)
+
+    def data_version(self, latitude: float, longitude: float, dist: float) -> str:
+        """
+        Renvoie la version des données de l'extrait.
+
+        Args:
+            latitude (float): Latitude du centre
+            longitude (float): Longitude du centre
+            dist (float): Distance en mètres
+
+        Returns:
+            str: Version des données
+        """
+        return self.version
+
+    def _get_full_graph(self) -> Optional[nx.MultiDiGraph]:
+        """
+        Renvoie le réseau routier complet, chargé à la première utilisation.
+
+        Returns:
+            MultiDiGraph: Réseau routier ou None
+        """
+        with self._graph_lock:
+            if self._graph is None and self._graph_path:
+                self._graph = ox.load_graphml(filepath=self._graph_path)
+            if self._graph is not None and self._node_arrays is None:
+                nodes = list(self._graph.nodes(data=True))
+                self._node_arrays = (
+                    np.array([node for node, _ in nodes]),
+                    np.array([data["x"] for _, data in nodes], dtype=np.float64),
+                    np.array([data["y"] for _, data in nodes], dtype=np.float64)
+                )
+            return self._graph
+
+
+def _read_gdal_osm_layer(source_path: str, layer: str, tag_keys) -> gpd.GeoDataFrame:
+    """
+    Lit une couche du pilote OSM de GDAL et éclate les tags de 'other_tags'.
+
+    Args:
+        source_path (str): Fichier .pbf
+        layer (str): Couche GDAL ('points', 'multipolygons', ...)
+        tag_keys (tuple): Clés OSM à extraire
+
+    Returns:
+        GeoDataFrame: POI de la couche
+    """
+    gdf = gpd.read_file(source_path, layer=layer)
+    if "other_tags" in gdf.columns:
+        other_tags = gdf["other_tags"].astype("string")
+        for key in tag_keys:
+            extracted = other_tags.str.extract(rf'"{re.escape(key)}"=>"([^"]*)"', expand=False)
+            gdf[key] = gdf[key].fillna(extracted) if key in gdf.columns else extracted
+    return gdf
+
+
+_loaded_indexes: Dict[str, OSMExtractIndex] = {}
+_loaded_indexes_lock = threading.Lock()
+
+
+def load_extract_index(index_dir: Optional[str] = None) -> Optional[OSMExtractIndex]:
+    """
+    Charge (une seule fois par processus) l'index persisté désigné par la configuration.
+
+    Args:
+        index_dir (str, optional): Répertoire de l'index (par défaut $GEOMARKETING_OSM_EXTRACT)
+
+    Returns:
+        OSMExtractIndex: Index chargé, ou None si aucun index n'est configuré
+    """
+    index_dir = index_dir or os.environ.get(EXTRACT_INDEX_ENV)
+    if not index_dir:
+        return None
+
+    with _loaded_indexes_lock:
+        if index_dir not in _loaded_indexes:
+            _loaded_indexes[index_dir] = OSMExtractIndex.load(index_dir)
+        return _loaded_indexes[index_dir]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ingère un extrait OSM régional dans un index persistant.")
+    parser.add_argument("source", help="Extrait OSM (.osm, .pbf) ou fichier lisible par Fiona (.gpkg, ...)")
+    parser.add_argument("destination", help="Répertoire de l'index à créer")
+    parser.add_argument("--layer", help="Couche à lire pour les fichiers Fiona")
+    parser.add_argument("--graphml", help="Réseau routier GraphML à associer à l'index")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    index = OSMExtractIndex.ingest(args.source, layer=args.layer, graph_path=args.graphml)
+    index.save(args.destination)
+    print(f"{len(index.pois)} POI indexés dans {args.destination} en {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
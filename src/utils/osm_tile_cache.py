@@ -0,0 +1,497 @@
+"""
+Cache persistant, découpé en tuiles, des données OpenStreetMap.
+Les réseaux routiers (GraphML) et les points d'intérêt (GeoParquet) sont
+stockés par tuile cartographique fixe ; une requête par rayon est assemblée
+à partir des tuiles en cache et seules les tuiles manquantes sont téléchargées.
+Les téléchargements simultanés d'une même tuile sont regroupés, et la date
+d'accès des tuiles lues n'est écrite dans l'index que périodiquement.
+"""
+import os
+import json
+import atexit
+import math
+import time
+import hashlib
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import geopandas as gpd
+import networkx as nx
+import osmnx as ox
+import pandas as pd
+from osmnx._errors import EmptyOverpassResponse
+
+from src.utils.cache_paths import get_cache_dir
+from src.utils.single_flight import SingleFlight
+
+# Zoom 15 : tuiles d'environ 1,2 km de côté à l'équateur (800 m à Paris)
+DEFAULT_ZOOM = 15
+DEFAULT_TTL = 30 * 24 * 3600
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+# Délai minimal entre deux écritures de l'index dues aux seules lectures (secondes) :
+# les dates d'accès (ordre d'éviction) sont tenues en mémoire entre-temps
+INDEX_SAVE_INTERVAL = 30.0
+
+Tile = Tuple[int, int, int]
+
+# Tuile absente du cache, expirée ou évincée pendant sa lecture
+_MISSING = object()
+
+
+def tile_for_point(latitude: float, longitude: float, zoom: int) -> Tile:
+    """
+    Calcule la tuile (schéma XYZ) contenant un point.
+
+    Args:
+        latitude (float): Latitude en degrés
+        longitude (float): Longitude en degrés
+        zoom (int): Niveau de zoom
+
+    Returns:
+        tuple: Tuile (zoom, x, y)
+    """
+    n = 2 ** zoom
+    lat_rad = math.radians(latitude)
+    x = int((longitude + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return zoom, min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tile_bounds(tile: Tile) -> Tuple[float, float, float, float]:
+    """
+    Calcule l'emprise d'une tuile.
+
+    Args:
+        tile (tuple): Tuile (zoom, x, y)
+
+    Returns:
+        tuple: Emprise (nord, sud, est, ouest), dans l'ordre attendu par osmnx
+    """
+    zoom, x, y = tile
+    n = 2 ** zoom
+
+    def lat(y_index):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y_index / n))))
+
+    return lat(y), lat(y + 1), (x + 1) / n * 360.0 - 180.0, x / n * 360.0 - 180.0
+
+
+def tiles_for_bbox(north: float, south: float, east: float, west: float, zoom: int) -> List[Tile]:
+    """
+    Liste les tuiles couvrant une emprise.
+
+    Args:
+        north (float): Latitude nord
+        south (float): Latitude sud
+        east (float): Longitude est
+        west (float): Longitude ouest
+        zoom (int): Niveau de zoom
+
+    Returns:
+        list: Tuiles (zoom, x, y)
+    """
+    _, x_min, y_min = tile_for_point(north, west, zoom)
+    _, x_max, y_max = tile_for_point(south, east, zoom)
+    return [(zoom, x, y) for x in range(x_min, x_max + 1) for y in range(y_min, y_max + 1)]
+
+
+class OSMTileCache:
+    """
+    Cache disque des données OSM indexé par tuiles fixes.
+    """
+    def __init__(self,
+                 cache_dir: Optional[str] = None,
+                 zoom: int = DEFAULT_ZOOM,
+                 ttl: float = DEFAULT_TTL,
+                 max_bytes: int = DEFAULT_MAX_BYTES,
+                 network_type: str = "all"):
+        """
+        Initialise le cache de tuiles OSM.
+
+        Args:
+            cache_dir (str, optional): Répertoire du cache (par défaut cache/osm_tiles)
+            zoom (int): Niveau de zoom des tuiles
+            ttl (float): Durée de validité d'une tuile en secondes
+            max_bytes (int): Taille maximale du cache sur disque
+            network_type (str): Type de réseau routier récupéré
+        """
+        self.cache_dir = cache_dir or get_cache_dir("osm_tiles")
+        self.zoom = zoom
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.network_type = network_type
+        self._lock = threading.RLock()
+        self._index_path = os.path.join(self.cache_dir, "index.json")
+        self._index = self._load_index()
+        self._index_dirty = False
+        self._index_saved_at = time.time()
+        self._single_flight = SingleFlight()
+        self._stats = {"hits": 0, "misses": 0, "refreshes": 0, "stale_hits": 0, "evictions": 0}
+        atexit.register(self.flush)
+
+    def get_graph(self, latitude: float, longitude: float, dist: float) -> nx.MultiDiGraph:
+        """
+        Récupère le réseau routier autour d'un point (équivalent de ox.graph_from_point).
+
+        Args:
+            latitude (float): Latitude du centre
+            longitude (float): Longitude du centre
+            dist (float): Distance en mètres (emprise carrée)
+
+        Returns:
+            MultiDiGraph: Réseau routier simplifié, tronqué à l'emprise
+        """
+        north, south, east, west = ox.utils_geo.bbox_from_point((latitude, longitude), dist=dist)
+        graphs = [
+            self._get_tile(tile, "graph", self._fetch_graph_tile, self._save_graph, self._load_graph)
+            for tile in tiles_for_bbox(north, south, east, west, self.zoom)
+        ]
+        graphs = [G for G in graphs if len(G) > 0]
+        if not graphs:
+            raise EmptyOverpassResponse("Aucun réseau routier dans la zone demandée")
+
+        G = nx.compose_all(graphs)
+        G = ox.truncate.truncate_graph_bbox(G, north, south, east, west)
+        return ox.simplify_graph(G)
+
+    def get_pois(self, latitude: float, longitude: float, dist: float, tags: Dict[str, Any]) -> gpd.GeoDataFrame:
+        """
+        Récupère les points d'intérêt autour d'un point (équivalent de ox.geometries_from_point).
+
+        Args:
+            latitude (float): Latitude du centre
+            longitude (float): Longitude du centre
+            dist (float): Distance en mètres (emprise carrée)
+            tags (dict): Tags OSM recherchés
+
+        Returns:
+            GeoDataFrame: Points d'intérêt de l'emprise, indexés par (element_type, osmid)
+        """
+        north, south, east, west = ox.utils_geo.bbox_from_point((latitude, longitude), dist=dist)
+        tags_key = hashlib.sha1(json.dumps(tags, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+        frames = [
+            self._get_tile(tile, f"pois_{tags_key}",
+                           lambda t: self._fetch_pois_tile(t, tags), self._save_pois, self._load_pois)
+            for tile in tiles_for_bbox(north, south, east, west, self.zoom)
+        ]
+        frames = [frame for frame in frames if len(frame) > 0]
+        if not frames:
+            return gpd.GeoDataFrame(geometry=[], crs="epsg:4326")
+
+        pois = pd.concat(frames)
+        pois = pois[~pois.index.duplicated(keep="first")]
+        return pois.cx[west:east, south:north]
+
+    def data_version(self, latitude: float, longitude: float, dist: float) -> str:
+        """
+        Calcule une version des données couvrant une emprise (date de la plus récente tuile).
+
+        Args:
+            latitude (float): Latitude du centre
+            longitude (float): Longitude du centre
+            dist (float): Distance en mètres
+
+        Returns:
+            str: Version des données
+        """
+        north, south, east, west = ox.utils_geo.bbox_from_point((latitude, longitude), dist=dist)
+        tiles = {self._tile_path(tile, "graph") for tile in tiles_for_bbox(north, south, east, west, self.zoom)}
+        with self._lock:
+            fetched = [entry["fetched_at"] for path, entry in self._index.items()
+                       if path in tiles]
+        return f"tiles-{int(max(fetched))}" if fetched else "tiles-0"
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Renvoie les statistiques d'utilisation du cache.
+
+        Returns:
+            dict: Compteurs de hits, misses, rafraîchissements et évictions
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["tiles"] = len(self._index)
+            stats["bytes"] = sum(entry["size"] for entry in self._index.values())
+        stats["collapsed"] = self._single_flight.stats()["collapsed"]
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def flush(self):
+        """
+        Écrit l'index s'il contient des dates d'accès non enregistrées (appelé à l'arrêt).
+        """
+        with self._lock:
+            if not self._index_dirty:
+                return
+            try:
+                self._save_index()
+            except OSError as e:
+                print(f"Erreur lors de l'écriture de l'index des tuiles: {e}")
+
+    def _get_tile(self, tile: Tile, layer: str, fetch, save, load):
+        """
+        Récupère une tuile depuis le cache ou la télécharge si elle manque ou a expiré.
+
+        Une tuile manquante demandée simultanément par plusieurs requêtes n'est
+        téléchargée qu'une fois.
+
+        Args:
+            tile (tuple): Tuile (zoom, x, y)
+            layer (str): Couche de données ('graph' ou 'pois_<tags>')
+            fetch (callable): Téléchargement de la tuile
+            save (callable): Écriture de la tuile sur disque
+            load (callable): Lecture de la tuile depuis le disque
+
+        Returns:
+            any: Contenu de la tuile
+        """
+        path = self._tile_path(tile, layer)
+        full_path = os.path.join(self.cache_dir, path)
+        data = self._load_hit(path, full_path, load)
+        if data is not _MISSING:
+            return data
+        return self._single_flight.do(path, lambda: self._refresh_tile(tile, path, fetch, save, load))
+
+    def _load_hit(self, path: str, full_path: str, load):
+        """
+        Lit une tuile valide en cache.
+
+        Le fichier est lu hors du verrou : une éviction par un autre thread
+        entre la vérification et la lecture est traitée comme une absence.
+
+        Args:
+            path (str): Chemin relatif de la tuile
+            full_path (str): Chemin du fichier de la tuile
+            load (callable): Lecture de la tuile depuis le disque
+
+        Returns:
+            any: Contenu de la tuile, ou _MISSING si elle doit être téléchargée
+        """
+        if not self._touch(path, full_path):
+            return _MISSING
+        try:
+            return load(full_path)
+        except FileNotFoundError:
+            with self._lock:
+                self._stats["hits"] -= 1
+            return _MISSING
+
+    def _touch(self, path: str, full_path: str) -> bool:
+        """
+        Enregistre la lecture d'une tuile valide en cache.
+
+        La date d'accès n'est mise à jour qu'en mémoire ; l'index est écrit au
+        plus toutes les INDEX_SAVE_INTERVAL secondes, lors d'un téléchargement
+        ou à l'arrêt.
+
+        Args:
+            path (str): Chemin relatif de la tuile
+            full_path (str): Chemin du fichier de la tuile
+
+        Returns:
+            bool: True si la tuile est en cache et n'a pas expiré
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._index.get(path)
+            if entry is None or now - entry["fetched_at"] > self.ttl or not os.path.exists(full_path):
+                return False
+            self._stats["hits"] += 1
+            entry["accessed_at"] = now
+            self._index_dirty = True
+            if now - self._index_saved_at >= INDEX_SAVE_INTERVAL:
+                self._save_index()
+        return True
+
+    def _refresh_tile(self, tile: Tile, path: str, fetch, save, load):
+        """
+        Télécharge une tuile manquante ou expirée et l'enregistre dans le cache.
+
+        Args:
+            tile (tuple): Tuile (zoom, x, y)
+            path (str): Chemin relatif de la tuile
+            fetch (callable): Téléchargement de la tuile
+            save (callable): Écriture de la tuile sur disque
+            load (callable): Lecture de la tuile depuis le disque
+
+        Returns:
+            any: Contenu de la tuile
+        """
+        full_path = os.path.join(self.cache_dir, path)
+        # Tuile enregistrée par un téléchargement terminé entre-temps
+        data = self._load_hit(path, full_path, load)
+        if data is not _MISSING:
+            return data
+
+        # Tuile présente mais expirée : conservée si le téléchargement échoue
+        now = time.time()
+        with self._lock:
+            cached = path in self._index and os.path.exists(full_path)
+
+        try:
+            data = fetch(tile)
+        except Exception as e:
+            if cached:
+                # Conserver la tuile périmée plutôt que d'échouer
+                print(f"Erreur lors du rafraîchissement de la tuile {path}: {e}")
+                try:
+                    data = load(full_path)
+                except FileNotFoundError:
+                    # Tuile périmée évincée entre-temps : rien à servir
+                    raise e
+                with self._lock:
+                    self._stats["stale_hits"] += 1
+                return data
+            raise
+
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        save(data, full_path)
+        with self._lock:
+            self._stats["refreshes" if cached else "misses"] += 1
+            self._index[path] = {
+                "fetched_at": now,
+                "accessed_at": now,
+                "size": os.path.getsize(full_path)
+            }
+            self._evict()
+            self._save_index()
+        return data
+
+    def _tile_path(self, tile: Tile, layer: str) -> str:
+        """
+        Calcule le chemin relatif d'une tuile dans le cache.
+
+        Args:
+            tile (tuple): Tuile (zoom, x, y)
+            layer (str): Couche de données
+
+        Returns:
+            str: Chemin relatif
+        """
+        zoom, x, y = tile
+        extension = "graphml" if layer == "graph" else "parquet"
+        if layer == "graph":
+            layer = f"graph_{self.network_type}"
+        return os.path.join(layer, str(zoom), str(x), f"{y}.{extension}")
+
+    def _fetch_graph_tile(self, tile: Tile) -> nx.MultiDiGraph:
+        """
+        Télécharge le réseau routier non simplifié d'une tuile.
+
+        Args:
+            tile (tuple): Tuile (zoom, x, y)
+
+        Returns:
+            MultiDiGraph: Réseau routier (vide si la tuile n'en contient pas)
+        """
+        north, south, east, west = tile_bounds(tile)
+        try:
+            # Non simplifié pour pouvoir raccorder les tuiles avant simplification
+            return ox.graph_from_bbox(north, south, east, west,
+                                      network_type=self.network_type,
+                                      simplify=False,
+                                      retain_all=True,
+                                      truncate_by_edge=True)
+        except (EmptyOverpassResponse, ValueError):
+            G = nx.MultiDiGraph()
+            G.graph["crs"] = "epsg:4326"
+            return G
+
+    def _fetch_pois_tile(self, tile: Tile, tags: Dict[str, Any]) -> gpd.GeoDataFrame:
+        """
+        Télécharge les points d'intérêt d'une tuile.
+
+        Args:
+            tile (tuple): Tuile (zoom, x, y)
+            tags (dict): Tags OSM recherchés
+
+        Returns:
+            GeoDataFrame: Points d'intérêt (vide si la tuile n'en contient pas)
+        """
+        north, south, east, west = tile_bounds(tile)
+        try:
+            return ox.geometries_from_bbox(north, south, east, west, tags=tags)
+        except EmptyOverpassResponse:
+            return gpd.GeoDataFrame(geometry=[], crs="epsg:4326")
+
+    @staticmethod
+    def _save_graph(G: nx.MultiDiGraph, path: str):
+        """
+        Enregistre le réseau routier d'une tuile au format GraphML.
+        """
+        ox.save_graphml(G, filepath=path)
+
+    @staticmethod
+    def _load_graph(path: str) -> nx.MultiDiGraph:
+        """
+        Charge le réseau routier d'une tuile depuis un fichier GraphML.
+        """
+        return ox.load_graphml(filepath=path)
+
+    @staticmethod
+    def _save_pois(pois: gpd.GeoDataFrame, path: str):
+        """
+        Enregistre les points d'intérêt d'une tuile au format GeoParquet.
+        """
+        pois = pois.reset_index()
+        # Les listes (nodes, ways) et valeurs mixtes ne sont pas sérialisables en Parquet
+        pois = pois.drop(columns=[column for column in ("nodes", "ways") if column in pois.columns])
+        for column in pois.columns:
+            if column != "geometry" and pois[column].dtype == object:
+                pois[column] = pois[column].where(pois[column].isna(), pois[column].astype(str))
+        pois.to_parquet(path)
+
+    @staticmethod
+    def _load_pois(path: str) -> gpd.GeoDataFrame:
+        """
+        Charge les points d'intérêt d'une tuile depuis un fichier GeoParquet.
+        """
+        pois = gpd.read_parquet(path)
+        if "element_type" in pois.columns and "osmid" in pois.columns:
+            pois = pois.set_index(["element_type", "osmid"])
+        return pois
+
+    def _evict(self):
+        """
+        Supprime les tuiles les moins récemment utilisées au-delà de la taille maximale.
+        """
+        total = sum(entry["size"] for entry in self._index.values())
+        if total <= self.max_bytes:
+            return
+
+        for path, entry in sorted(self._index.items(), key=lambda item: item[1]["accessed_at"]):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, path))
+            except OSError:
+                pass
+            total -= entry["size"]
+            del self._index[path]
+            self._stats["evictions"] += 1
+
+    def _load_index(self) -> Dict[str, Dict[str, float]]:
+        """
+        Charge l'index des tuiles depuis le disque.
+
+        Returns:
+            dict: Index {chemin: métadonnées}
+        """
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        """
+        Écrit l'index des tuiles de façon atomique.
+        """
+        tmp_path = f"{self._index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self._index_path)
+        self._index_dirty = False
+        self._index_saved_at = time.time()
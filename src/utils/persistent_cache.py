@@ -0,0 +1,210 @@
+"""
+Cache clé-valeur à deux niveaux : LRU en mémoire et SQLite persistant.
+Les valeurs sont sérialisées en JSON et chaque entrée porte sa propre date
+d'expiration, ce qui permet des durées de vie différentes par entrée.
+"""
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+# Sentinelle distinguant une absence d'entrée d'une valeur None en cache
+MISSING = object()
+
+
+class PersistentLRUCache:
+    """
+    Cache LRU en mémoire adossé à une table SQLite.
+    """
+    def __init__(self,
+                 db_path: str,
+                 table: str = "cache",
+                 max_memory_entries: int = 1024,
+                 max_entries: Optional[int] = None,
+                 max_bytes: Optional[int] = None,
+                 default_ttl: Optional[float] = None):
+        """
+        Initialise le cache à deux niveaux.
+
+        Args:
+            db_path (str): Chemin de la base SQLite
+            table (str): Nom de la table utilisée
+            max_memory_entries (int): Nombre maximal d'entrées en mémoire
+            max_entries (int, optional): Nombre maximal d'entrées persistantes
+            max_bytes (int, optional): Taille maximale des valeurs persistantes
+            default_ttl (float, optional): Durée de vie par défaut en secondes (None = illimitée)
+        """
+        self.db_path = db_path
+        self.table = table
+        self.max_memory_entries = max_memory_entries
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._memory: "OrderedDict[str, Tuple[Any, Optional[float]]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "expires_at REAL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table} (accessed_at)")
+        self._conn.commit()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        Récupère une valeur en cache.
+
+        Args:
+            key (str): Clé de l'entrée
+            default (any): Valeur renvoyée si l'entrée est absente ou expirée
+
+        Returns:
+            any: Valeur en cache ou valeur par défaut
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                self._stats["misses"] += 1
+                return default
+
+            self._conn.execute(f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            value = json.loads(row[0])
+            self._remember(key, value, row[1])
+            self._stats["disk_hits"] += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = MISSING):
+        """
+        Enregistre une valeur dans les deux niveaux du cache.
+
+        Args:
+            key (str): Clé de l'entrée
+            value (any): Valeur sérialisable en JSON
+            ttl (float, optional): Durée de vie en secondes (par défaut celle du cache)
+        """
+        if ttl is MISSING:
+            ttl = self.default_ttl
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        payload = json.dumps(value, ensure_ascii=False)
+
+        with self._lock:
+            self._remember(key, value, expires_at)
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, size, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, payload, len(payload), expires_at, now)
+            )
+            self._stats["writes"] += 1
+            self._evict(now)
+            self._conn.commit()
+
+    def delete(self, key: str):
+        """
+        Supprime une entrée du cache.
+
+        Args:
+            key (str): Clé de l'entrée
+        """
+        with self._lock:
+            self._memory.pop(key, None)
+            self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        """
+        Vide les deux niveaux du cache.
+        """
+        with self._lock:
+            self._memory.clear()
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Renvoie les statistiques d'utilisation du cache.
+
+        Returns:
+            dict: Compteurs de hits (mémoire, disque), misses, écritures et évictions
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            count, size = self._conn.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}"
+            ).fetchone()
+        stats["entries"] = count
+        stats["bytes"] = size
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def _remember(self, key: str, value: Any, expires_at: Optional[float]):
+        """
+        Place une entrée dans le niveau mémoire en respectant sa capacité.
+
+        Args:
+            key (str): Clé de l'entrée
+            value (any): Valeur
+            expires_at (float, optional): Date d'expiration
+        """
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict(self, now: float):
+        """
+        Supprime les entrées expirées puis les moins récemment utilisées
+        au-delà des limites du niveau persistant.
+
+        Args:
+            now (float): Date courante
+        """
+        cursor = self._conn.execute(
+            f"DELETE FROM {self.table} WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)
+        )
+        evicted = max(cursor.rowcount, 0)
+
+        if self.max_entries is not None:
+            cursor = self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            evicted += max(cursor.rowcount, 0)
+
+        if self.max_bytes is not None:
+            total = self._conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+            if total > self.max_bytes:
+                rows = self._conn.execute(
+                    f"SELECT key, size FROM {self.table} ORDER BY accessed_at ASC"
+                ).fetchall()
+                for key, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                    self._memory.pop(key, None)
+                    total -= size
+                    evicted += 1
+
+        self._stats["evictions"] += evicted
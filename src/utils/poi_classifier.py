@@ -0,0 +1,127 @@
+"""
+Classification vectorisée des points d'intérêt OSM.
+Une taxonomie associe chaque catégorie à plusieurs couples (clé, valeur) OSM,
+ce qui permet d'étiqueter tout un GeoDataFrame en une seule passe.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.utils.geo_utils import centroid_coordinates
+
+# Catégories de POI et tags OSM correspondants, par ordre de priorité
+POI_TAXONOMY = {
+    "pharmacy": [("amenity", "pharmacy"), ("healthcare", "pharmacy"), ("shop", "chemist")],
+    "hospital": [("amenity", "hospital"), ("healthcare", "hospital")],
+    "doctors": [("amenity", "doctors"), ("healthcare", "doctor")],
+    "dentist": [("amenity", "dentist"), ("healthcare", "dentist")],
+    "school": [("amenity", "school"), ("amenity", "college")],
+    "supermarket": [("shop", "supermarket"), ("shop", "hypermarket")],
+    "bakery": [("shop", "bakery"), ("shop", "pastry")],
+    "restaurant": [("amenity", "restaurant"), ("amenity", "fast_food")],
+    "cafe": [("amenity", "cafe")],
+    "bank": [("amenity", "bank")],
+    "post_office": [("amenity", "post_office")],
+    "bus_stop": [("highway", "bus_stop"), ("amenity", "bus_station")]
+}
+
+# Correspondance entre les types de commerce saisis et les catégories
+BUSINESS_TYPE_CATEGORIES = {
+    "pharmacie": "pharmacy",
+    "boulangerie": "bakery",
+    "supermarché": "supermarket",
+    "restaurant": "restaurant",
+    "café": "cafe",
+    "banque": "bank",
+    "école": "school",
+    "hôpital": "hospital",
+    "médecin": "doctors",
+    "dentiste": "dentist"
+}
+
+
+def business_type_category(business_type: str) -> Optional[str]:
+    """
+    Renvoie la catégorie de POI correspondant à un type de commerce.
+
+    Args:
+        business_type (str): Type de commerce (pharmacie, boulangerie, etc.)
+
+    Returns:
+        str: Catégorie de la taxonomie, ou None si le type est inconnu
+    """
+    key = (business_type or "").strip().lower()
+    if key in BUSINESS_TYPE_CATEGORIES:
+        return BUSINESS_TYPE_CATEGORIES[key]
+    return key if key in POI_TAXONOMY else None
+
+
+def classify_pois(pois: pd.DataFrame, taxonomy: Optional[Dict[str, List[Tuple[str, str]]]] = None) -> pd.Categorical:
+    """
+    Étiquette chaque POI avec sa catégorie en une passe vectorisée.
+
+    Un POI correspondant à plusieurs catégories reçoit la première dans
+    l'ordre de la taxonomie.
+
+    Args:
+        pois (DataFrame): POI avec des colonnes de tags OSM
+        taxonomy (dict, optional): Taxonomie à utiliser (POI_TAXONOMY par défaut)
+
+    Returns:
+        pd.Categorical: Catégorie de chaque POI (NaN si non classé)
+    """
+    taxonomy = taxonomy or POI_TAXONOMY
+    categories = list(taxonomy)
+    codes = np.full(len(pois), -1, dtype=np.int16)
+
+    # Parcourir les catégories à rebours pour que la première correspondance l'emporte
+    for code in range(len(categories) - 1, -1, -1):
+        mask = np.zeros(len(pois), dtype=bool)
+        values_by_key: Dict[str, List[str]] = {}
+        for key, value in taxonomy[categories[code]]:
+            values_by_key.setdefault(key, []).append(value)
+        for key, values in values_by_key.items():
+            if key in pois.columns:
+                mask |= pois[key].isin(values).to_numpy()
+        codes[mask] = code
+
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+
+def classify_and_extract(pois: pd.DataFrame,
+                         business_type: str,
+                         taxonomy: Optional[Dict[str, List[Tuple[str, str]]]] = None
+                         ) -> Tuple[pd.Categorical, List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Classe les POI puis en extrait les concurrents et les effectifs par catégorie.
+
+    Args:
+        pois (GeoDataFrame): POI avec des colonnes de tags OSM
+        business_type (str): Type de commerce analysé
+        taxonomy (dict, optional): Taxonomie à utiliser (POI_TAXONOMY par défaut)
+
+    Returns:
+        tuple: Catégories, liste des concurrents et nombre de POI par catégorie
+    """
+    categories = classify_pois(pois, taxonomy)
+    counts = pd.Series(categories).value_counts(sort=False)
+    pois_count = {category: int(count) for category, count in counts.items()}
+
+    competitors = []
+    target = business_type_category(business_type)
+    if target is not None and target in categories.categories:
+        mask = np.asarray(categories == target)
+        if mask.any():
+            selected = pois[mask]
+            longitudes, latitudes = centroid_coordinates(selected.geometry)
+            if "name" in selected.columns:
+                names = selected["name"].astype(object).where(selected["name"].notna(), "Inconnu").tolist()
+            else:
+                names = ["Inconnu"] * len(selected)
+            competitors = [
+                {"name": name, "latitude": float(lat), "longitude": float(lon)}
+                for name, lat, lon in zip(names, latitudes, longitudes)
+            ]
+
+    return categories, competitors, pois_count
@@ -0,0 +1,184 @@
+"""
+Métriques de proximité des concurrents fondées sur un KD-tree.
+Les coordonnées sont projetées sur la sphère unité : la distance euclidienne
+(corde) y est une fonction monotone de la distance orthodromique, ce qui rend
+les requêtes du KD-tree exactes à toutes les échelles.
+"""
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from src.utils.geo_utils import EARTH_RADIUS_M
+
+DEFAULT_BANDS = (250, 500, 1000)
+
+
+def _to_unit_sphere(latitudes, longitudes) -> np.ndarray:
+    """
+    Convertit des coordonnées WGS84 en points de la sphère unité.
+
+    Args:
+        latitudes (array-like): Latitudes en degrés
+        longitudes (array-like): Longitudes en degrés
+
+    Returns:
+        np.ndarray: Tableau (n, 3) de coordonnées cartésiennes
+    """
+    lat = np.radians(np.atleast_1d(np.asarray(latitudes, dtype=np.float64)))
+    lon = np.radians(np.atleast_1d(np.asarray(longitudes, dtype=np.float64)))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+def _chord_to_meters(chord: np.ndarray) -> np.ndarray:
+    """
+    Convertit une corde de la sphère unité en distance orthodromique (mètres).
+    """
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.clip(chord / 2, 0.0, 1.0))
+
+
+def _meters_to_chord(meters: float) -> float:
+    """
+    Convertit une distance orthodromique (mètres) en corde de la sphère unité.
+    """
+    return 2 * np.sin(meters / (2 * EARTH_RADIUS_M))
+
+
+class CompetitorProximity:
+    """
+    Index spatial des concurrents pour les requêtes de proximité vectorisées.
+    """
+    def __init__(self, latitudes: Sequence[float], longitudes: Sequence[float]):
+        """
+        Construit le KD-tree des concurrents.
+
+        Args:
+            latitudes (array-like): Latitudes des concurrents
+            longitudes (array-like): Longitudes des concurrents
+        """
+        self.size = len(latitudes)
+        self.tree = cKDTree(_to_unit_sphere(latitudes, longitudes)) if self.size else None
+
+    @classmethod
+    def from_competitors(cls, competitors: List[Dict[str, Any]]) -> "CompetitorProximity":
+        """
+        Construit l'index à partir d'une liste de concurrents.
+
+        Args:
+            competitors (list): Concurrents (dictionnaires avec 'latitude' et 'longitude')
+
+        Returns:
+            CompetitorProximity: Index construit
+        """
+        return cls([competitor["latitude"] for competitor in competitors],
+                   [competitor["longitude"] for competitor in competitors])
+
+    def k_nearest(self, latitudes, longitudes, k: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Calcule les k concurrents les plus proches de chaque point.
+
+        Args:
+            latitudes (array-like): Latitudes des points de requête
+            longitudes (array-like): Longitudes des points de requête
+            k (int): Nombre de voisins
+
+        Returns:
+            tuple: Distances en mètres (n, k) et indices (n, k) ; inf et -1
+                   lorsqu'il y a moins de k concurrents
+        """
+        points = _to_unit_sphere(latitudes, longitudes)
+        distances = np.full((len(points), k), np.inf)
+        indices = np.full((len(points), k), -1, dtype=np.int64)
+        if self.tree is None:
+            return distances, indices
+
+        chords, found = self.tree.query(points, k=min(k, self.size))
+        chords = chords.reshape(len(points), -1)
+        found = found.reshape(len(points), -1)
+        distances[:, :found.shape[1]] = _chord_to_meters(chords)
+        indices[:, :found.shape[1]] = found
+        return distances, indices
+
+    def nearest(self, latitudes, longitudes) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Calcule le concurrent le plus proche de chaque point.
+
+        Args:
+            latitudes (array-like): Latitudes des points de requête
+            longitudes (array-like): Longitudes des points de requête
+
+        Returns:
+            tuple: Distances en mètres et indices (inf et -1 sans concurrent)
+        """
+        distances, indices = self.k_nearest(latitudes, longitudes, k=1)
+        return distances[:, 0], indices[:, 0]
+
+    def counts_within(self, latitudes, longitudes, bands: Sequence[float] = DEFAULT_BANDS) -> Dict[int, np.ndarray]:
+        """
+        Compte les concurrents situés dans plusieurs rayons autour de chaque point.
+
+        Args:
+            latitudes (array-like): Latitudes des points de requête
+            longitudes (array-like): Longitudes des points de requête
+            bands (list): Rayons en mètres
+
+        Returns:
+            dict: Nombre de concurrents par rayon {rayon: tableau (n,)}
+        """
+        points = _to_unit_sphere(latitudes, longitudes)
+        if self.tree is None:
+            return {int(band): np.zeros(len(points), dtype=np.int64) for band in bands}
+        return {
+            int(band): np.asarray(self.tree.query_ball_point(points, _meters_to_chord(band), return_length=True))
+            for band in bands
+        }
+
+    def summary(self, latitude: float, longitude: float, k: int = 3,
+                bands: Sequence[float] = DEFAULT_BANDS) -> Dict[str, Any]:
+        """
+        Résume la situation concurrentielle d'un point unique.
+
+        Args:
+            latitude (float): Latitude du point
+            longitude (float): Longitude du point
+            k (int): Nombre de voisins listés
+            bands (list): Rayons de comptage en mètres
+
+        Returns:
+            dict: Distance au plus proche, k plus proches, effectifs par rayon et score
+        """
+        distances, indices = self.k_nearest(latitude, longitude, k=k)
+        counts = self.counts_within(latitude, longitude, bands)
+        nearest = float(distances[0, 0])
+        return {
+            "nearest_distance": round(nearest, 1) if np.isfinite(nearest) else None,
+            "k_nearest": [
+                {"index": int(index), "distance": round(float(distance), 1)}
+                for distance, index in zip(distances[0], indices[0]) if index >= 0
+            ],
+            "counts_within": {str(band): int(count[0]) for band, count in counts.items()},
+            "competition_score": round(float(competition_score(distances[:, 0], counts.get(500))[0]), 1)
+        }
+
+
+def competition_score(nearest_distances: np.ndarray, counts_500m=None) -> np.ndarray:
+    """
+    Convertit des métriques de proximité en score de concurrence sur 10.
+
+    Le score est élevé quand le concurrent le plus proche est loin et que
+    peu de concurrents se trouvent à moins de 500 m.
+
+    Args:
+        nearest_distances (np.ndarray): Distance au concurrent le plus proche en mètres
+        counts_500m (np.ndarray, optional): Nombre de concurrents à moins de 500 m
+
+    Returns:
+        np.ndarray: Scores entre 0 et 10
+    """
+    nearest_distances = np.asarray(nearest_distances, dtype=np.float64)
+    proximity_term = 1.0 - np.exp(-nearest_distances / 300.0)
+    if counts_500m is None:
+        return 10.0 * proximity_term
+    density_term = 1.0 / (1.0 + np.asarray(counts_500m, dtype=np.float64) / 3.0)
+    return 10.0 * (0.6 * proximity_term + 0.4 * density_term)
@@ -0,0 +1,134 @@
+"""
+Pool de processus dédié au rendu des graphiques.
+Les rendus matplotlib sont exécutés hors du thread de la requête, dans des
+processus où matplotlib (backend Agg) est importé une fois au démarrage ;
+plusieurs rendus avancent ainsi en parallèle sur plusieurs cœurs et l'appelant
+reçoit un Future.
+"""
+import os
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Optional
+
+# Nombre de processus de rendu (modifiable par variable d'environnement)
+DEFAULT_MAX_WORKERS = min(4, os.cpu_count() or 1)
+MAX_WORKERS_ENV = "GEOMARKETING_RENDER_WORKERS"
+
+
+def _initialize_worker():
+    """
+    Importe matplotlib et les fonctions de rendu au démarrage d'un processus.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import src.utils.charts  # noqa: F401
+
+
+def _render_chart(name: str, *args, **kwargs):
+    """
+    Exécute une fonction de src.utils.charts désignée par son nom.
+    """
+    from src.utils import charts
+    return getattr(charts, name)(*args, **kwargs)
+
+
+class RenderPool:
+    """
+    Exécuteur de rendus dans un pool de processus.
+    """
+    def __init__(self, max_workers: Optional[int] = None):
+        """
+        Initialise le pool (les processus sont démarrés à la première soumission).
+
+        Les processus sont créés par 'spawn' : un fork depuis un serveur WSGI
+        multi-thread pourrait copier des verrous dans un état incohérent.
+
+        Args:
+            max_workers (int, optional): Nombre de processus
+                (par défaut $GEOMARKETING_RENDER_WORKERS ou min(4, nombre de cœurs))
+        """
+        if max_workers is None:
+            max_workers = int(os.environ.get(MAX_WORKERS_ENV) or DEFAULT_MAX_WORKERS)
+        self.max_workers = max(1, max_workers)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """
+        Soumet un rendu au pool.
+
+        La fonction et ses arguments doivent être sérialisables (fonction de
+        module, données NumPy ou JSON). Si le pool a été interrompu (processus
+        tué), il est recréé.
+
+        Args:
+            fn (callable): Fonction de rendu (voir src.utils.charts)
+
+        Returns:
+            Future: Résultat de la fonction
+        """
+        with self._lock:
+            try:
+                return self._get_executor().submit(fn, *args, **kwargs)
+            except BrokenProcessPool:
+                print("Pool de rendu interrompu, redémarrage")
+                self._executor = None
+                return self._get_executor().submit(fn, *args, **kwargs)
+
+    def submit_chart(self, name: str, *args, **kwargs) -> Future:
+        """
+        Soumet une fonction de src.utils.charts désignée par son nom.
+
+        Le processus appelant n'a ainsi pas besoin d'importer matplotlib.
+
+        Args:
+            name (str): Nom de la fonction de rendu (par exemple 'render_heatmap')
+
+        Returns:
+            Future: Résultat de la fonction
+        """
+        return self.submit(_render_chart, name, *args, **kwargs)
+
+    def shutdown(self, wait: bool = True):
+        """
+        Arrête les processus du pool.
+
+        Args:
+            wait (bool): Si True, attend la fin des rendus en cours
+        """
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=wait)
+                self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """
+        Crée l'exécuteur au premier appel.
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_initialize_worker
+            )
+        return self._executor
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_render_pool() -> RenderPool:
+    """
+    Renvoie le pool de rendu partagé par les services.
+
+    Returns:
+        RenderPool: Instance partagée
+    """
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = RenderPool()
+        return _default_pool
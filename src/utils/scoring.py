@@ -0,0 +1,79 @@
+"""
+Combinaison des sous-scores d'analyse selon les facteurs d'importance.
+"""
+from typing import Dict
+
+import numpy as np
+
+
+def combine_commercial_scores(sub_scores: Dict[str, float], importance_factors: Dict[str, float]) -> float:
+    """
+    Calcule le score global d'un emplacement commercial.
+
+    La visibilité, faute de mesure directe, est estimée par la moyenne des
+    scores de points d'intérêt et d'accessibilité.
+
+    Args:
+        sub_scores (dict): Scores 'poi_score', 'road_score' et 'competition_score' sur 10
+        importance_factors (dict): Facteurs d'importance (population, competition, accessibility, visibility)
+
+    Returns:
+        float: Score global arrondi à 1 décimale
+    """
+    return round(float(weighted_commercial_score(sub_scores, importance_factors)), 1)
+
+
+def weighted_commercial_score(sub_scores: Dict[str, float], importance_factors: Dict[str, float]):
+    """
+    Pondère les sous-scores sans arrondi (accepte des scalaires ou des grilles numpy).
+
+    Args:
+        sub_scores (dict): Scores 'poi_score', 'road_score' et 'competition_score' sur 10
+        importance_factors (dict): Facteurs d'importance
+
+    Returns:
+        float | np.ndarray: Score global
+    """
+    poi_score = sub_scores.get("poi_score", 0.0)
+    road_score = sub_scores.get("road_score", 0.0)
+    competition_score = sub_scores.get("competition_score", 0.0)
+
+    global_score = (
+        poi_score * importance_factors.get("population", 0.4) +
+        road_score * importance_factors.get("accessibility", 0.2) +
+        competition_score * importance_factors.get("competition", 0.3) +
+        (poi_score + road_score) / 2 * importance_factors.get("visibility", 0.1)
+    )
+    return global_score
+
+
+# Densité de POI commerciaux et de services de référence (POI par km²)
+REFERENCE_POI_DENSITY = 100.0
+
+
+def poi_density_score(poi_count: int, radius: float) -> float:
+    """
+    Convertit le nombre de POI commerciaux et de services d'un cercle en score sur 10.
+
+    Args:
+        poi_count (int): Nombre de POI dans le cercle d'analyse
+        radius (float): Rayon du cercle en mètres
+
+    Returns:
+        float: Score arrondi à 1 décimale
+    """
+    density = poi_count / (np.pi * (radius / 1000) ** 2)
+    return round(float(poi_density_scores(density)), 1)
+
+
+def poi_density_scores(densities) -> np.ndarray:
+    """
+    Convertit des densités de POI (POI par km²) en scores sur 10, sans arrondi.
+
+    Args:
+        densities (array-like): Densités de POI commerciaux et de services
+
+    Returns:
+        np.ndarray: Scores entre 0 et 10
+    """
+    return 10.0 * (1.0 - np.exp(-np.asarray(densities, dtype=np.float64) / REFERENCE_POI_DENSITY))
@@ -0,0 +1,76 @@
+"""
+Regroupement des analyses identiques en cours (single-flight).
+Lorsque plusieurs requêtes demandent la même analyse au même moment (page
+d'exemple, campagne), seule la première l'exécute : les suivantes attendent
+son résultat au lieu de relancer récupération OSM, appel à l'IA et rendus.
+Les clés sont calculées par l'appelant à partir des entrées normalisées.
+"""
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    Exécute une seule fois les appels simultanés de même clé (thread-safe).
+    """
+    def __init__(self):
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "executions": 0, "collapsed": 0, "failures": 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        """
+        Exécute `fn`, ou attend le résultat d'un appel de même clé déjà en cours.
+
+        Le résultat n'est pas conservé : un appel lancé après la fin du
+        précédent exécute à nouveau `fn`.
+
+        Args:
+            key (hashable): Clé de l'appel
+            fn (callable): Fonction sans argument à exécuter
+
+        Returns:
+            any: Résultat de `fn` (le même objet pour tous les appels regroupés)
+
+        Raises:
+            Exception: Erreur levée par `fn`, transmise à tous les appels regroupés
+        """
+        with self._lock:
+            self._stats["calls"] += 1
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self._stats["executions"] += 1
+            else:
+                self._stats["collapsed"] += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                self._stats["failures"] += 1
+                del self._calls[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._calls[key]
+        future.set_result(result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Renvoie les compteurs d'appels.
+
+        Returns:
+            dict: Appels, exécutions, appels regroupés (collapsed), échecs et
+                appels en cours
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls)
+        return stats
@@ -0,0 +1,346 @@
+"""
+Jeu de données géographiques partagé par plusieurs sites candidats.
+Le réseau routier et les POI de l'emprise englobant tous les sites sont
+récupérés une seule fois ; chaque site est ensuite mesuré sur ces données
+(POI, concurrence, réseau routier, isochrones) sans nouvel accès à OSM.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import geopandas as gpd
+import networkx as nx
+
+from src.utils.geo_utils import centroid_coordinates, haversine_distances, metric_bounds, to_local_metric
+from src.utils.poi_classifier import business_type_category, classify_pois
+from src.utils.proximity import CompetitorProximity
+from src.utils.network_metrics import NetworkMeasurer, road_score
+from src.utils.isochrones import IsochroneEngine
+from src.utils.scoring import poi_density_score
+from src.utils.site_selection import find_best_sites, score_candidate_grid, DEFAULT_RESOLUTION, DEFAULT_TOP_N
+
+# Tags OSM des points d'intérêt récupérés pour l'analyse commerciale
+POI_TAGS = {
+    'amenity': True,
+    'shop': True,
+    'healthcare': True,
+    'building': True,
+    'highway': 'bus_stop'
+}
+
+# Colonnes identifiant les POI commerciaux et de services (pas les bâtiments seuls)
+COMMERCIAL_POI_COLUMNS = ("amenity", "shop", "healthcare")
+
+# Demi-côté maximal (mètres) de l'emprise récupérée en une fois : environ
+# 13 x 13 tuiles de zoom 15 à Paris. Au-delà, les sites sont répartis en groupes.
+MAX_EXTENT_HALF_SIZE = 5000.0
+
+
+def union_extent(sites: Sequence[Tuple[float, float, float]]) -> Tuple[float, float, float]:
+    """
+    Calcule le carré englobant les cercles d'analyse de plusieurs sites.
+
+    Args:
+        sites (list): Sites (latitude, longitude, rayon en mètres)
+
+    Returns:
+        tuple: Latitude et longitude du centre, demi-côté en mètres
+    """
+    bounds = np.array([metric_bounds(lon, lat, radius) for lat, lon, radius in sites])
+    return _bounds_extent(bounds[:, 0].min(), bounds[:, 1].min(), bounds[:, 2].max(), bounds[:, 3].max())
+
+
+def cluster_sites(sites: Sequence[Tuple[float, float, float]],
+                  max_half_size: float = MAX_EXTENT_HALF_SIZE) -> List[List[int]]:
+    """
+    Répartit des sites en groupes voisins dont l'emprise englobante reste bornée.
+
+    Chaque site rejoint le premier groupe (sites parcourus du nord au sud) dont
+    l'emprise, agrandie de son cercle d'analyse, ne dépasse pas max_half_size ;
+    sinon il forme un nouveau groupe. Un site dont le cercle dépasse seul la
+    limite forme son propre groupe.
+
+    Args:
+        sites (list): Sites (latitude, longitude, rayon en mètres)
+        max_half_size (float): Demi-côté maximal de l'emprise d'un groupe en mètres
+
+    Returns:
+        list: Positions des sites de chaque groupe
+    """
+    clusters: List[List[int]] = []
+    extents: List[Tuple[float, float, float, float]] = []
+    for position in sorted(range(len(sites)), key=lambda i: (-sites[i][0], sites[i][1])):
+        lat, lon, radius = sites[position]
+        west, south, east, north = metric_bounds(lon, lat, radius)
+        for index, (c_west, c_south, c_east, c_north) in enumerate(extents):
+            merged = (min(west, c_west), min(south, c_south), max(east, c_east), max(north, c_north))
+            if _bounds_extent(*merged)[2] <= max_half_size:
+                clusters[index].append(position)
+                extents[index] = merged
+                break
+        else:
+            clusters.append([position])
+            extents.append((west, south, east, north))
+    return [sorted(cluster) for cluster in clusters]
+
+
+def _bounds_extent(west: float, south: float, east: float, north: float) -> Tuple[float, float, float]:
+    """
+    Calcule le carré métrique centré englobant une emprise WGS84.
+
+    Returns:
+        tuple: Latitude et longitude du centre, demi-côté en mètres
+    """
+    center_lat, center_lon = (south + north) / 2, (west + east) / 2
+    x, y = to_local_metric([west, east], [south, north], center_lon, center_lat)
+    return float(center_lat), float(center_lon), float(max(x[1] - x[0], y[1] - y[0]) / 2)
+
+
+class SiteDataset:
+    """
+    Réseau routier et POI d'une zone, avec les index nécessaires pour mesurer des sites.
+    """
+    def __init__(self,
+                 G: nx.MultiDiGraph,
+                 pois: gpd.GeoDataFrame,
+                 center_lat: float,
+                 center_lon: float,
+                 data_version: Optional[str] = None):
+        """
+        Classe les POI et construit les index partagés (réseau projeté, isochrones).
+
+        Args:
+            G (MultiDiGraph): Réseau routier de la zone
+            pois (GeoDataFrame): Points d'intérêt de la zone
+            center_lat (float): Latitude du centre de la zone
+            center_lon (float): Longitude du centre de la zone
+            data_version (str, optional): Version des données source
+        """
+        self.G = G
+        self.pois = pois.assign(category=classify_pois(pois))
+        self.data_version = data_version
+        self.longitudes, self.latitudes = centroid_coordinates(self.pois.geometry)
+        self.category_codes = np.asarray(self.pois["category"].cat.codes)
+        self.categories = list(self.pois["category"].cat.categories)
+        if "name" in self.pois.columns:
+            self.names = self.pois["name"].astype(object).where(self.pois["name"].notna(), "Inconnu").to_numpy()
+        else:
+            self.names = np.full(len(self.pois), "Inconnu", dtype=object)
+
+        columns = [column for column in COMMERCIAL_POI_COLUMNS if column in self.pois.columns]
+        self.commercial = self.pois[columns].notna().any(axis=1).to_numpy() if columns \
+            else np.ones(len(self.pois), dtype=bool)
+
+        self.network = NetworkMeasurer(G, center_lat, center_lon)
+        self.isochrones = IsochroneEngine(G, mode="walk")
+        self.isochrones.set_pois(self.latitudes[self.commercial], self.longitudes[self.commercial],
+                                 self.pois["category"][self.commercial])
+        self._proximity: Dict[str, CompetitorProximity] = {}
+
+    @classmethod
+    def fetch(cls, source, sites: Sequence[Tuple[float, float, float]], tags: Optional[Dict[str, Any]] = None) -> "SiteDataset":
+        """
+        Récupère une seule fois les données couvrant tous les sites.
+
+        Les sites doivent être voisins (voir cluster_sites) : l'emprise englobante
+        n'est pas bornée.
+
+        Args:
+            source: Source de données (OSMTileCache ou OSMExtractIndex)
+            sites (list): Sites (latitude, longitude, rayon en mètres)
+            tags (dict, optional): Tags OSM des POI (POI_TAGS par défaut)
+
+        Returns:
+            SiteDataset: Données de l'emprise englobante
+        """
+        center_lat, center_lon, half_size = union_extent(sites)
+        G = source.get_graph(center_lat, center_lon, half_size)
+        pois = source.get_pois(center_lat, center_lon, half_size, tags or POI_TAGS)
+        return cls(G, pois, center_lat, center_lon,
+                   data_version=source.data_version(center_lat, center_lon, half_size))
+
+    def competitors_index(self, category: Optional[str]) -> CompetitorProximity:
+        """
+        Renvoie l'index de proximité des POI d'une catégorie (construit une fois par catégorie).
+
+        Args:
+            category (str): Catégorie des concurrents (None : aucun concurrent)
+
+        Returns:
+            CompetitorProximity: Index des concurrents de toute la zone
+        """
+        if category not in self._proximity:
+            mask = self._category_mask(category)
+            self._proximity[category] = CompetitorProximity(self.latitudes[mask], self.longitudes[mask])
+        return self._proximity[category]
+
+    def measure_sites(self,
+                      sites: Sequence[Tuple[float, float, float]],
+                      business_types: Sequence[str],
+                      polygons: bool = False) -> List[Dict[str, Any]]:
+        """
+        Mesure plusieurs sites sur les données partagées.
+
+        Les isochrones de tous les sites sont calculées en un seul appel à Dijkstra.
+
+        Args:
+            sites (list): Sites (latitude, longitude, rayon en mètres)
+            business_types (list): Type de commerce de chaque site
+            polygons (bool): Si True, inclut les polygones des isochrones
+
+        Returns:
+            list: Pour chaque site, POI, concurrents, concurrence, réseau routier,
+                  accessibilité et sous-scores mesurés
+        """
+        latitudes = [lat for lat, _, _ in sites]
+        longitudes = [lon for _, lon, _ in sites]
+        accessibility = self.isochrones.compute(latitudes, longitudes, polygons=polygons)
+        return [
+            self._measure_site(latitude, longitude, radius, business_type, site_accessibility)
+            for (latitude, longitude, radius), business_type, site_accessibility
+            in zip(sites, business_types, accessibility)
+        ]
+
+    def candidate_grid(self,
+                       latitude: float,
+                       longitude: float,
+                       radius: float,
+                       business_type: str,
+                       resolution: int = DEFAULT_RESOLUTION) -> Dict[str, Any]:
+        """
+        Calcule les sous-scores d'une grille de candidats couvrant un cercle d'analyse.
+
+        Args:
+            latitude (float): Latitude du centre du cercle
+            longitude (float): Longitude du centre du cercle
+            radius (float): Rayon du cercle en mètres
+            business_type (str): Type de commerce
+            resolution (int): Nombre de cellules par côté de la grille
+
+        Returns:
+            dict: Grille de candidats (voir site_selection.score_candidate_grid)
+        """
+        return score_candidate_grid(latitude, longitude, radius, resolution=resolution,
+                                    **self._selection_layers(radius, business_type, resolution))
+
+    def best_sites(self,
+                   latitude: float,
+                   longitude: float,
+                   radius: float,
+                   business_type: str,
+                   importance_factors: Dict[str, float],
+                   top_n: int = DEFAULT_TOP_N,
+                   candidates: str = "grid",
+                   resolution: int = DEFAULT_RESOLUTION) -> List[Dict[str, Any]]:
+        """
+        Recherche les meilleurs emplacements d'un cercle d'analyse.
+
+        Args:
+            latitude (float): Latitude du centre du cercle
+            longitude (float): Longitude du centre du cercle
+            radius (float): Rayon du cercle en mètres
+            business_type (str): Type de commerce
+            importance_factors (dict): Facteurs d'importance de l'analyse
+            top_n (int): Nombre de sites renvoyés
+            candidates (str): 'grid' (grille régulière) ou 'roads' (nœuds du réseau)
+            resolution (int): Nombre de cellules par côté de la grille
+
+        Returns:
+            list: Sites classés (voir site_selection.find_best_sites)
+        """
+        if candidates not in ("grid", "roads"):
+            raise ValueError(f"Type de candidats inconnu: {candidates}")
+
+        node_lons, node_lats = self.network.node_coordinates()
+        return find_best_sites(
+            latitude,
+            longitude,
+            radius,
+            importance_factors,
+            candidates=(node_lats, node_lons) if candidates == "roads" else None,
+            top_n=top_n,
+            resolution=resolution,
+            **self._selection_layers(radius, business_type, resolution)
+        )
+
+    def _selection_layers(self, radius: float, business_type: str, resolution: int) -> Dict[str, Any]:
+        """
+        Prépare les couches de la recherche des meilleurs emplacements.
+
+        Args:
+            radius (float): Rayon du cercle en mètres
+            business_type (str): Type de commerce
+            resolution (int): Nombre de cellules par côté de la grille
+
+        Returns:
+            dict: Couches 'pois', 'competitors', 'streets' et 'intersections'
+        """
+        return {
+            "pois": (self.longitudes[self.commercial], self.latitudes[self.commercial]),
+            "competitors": self.competitors_index(business_type_category(business_type)),
+            "streets": self.network.street_samples(2 * radius / resolution),
+            "intersections": self.network.intersections()
+        }
+
+    def _measure_site(self,
+                      latitude: float,
+                      longitude: float,
+                      radius: float,
+                      business_type: str,
+                      accessibility: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Mesure un site dont les isochrones sont déjà calculées.
+
+        Args:
+            latitude (float): Latitude du site
+            longitude (float): Longitude du site
+            radius (float): Rayon d'analyse en mètres
+            business_type (str): Type de commerce
+            accessibility (dict): Isochrones du site (voir IsochroneEngine.compute)
+
+        Returns:
+            dict: Mesures et sous-scores du site
+        """
+        distances = haversine_distances(latitude, longitude, self.latitudes, self.longitudes)
+        inside = distances <= radius
+
+        counts = np.bincount(self.category_codes[inside & (self.category_codes >= 0)], minlength=len(self.categories))
+        pois_count = {category: int(count) for category, count in zip(self.categories, counts) if count > 0}
+
+        category = business_type_category(business_type)
+        selected = np.flatnonzero(inside & self._category_mask(category))
+        selected = selected[np.argsort(distances[selected], kind="stable")]
+        competitors = [
+            {
+                "name": self.names[i],
+                "latitude": float(self.latitudes[i]),
+                "longitude": float(self.longitudes[i]),
+                "distance": round(float(distances[i]), 0)
+            }
+            for i in selected
+        ]
+        competition = self.competitors_index(category).summary(latitude, longitude)
+
+        network_metrics = self.network.metrics(latitude, longitude, radius)
+        commercial_count = int(np.count_nonzero(inside & self.commercial))
+
+        return {
+            "pois_count": pois_count,
+            "competitors": competitors,
+            "competition": competition,
+            "network_metrics": network_metrics,
+            "road_density": network_metrics["street_density"],  # km de voirie par km²
+            "accessibility": accessibility,
+            "scores": {
+                "poi_score": poi_density_score(commercial_count, radius),
+                "competition_score": competition["competition_score"],
+                "road_score": round((road_score(network_metrics) + accessibility["accessibility_score"]) / 2, 1)
+            }
+        }
+
+    def _category_mask(self, category: Optional[str]) -> np.ndarray:
+        """
+        Renvoie le masque des POI d'une catégorie.
+        """
+        if category is None or category not in self.categories:
+            return np.zeros(len(self.pois), dtype=bool)
+        return self.category_codes == self.categories.index(category)
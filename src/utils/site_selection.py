@@ -0,0 +1,277 @@
+"""
+Recherche des meilleurs emplacements dans une zone d'analyse.
+Une grille de candidats (ou les nœuds du réseau routier) est évaluée en une
+seule passe vectorisée à partir de couches de densité de POI, de densité de
+voirie et de proximité des concurrents ; les meilleurs maxima locaux sont
+ensuite extraits par filtrage morphologique.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import ndimage
+from scipy.spatial import cKDTree
+
+from src.utils.attractiveness_surface import compute_attractiveness_surface
+from src.utils.geo_utils import to_local_metric, from_local_metric
+from src.utils.network_metrics import road_scores
+from src.utils.proximity import CompetitorProximity, competition_score
+from src.utils.scoring import poi_density_scores, weighted_commercial_score
+
+DEFAULT_RESOLUTION = 316  # environ 100 000 candidats
+DEFAULT_NEIGHBOURHOOD = 300.0  # rayon de voisinage des densités en mètres
+DEFAULT_MIN_DISTANCE = 150.0  # distance minimale entre deux sites proposés en mètres
+DEFAULT_TOP_N = 5
+
+# Couches de densité (noyau disque : nombre d'éléments par m² dans le voisinage)
+SELECTION_LAYERS = {
+    name: {"kernel": "uniform", "bandwidth": DEFAULT_NEIGHBOURHOOD}
+    for name in ("pois", "streets", "intersections")
+}
+
+
+def score_candidate_grid(center_lat: float,
+                         center_lon: float,
+                         radius: float,
+                         pois: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+                         competitors: Optional[CompetitorProximity] = None,
+                         streets: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None,
+                         intersections: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+                         resolution: int = DEFAULT_RESOLUTION,
+                         neighbourhood: float = DEFAULT_NEIGHBOURHOOD) -> Dict[str, Any]:
+    """
+    Évalue une grille de candidats couvrant le cercle d'analyse.
+
+    Args:
+        center_lat (float): Latitude du centre de la zone
+        center_lon (float): Longitude du centre de la zone
+        radius (float): Rayon de la zone en mètres
+        pois (tuple, optional): Longitudes et latitudes des POI commerciaux et de services
+        competitors (CompetitorProximity, optional): Index des concurrents
+        streets (tuple, optional): Longitudes, latitudes et longueurs des tronçons de voirie
+        intersections (tuple, optional): Longitudes et latitudes des intersections
+        resolution (int): Nombre de candidats par côté de la grille
+        neighbourhood (float): Rayon de voisinage des densités en mètres
+
+    Returns:
+        dict: Grilles des sous-scores, coordonnées des candidats, masque du
+              cercle et taille de cellule (le score global est recombiné par
+              select_best_sites pour chaque jeu de facteurs d'importance)
+    """
+    points = {}
+    if pois is not None and len(pois[0]):
+        points["pois"] = pois
+    if streets is not None and len(streets[0]):
+        points["streets"] = streets
+    if intersections is not None and len(intersections[0]):
+        points["intersections"] = intersections
+
+    # Densités lissées par un disque de rayon `neighbourhood` (une FFT par couche)
+    layers = {name: dict(config, bandwidth=neighbourhood) for name, config in SELECTION_LAYERS.items()}
+    densities = compute_attractiveness_surface(center_lat, center_lon, radius, points, {},
+                                               resolution=resolution, layers=layers,
+                                               return_layers=True)
+    cell_size = densities["cell_size"]
+    shape = (resolution, resolution)
+    per_km2 = {name: densities["layers"].get(name, np.zeros(shape)) * 1e6 for name in layers}
+
+    # Coordonnées des centres de cellules (lignes = nord, colonnes = est)
+    offsets = (np.arange(resolution) + 0.5) * cell_size - radius
+    grid_x, grid_y = np.meshgrid(offsets, offsets)
+    longitudes, latitudes = from_local_metric(grid_x, grid_y, center_lon, center_lat)
+
+    sub_scores = {
+        "poi_score": poi_density_scores(np.clip(per_km2["pois"], 0.0, None)),
+        # Les tronçons sont pondérés par leur longueur en mètres : m/km² → km/km²
+        "road_score": road_scores(np.clip(per_km2["streets"], 0.0, None) / 1000,
+                                  np.clip(per_km2["intersections"], 0.0, None))
+    }
+    if competitors is not None and competitors.size:
+        nearest, _ = competitors.nearest(latitudes.ravel(), longitudes.ravel())
+        counts = competitors.counts_within(latitudes.ravel(), longitudes.ravel(), bands=(500,))[500]
+        sub_scores["competition_score"] = competition_score(nearest, counts).reshape(shape)
+    else:
+        sub_scores["competition_score"] = np.full(shape, 10.0)
+
+    return {
+        "sub_scores": sub_scores,
+        "longitudes": longitudes,
+        "latitudes": latitudes,
+        "inside": np.hypot(grid_x, grid_y) <= radius,
+        "cell_size": cell_size
+    }
+
+
+def grid_local_maxima(scores: np.ndarray,
+                      mask: np.ndarray,
+                      min_distance_cells: int,
+                      top_n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Extrait les meilleurs maxima locaux d'une grille de scores.
+
+    Un candidat est retenu s'il est le maximum de sa fenêtre de côté
+    2 * min_distance_cells + 1 ; un plateau de valeurs égales ne donne qu'un site.
+
+    Args:
+        scores (np.ndarray): Grille des scores
+        mask (np.ndarray): Candidats admissibles
+        min_distance_cells (int): Demi-côté de la fenêtre en cellules
+        top_n (int): Nombre maximal de maxima renvoyés
+
+    Returns:
+        tuple: Lignes et colonnes des maxima, par score décroissant
+    """
+    masked = np.where(mask, scores, -np.inf)
+    window = 2 * max(1, int(min_distance_cells)) + 1
+    peaks = (masked == ndimage.maximum_filter(masked, size=window, mode="nearest")) & mask
+
+    labels, count = ndimage.label(peaks, structure=np.ones((3, 3)))
+    if count == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    positions = np.array(ndimage.maximum_position(masked, labels, index=np.arange(1, count + 1)), dtype=np.int64)
+    order = np.argsort(-masked[positions[:, 0], positions[:, 1]], kind="stable")[:top_n]
+    return positions[order, 0], positions[order, 1]
+
+
+def point_local_maxima(x: np.ndarray,
+                       y: np.ndarray,
+                       scores: np.ndarray,
+                       min_distance: float,
+                       top_n: int) -> np.ndarray:
+    """
+    Extrait les meilleurs maxima locaux d'un semis de candidats irrégulier.
+
+    Args:
+        x (np.ndarray): Coordonnées est en mètres
+        y (np.ndarray): Coordonnées nord en mètres
+        scores (np.ndarray): Score de chaque candidat
+        min_distance (float): Rayon de voisinage en mètres
+        top_n (int): Nombre maximal de maxima renvoyés
+
+    Returns:
+        np.ndarray: Indices des maxima, par score décroissant
+    """
+    pairs = cKDTree(np.column_stack((x, y))).query_pairs(min_distance, output_type="ndarray")
+    neighbour_max = np.full(len(scores), -np.inf)
+    np.maximum.at(neighbour_max, pairs[:, 0], scores[pairs[:, 1]])
+    np.maximum.at(neighbour_max, pairs[:, 1], scores[pairs[:, 0]])
+    peaks = np.flatnonzero(scores >= neighbour_max)
+    peaks = peaks[np.argsort(-scores[peaks], kind="stable")]
+
+    # Départager les ex æquo voisins : garder le premier de chaque groupe
+    selected: List[int] = []
+    for index in peaks:
+        if all(np.hypot(x[index] - x[other], y[index] - y[other]) > min_distance for other in selected):
+            selected.append(int(index))
+            if len(selected) == top_n:
+                break
+    return np.array(selected, dtype=np.int64)
+
+
+def find_best_sites(center_lat: float,
+                    center_lon: float,
+                    radius: float,
+                    importance_factors: Dict[str, float],
+                    pois: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+                    competitors: Optional[CompetitorProximity] = None,
+                    streets: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None,
+                    intersections: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+                    candidates: Optional[Tuple[Sequence[float], Sequence[float]]] = None,
+                    top_n: int = DEFAULT_TOP_N,
+                    resolution: int = DEFAULT_RESOLUTION,
+                    neighbourhood: float = DEFAULT_NEIGHBOURHOOD,
+                    min_distance: float = DEFAULT_MIN_DISTANCE) -> List[Dict[str, Any]]:
+    """
+    Recherche les meilleurs emplacements d'une zone d'analyse.
+
+    Args:
+        center_lat (float): Latitude du centre de la zone
+        center_lon (float): Longitude du centre de la zone
+        radius (float): Rayon de la zone en mètres
+        importance_factors (dict): Facteurs d'importance de l'analyse
+        pois, competitors, streets, intersections: Couches (voir score_candidate_grid)
+        candidates (tuple, optional): Latitudes et longitudes de candidats imposés
+                                      (nœuds du réseau par exemple) ; grille régulière sinon
+        top_n (int): Nombre de sites renvoyés
+        resolution (int): Nombre de cellules par côté de la grille
+        neighbourhood (float): Rayon de voisinage des densités en mètres
+        min_distance (float): Distance minimale entre deux sites proposés en mètres
+
+    Returns:
+        list: Sites classés (rang, coordonnées, score global et sous-scores sur 10)
+    """
+    grid = score_candidate_grid(center_lat, center_lon, radius,
+                                pois=pois, competitors=competitors, streets=streets,
+                                intersections=intersections, resolution=resolution,
+                                neighbourhood=neighbourhood)
+
+    if candidates is None:
+        return select_best_sites(grid, importance_factors, top_n=top_n, min_distance=min_distance)
+
+    # Candidats imposés : couches de densité interpolées, concurrence exacte
+    latitudes = np.asarray(candidates[0], dtype=np.float64)
+    longitudes = np.asarray(candidates[1], dtype=np.float64)
+    x, y = to_local_metric(longitudes, latitudes, center_lon, center_lat)
+    inside = np.hypot(x, y) <= radius
+    latitudes, longitudes, x, y = latitudes[inside], longitudes[inside], x[inside], y[inside]
+
+    coords = np.vstack(((y + radius) / grid["cell_size"] - 0.5, (x + radius) / grid["cell_size"] - 0.5))
+    sub_scores = {
+        name: ndimage.map_coordinates(values, coords, order=1, mode="nearest")
+        for name, values in grid["sub_scores"].items() if name != "competition_score"
+    }
+    if competitors is not None and competitors.size:
+        nearest, _ = competitors.nearest(latitudes, longitudes)
+        counts = competitors.counts_within(latitudes, longitudes, bands=(500,))[500]
+        sub_scores["competition_score"] = competition_score(nearest, counts)
+    else:
+        sub_scores["competition_score"] = np.full(len(latitudes), 10.0)
+    scores = weighted_commercial_score(sub_scores, importance_factors)
+
+    selected = point_local_maxima(x, y, scores, min_distance, top_n)
+
+    return _ranked_sites(latitudes[selected], longitudes[selected], scores[selected],
+                         {name: values[selected] for name, values in sub_scores.items()})
+
+
+def select_best_sites(grid: Dict[str, Any],
+                      importance_factors: Dict[str, float],
+                      top_n: int = DEFAULT_TOP_N,
+                      min_distance: float = DEFAULT_MIN_DISTANCE) -> List[Dict[str, Any]]:
+    """
+    Recombine les sous-scores d'une grille de candidats et extrait les meilleurs sites.
+
+    Ne dépend que de la grille : un changement des facteurs d'importance ne
+    demande donc ni nouvel accès aux données ni nouvelle convolution.
+
+    Args:
+        grid (dict): Grille de candidats (voir score_candidate_grid)
+        importance_factors (dict): Facteurs d'importance de l'analyse
+        top_n (int): Nombre de sites renvoyés
+        min_distance (float): Distance minimale entre deux sites proposés en mètres
+
+    Returns:
+        list: Sites classés (rang, coordonnées, score global et sous-scores sur 10)
+    """
+    scores = weighted_commercial_score(grid["sub_scores"], importance_factors)
+    rows, cols = grid_local_maxima(scores, grid["inside"], int(np.ceil(min_distance / grid["cell_size"])), top_n)
+    return _ranked_sites(grid["latitudes"][rows, cols], grid["longitudes"][rows, cols], scores[rows, cols],
+                         {name: values[rows, cols] for name, values in grid["sub_scores"].items()})
+
+
+def _ranked_sites(latitudes: np.ndarray,
+                  longitudes: np.ndarray,
+                  global_scores: np.ndarray,
+                  sub_scores: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """
+    Met en forme les sites retenus, déjà triés par score décroissant.
+    """
+    return [
+        {
+            "rank": rank + 1,
+            "latitude": float(latitudes[rank]),
+            "longitude": float(longitudes[rank]),
+            "global_score": round(float(global_scores[rank]), 1),
+            "scores": {name: round(float(values[rank]), 1) for name, values in sub_scores.items()}
+        }
+        for rank in range(len(latitudes))
+    ]
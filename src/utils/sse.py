@@ -0,0 +1,80 @@
+"""
+Flux Server-Sent Events (text/event-stream).
+Chaque étape terminée d'une analyse est envoyée au client sous forme d'un
+événement nommé, ce qui permet d'afficher les premiers résultats sans attendre
+la fin de l'analyse complète. Les flux reçus (réponses de l'API DeepSeek en
+mode stream) sont décodés par parse_event_data.
+"""
+from typing import Any, Iterable, Iterator, Tuple
+
+from src.models.analysis_result import AnalysisResult
+from src.utils.job_queue import to_json
+
+# En-têtes des réponses SSE : ni cache, ni mise en tampon par un proxy (nginx)
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no"
+}
+
+
+def format_event(event: str, data: Any) -> str:
+    """
+    Met en forme un événement SSE.
+
+    Args:
+        event (str): Nom de l'événement
+        data (any): Données sérialisables en JSON
+
+    Returns:
+        str: Événement terminé par une ligne vide
+    """
+    payload = "\n".join(f"data: {line}" for line in to_json(data).splitlines())
+    return f"event: {event}\n{payload}\n\n"
+
+
+def analysis_event_stream(events: Iterable[Tuple[str, Any]]) -> Iterator[str]:
+    """
+    Convertit les événements d'une analyse en flux SSE.
+
+    Le résultat final est envoyé sans ses données brutes (graphe routier,
+    GeoDataFrame), déjà transmises sous forme résumée par les événements
+    précédents ; un événement 'done' clôt le flux.
+
+    Args:
+        events (iterable): Couples (nom de l'événement, données), voir
+            CommercialLocationService.analyze_location_events
+
+    Yields:
+        str: Événements SSE
+    """
+    for event, data in events:
+        if isinstance(data, AnalysisResult):
+            data = {key: value for key, value in data.to_dict().items() if key != "raw_data"}
+        yield format_event(event, data)
+    yield format_event("done", {})
+
+
+def parse_event_data(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Décode un flux SSE reçu ligne par ligne.
+
+    Args:
+        lines (iterable): Lignes du flux, sans leur fin de ligne
+
+    Yields:
+        str: Données de chaque événement (lignes 'data' jointes)
+    """
+    data = []
+    for line in lines:
+        if not line:
+            if data:
+                yield "\n".join(data)
+                data = []
+            continue
+        if line.startswith(":"):
+            continue
+        field, _, value = line.partition(":")
+        if field == "data":
+            data.append(value[1:] if value.startswith(" ") else value)
+    if data:
+        yield "\n".join(data)
@@ -0,0 +1,238 @@
+"""
+Cache des visualisations générées (cartes HTML, images PNG).
+Chaque fichier est nommé d'après un condensat des données qui le déterminent
+(emplacement, rayon, type de commerce, version des données...) : une requête
+identique réutilise le fichier existant sans aucun rendu. L'espace disque est
+borné, les fichiers les moins récemment servis étant supprimés en premier.
+"""
+import os
+import re
+import json
+import time
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+# Répertoire et URL des visualisations servies par Flask
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                 "static", "visualizations")
+DEFAULT_URL_PREFIX = "/static/visualizations"
+
+# Taille maximale des visualisations conservées (modifiable par variable d'environnement)
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+MAX_BYTES_ENV = "GEOMARKETING_VISUALIZATION_CACHE_BYTES"
+
+# Seuls les fichiers nommés par le cache sont gérés (les exemples statiques ne sont jamais supprimés)
+ARTIFACT_NAME = re.compile(r"^[a-z_]+_[0-9a-f]{16}\.[a-z]+$")
+
+
+def visualization_key(inputs: Dict[str, Any]) -> str:
+    """
+    Calcule le condensat des données d'une visualisation.
+
+    Args:
+        inputs (dict): Données déterminant le rendu (sérialisables en JSON)
+
+    Returns:
+        str: Condensat hexadécimal de 16 caractères
+    """
+    payload = json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+class VisualizationCache:
+    """
+    Fichiers de visualisation adressés par contenu, avec éviction LRU sur la taille totale.
+    """
+    def __init__(self,
+                 directory: str = DEFAULT_DIRECTORY,
+                 max_bytes: Optional[int] = None,
+                 url_prefix: str = DEFAULT_URL_PREFIX):
+        """
+        Initialise le cache à partir des fichiers déjà présents.
+
+        Args:
+            directory (str): Répertoire des visualisations
+            max_bytes (int, optional): Taille maximale conservée
+                (par défaut $GEOMARKETING_VISUALIZATION_CACHE_BYTES ou 200 Mo)
+            url_prefix (str): Préfixe des URL renvoyées
+        """
+        if max_bytes is None:
+            max_bytes = int(os.environ.get(MAX_BYTES_ENV) or DEFAULT_MAX_BYTES)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.url_prefix = url_prefix
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "renders": 0, "render_seconds": 0.0, "evictions": 0}
+        os.makedirs(directory, exist_ok=True)
+
+        # Fichiers existants, du moins au plus récemment servi (date de modification)
+        files = []
+        for entry in os.scandir(directory):
+            if entry.is_file() and ARTIFACT_NAME.match(entry.name):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name, stat.st_size))
+        self._files: "OrderedDict[str, int]" = OrderedDict(
+            (name, size) for _, name, size in sorted(files)
+        )
+        self._bytes = sum(self._files.values())
+        with self._lock:
+            self._evict()
+
+    def get_or_render(self,
+                      kind: str,
+                      extension: str,
+                      inputs: Dict[str, Any],
+                      render: Callable[[str], None]) -> str:
+        """
+        Renvoie l'URL d'une visualisation, en ne la générant que si elle est absente.
+
+        Le rendu écrit dans un fichier temporaire renommé ensuite, de sorte
+        qu'un fichier partiellement écrit n'est jamais servi.
+
+        Args:
+            kind (str): Type de visualisation (par exemple 'location_map')
+            extension (str): Extension du fichier ('html', 'png')
+            inputs (dict): Données déterminant le rendu
+            render (callable): Fonction écrivant la visualisation dans le chemin fourni
+
+        Returns:
+            str: URL relative de la visualisation
+        """
+        def submit(path: str) -> Future:
+            future = Future()
+            try:
+                render(path)
+                future.set_result(None)
+            except BaseException as e:
+                future.set_exception(e)
+            return future
+
+        return self.get_or_render_async(kind, extension, inputs, submit).result()
+
+    def get_or_render_async(self,
+                            kind: str,
+                            extension: str,
+                            inputs: Dict[str, Any],
+                            submit: Callable[[str], Future]) -> Future:
+        """
+        Variante asynchrone de get_or_render : le rendu est soumis (par exemple
+        au pool de rendu) et l'URL est disponible dans le Future renvoyé.
+
+        Args:
+            kind (str): Type de visualisation (par exemple 'location_map')
+            extension (str): Extension du fichier ('html', 'png')
+            inputs (dict): Données déterminant le rendu
+            submit (callable): Fonction lançant l'écriture de la visualisation
+                dans le chemin fourni et renvoyant un Future
+
+        Returns:
+            Future: URL relative de la visualisation
+        """
+        name = f"{kind}_{visualization_key(inputs)}.{extension}"
+        path = os.path.join(self.directory, name)
+        url = f"{self.url_prefix}/{name}"
+        result = Future()
+
+        with self._lock:
+            if name in self._files and os.path.exists(path):
+                self._files.move_to_end(name)
+                self._stats["hits"] += 1
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+                result.set_result(url)
+                return result
+            self._stats["misses"] += 1
+
+        # Extension conservée : matplotlib en déduit le format de l'image
+        temporary = os.path.join(self.directory, f".{uuid.uuid4().hex}.{extension}")
+        start = time.perf_counter()
+
+        def finish(rendering: Future):
+            try:
+                rendering.result()
+                os.replace(temporary, path)
+                self._store(name, time.perf_counter() - start)
+                result.set_result(url)
+            except BaseException as e:
+                result.set_exception(e)
+            finally:
+                if os.path.exists(temporary):
+                    os.remove(temporary)
+
+        try:
+            submit(temporary).add_done_callback(finish)
+        except BaseException as e:
+            result.set_exception(e)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Renvoie les statistiques d'utilisation du cache.
+
+        Returns:
+            dict: Succès, échecs, rendus (nombre et durée), évictions, fichiers et octets
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["files"] = len(self._files)
+            stats["bytes"] = self._bytes
+        stats["max_bytes"] = self.max_bytes
+        stats["render_seconds"] = round(stats["render_seconds"], 3)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def _store(self, name: str, elapsed: float):
+        """
+        Enregistre un fichier venant d'être généré puis applique la limite de taille.
+
+        Args:
+            name (str): Nom du fichier
+            elapsed (float): Durée du rendu en secondes
+        """
+        with self._lock:
+            self._bytes -= self._files.pop(name, 0)
+            self._files[name] = os.path.getsize(os.path.join(self.directory, name))
+            self._bytes += self._files[name]
+            self._stats["renders"] += 1
+            self._stats["render_seconds"] += elapsed
+            self._evict()
+
+    def _evict(self):
+        """
+        Supprime les fichiers les moins récemment servis au-delà de la taille maximale.
+
+        Le fichier le plus récent est toujours conservé, même s'il dépasse seul la limite.
+        """
+        while self._bytes > self.max_bytes and len(self._files) > 1:
+            name, size = self._files.popitem(last=False)
+            self._bytes -= size
+            self._stats["evictions"] += 1
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_visualization_cache() -> VisualizationCache:
+    """
+    Renvoie le cache de visualisations partagé par les services.
+
+    Returns:
+        VisualizationCache: Instance partagée
+    """
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = VisualizationCache()
+        return _default_cache